@@ -1,7 +1,20 @@
 #Chatgpt
 import requests
+import aiohttp
+import asyncio
 import logging
+import os
+import json
 import time
+import random
+import hashlib
+import threading
+from collections import deque, OrderedDict
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+from concurrent.futures import ThreadPoolExecutor, Future
+from requests.adapters import HTTPAdapter
 from requests.exceptions import HTTPError, Timeout, RequestException
 
 # Configure logging
@@ -11,31 +24,441 @@ class APIClientError(Exception):
     """Custom exception for API client errors."""
     pass
 
+class CircuitOpenError(APIClientError):
+    """Raised when a request is rejected because the host's circuit breaker is open."""
+    pass
+
+class RetryPolicy:
+    """Capped exponential backoff with full jitter, limited to retryable status codes."""
+
+    def __init__(self, max_retries=3, backoff_base=0.5, backoff_max=30.0, jitter=True,
+                 retry_statuses=(429, 500, 502, 503, 504), respect_retry_after=True):
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.jitter = jitter
+        self.retry_statuses = frozenset(retry_statuses)
+        self.respect_retry_after = respect_retry_after
+
+    def is_retryable_status(self, status_code):
+        """Return True if a response with this status code is worth retrying."""
+        return status_code in self.retry_statuses
+
+    def parse_retry_after(self, response):
+        """Return the Retry-After delay of a response in seconds, or None."""
+        headers = getattr(response, "headers", None)
+        if not headers:
+            return None
+        value = headers.get("Retry-After")
+        if not value:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+        try:
+            retry_at = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+        if retry_at.tzinfo is None:
+            retry_at = retry_at.replace(tzinfo=timezone.utc)
+        return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+    def compute_delay(self, attempt, response=None):
+        """Return how long to wait before retry number `attempt` (starting at 1)."""
+        if self.respect_retry_after:
+            retry_after = self.parse_retry_after(response)
+            if retry_after is not None:
+                return min(retry_after, self.backoff_max)
+        delay = min(self.backoff_max, self.backoff_base * (2 ** (attempt - 1)))
+        if self.jitter:
+            delay = random.uniform(0, delay)
+        return delay
+
+class RetryBudget:
+    """Per-host token bucket limiting how many retries may be spent over time."""
+
+    def __init__(self, capacity=10, refill_rate=1.0):
+        self.capacity = capacity
+        self.refill_rate = refill_rate  # Tokens added per second
+        self.buckets = {}  # host -> (tokens, last refill time)
+        self.lock = threading.Lock()
+
+    def try_acquire(self, host):
+        """Take one retry token for the host, returning False if the budget is spent."""
+        with self.lock:
+            now = time.monotonic()
+            tokens, last = self.buckets.get(host, (self.capacity, now))
+            tokens = min(self.capacity, tokens + (now - last) * self.refill_rate)
+            if tokens < 1:
+                self.buckets[host] = (tokens, now)
+                return False
+            self.buckets[host] = (tokens - 1, now)
+            return True
+
+class CircuitBreaker:
+    """Closed/open/half-open circuit breaker for a single host."""
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half-open"
+
+    def __init__(self, failure_threshold=5, recovery_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.trial_in_flight = False
+        self.lock = threading.Lock()
+
+    def allow_request(self):
+        """Return True if a request may be sent to the host right now."""
+        with self.lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN:
+                if time.monotonic() - self.opened_at < self.recovery_timeout:
+                    return False
+                self.state = self.HALF_OPEN
+                self.trial_in_flight = False
+            # Half-open: let a single trial request through
+            if self.trial_in_flight:
+                return False
+            self.trial_in_flight = True
+            return True
+
+    def release_trial(self):
+        """Give back a half-open trial whose request ended without an outcome (e.g. it was cancelled)."""
+        with self.lock:
+            if self.state == self.HALF_OPEN:
+                self.trial_in_flight = False
+
+    def record_success(self):
+        """Record a successful call, closing the circuit."""
+        with self.lock:
+            if self.state != self.CLOSED:
+                logging.info("Circuit breaker closed after a successful trial request.")
+            self.state = self.CLOSED
+            self.failures = 0
+            self.trial_in_flight = False
+
+    def record_failure(self):
+        """Record a failed call, opening the circuit once the threshold is reached."""
+        with self.lock:
+            self.failures += 1
+            self.trial_in_flight = False
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    logging.warning(f"Circuit breaker opened after {self.failures} failures.")
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+class CacheEntry:
+    """A cached JSON response together with its validators."""
+    __slots__ = ("data", "size", "etag", "last_modified", "expires_at")
+
+    def __init__(self, data, size, etag=None, last_modified=None, expires_at=0.0):
+        self.data = data
+        self.size = size
+        self.etag = etag
+        self.last_modified = last_modified
+        self.expires_at = expires_at  # Wall-clock time, so disk entries stay valid across restarts
+
+    def is_fresh(self):
+        return time.time() < self.expires_at
+
+    def to_dict(self):
+        return {"data": self.data, "size": self.size, "etag": self.etag,
+                "last_modified": self.last_modified, "expires_at": self.expires_at}
+
+class ResponseCache:
+    """In-memory LRU cache of JSON responses keyed by URL, with a byte-size cap and TTL.
+
+    If `disk_dir` is given, entries are also written there and are used on a memory
+    miss, so the cache survives restarts. Stale entries are kept for revalidation.
+    """
+
+    def __init__(self, max_bytes=50 * 1024 * 1024, ttl=300, disk_dir=None):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.disk_dir = disk_dir
+        self.entries = OrderedDict()  # url -> CacheEntry, least recently used first
+        self.current_bytes = 0
+        self.lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "stale": 0, "not_modified": 0,
+                      "evictions": 0, "coalesced": 0}
+        if self.disk_dir:
+            os.makedirs(self.disk_dir, exist_ok=True)
+
+    def _disk_path(self, url):
+        return os.path.join(self.disk_dir, hashlib.sha256(url.encode()).hexdigest() + ".json")
+
+    def _load_from_disk(self, url):
+        try:
+            with open(self._disk_path(url), 'r') as f:
+                return CacheEntry(**json.load(f))
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, TypeError) as e:
+            logging.warning(f"Ignoring unreadable cache file for {url}: {e}")
+            return None
+
+    def _save_to_disk(self, url, entry):
+        path = self._disk_path(url)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, 'w') as f:
+                json.dump(entry.to_dict(), f)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logging.warning(f"Failed to write cache file for {url}: {e}")
+
+    def _store(self, url, entry):
+        """Insert an entry into the memory LRU, evicting as needed. Caller holds the lock."""
+        old = self.entries.pop(url, None)
+        if old is not None:
+            self.current_bytes -= old.size
+        if entry.size > self.max_bytes:
+            return
+        self.entries[url] = entry
+        self.current_bytes += entry.size
+        while self.current_bytes > self.max_bytes:
+            _, evicted = self.entries.popitem(last=False)
+            self.current_bytes -= evicted.size
+            self.stats["evictions"] += 1
+
+    def get(self, url):
+        """Return the entry for a URL, fresh or stale, or None."""
+        with self.lock:
+            entry = self.entries.get(url)
+            if entry is not None:
+                self.entries.move_to_end(url)
+        if entry is None and self.disk_dir:
+            entry = self._load_from_disk(url)
+            if entry is not None:
+                with self.lock:
+                    self._store(url, entry)
+        with self.lock:
+            if entry is None:
+                self.stats["misses"] += 1
+            elif entry.is_fresh():
+                self.stats["hits"] += 1
+            else:
+                self.stats["stale"] += 1
+        return entry
+
+    def set(self, url, data, size, etag=None, last_modified=None):
+        """Cache a freshly fetched response."""
+        entry = CacheEntry(data, size, etag, last_modified, time.time() + self.ttl)
+        with self.lock:
+            self._store(url, entry)
+        if self.disk_dir:
+            self._save_to_disk(url, entry)
+        return entry
+
+    def refresh(self, url, entry):
+        """Extend the lifetime of an entry after a 304 Not Modified response."""
+        entry.expires_at = time.time() + self.ttl
+        with self.lock:
+            self.stats["not_modified"] += 1
+            self._store(url, entry)
+        if self.disk_dir:
+            self._save_to_disk(url, entry)
+
+    def record_coalesced(self):
+        with self.lock:
+            self.stats["coalesced"] += 1
+
+    def get_stats(self):
+        """Return hit/miss/eviction counters and current memory usage."""
+        with self.lock:
+            stats = dict(self.stats)
+            stats["entries"] = len(self.entries)
+            stats["bytes"] = self.current_bytes
+        return stats
+
 class APIClient:
-    def __init__(self, base_url, max_retries=3, timeout=5):
+    def __init__(self, base_url, max_retries=3, timeout=5, pool_size=10, pool_hosts=10, latency_window=10000,
+                 retry_policy=None, retry_budget=None, failure_threshold=5, recovery_timeout=30.0, cache=None):
         self.base_url = base_url
-        self.max_retries = max_retries
+        self.cache = cache  # Optional ResponseCache
+        self.inflight = {}  # url -> Future shared by concurrent requests for the same URL
+        self.inflight_lock = threading.Lock()
+        self.retry_policy = retry_policy or RetryPolicy(max_retries=max_retries)
+        self.max_retries = self.retry_policy.max_retries
+        self.retry_budget = retry_budget or RetryBudget()
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.breakers = {}  # host -> CircuitBreaker
+        self.breakers_lock = threading.Lock()
         self.timeout = timeout
+        self.pool_size = pool_size
+
+        # One keep-alive session shared by every call, so connections are reused
+        # instead of paying a TCP+TLS handshake per request.
+        # pool_size is the number of connections kept per host, pool_hosts the number of hosts cached.
+        self.session = requests.Session()
+        self.adapter = HTTPAdapter(pool_connections=pool_hosts, pool_maxsize=pool_size)
+        self.session.mount("http://", self.adapter)
+        self.session.mount("https://", self.adapter)
+
+        self.stats_lock = threading.Lock()
+        self.request_count = 0
+        self.latencies = deque(maxlen=latency_window)  # Most recent per-call latencies in seconds
+
+    def close(self):
+        """Close the session and release pooled connections."""
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _record_latency(self, elapsed):
+        """Record the latency of a single HTTP call."""
+        with self.stats_lock:
+            self.request_count += 1
+            self.latencies.append(elapsed)
+
+    def get_stats(self):
+        """Return latency and connection-reuse counters for the pooled session."""
+        connections_opened = 0
+        pooled_requests = 0
+        pools = self.adapter.poolmanager.pools
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            connections_opened += pool.num_connections
+            pooled_requests += pool.num_requests
+
+        with self.stats_lock:
+            latencies = sorted(self.latencies)
+            request_count = self.request_count
+
+        def percentile(p):
+            if not latencies:
+                return 0.0
+            return latencies[min(len(latencies) - 1, int(p / 100 * len(latencies)))]
+
+        stats = {
+            "requests": request_count,
+            "connections_opened": connections_opened,
+            "connections_reused": max(0, pooled_requests - connections_opened),
+            "latency_avg": sum(latencies) / len(latencies) if latencies else 0.0,
+            "latency_p50": percentile(50),
+            "latency_p99": percentile(99),
+        }
+        if self.cache is not None:
+            stats["cache"] = self.cache.get_stats()
+        return stats
+
+    def get_breaker(self, host):
+        """Return the circuit breaker for a host, creating it on first use."""
+        with self.breakers_lock:
+            breaker = self.breakers.get(host)
+            if breaker is None:
+                breaker = CircuitBreaker(self.failure_threshold, self.recovery_timeout)
+                self.breakers[host] = breaker
+            return breaker
 
     def send_request(self, endpoint):
         """Send a GET request to the given endpoint."""
         url = f"{self.base_url}/{endpoint}"
+        if self.cache is not None:
+            return self._send_cached(url)
+        _, data = self._fetch(url)
+        return data
+
+    def _send_cached(self, url):
+        """Serve a URL from the cache, revalidating stale entries and coalescing concurrent misses."""
+        entry = self.cache.get(url)
+        if entry is not None and entry.is_fresh():
+            return entry.data
+
+        with self.inflight_lock:
+            future = self.inflight.get(url)
+            is_leader = future is None
+            if is_leader:
+                future = Future()
+                self.inflight[url] = future
+        if not is_leader:
+            self.cache.record_coalesced()
+            return future.result()
+
+        try:
+            headers = {}
+            if entry is not None:
+                if entry.etag:
+                    headers["If-None-Match"] = entry.etag
+                if entry.last_modified:
+                    headers["If-Modified-Since"] = entry.last_modified
+            response, data = self._fetch(url, headers)
+            if response.status_code == 304 and entry is not None:
+                logging.debug(f"{url} not modified; reusing cached response.")
+                self.cache.refresh(url, entry)
+                data = entry.data
+            else:
+                self.cache.set(url, data, len(response.content),
+                               response.headers.get("ETag"), response.headers.get("Last-Modified"))
+            future.set_result(data)
+            return data
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self.inflight_lock:
+                del self.inflight[url]
+
+    def _fetch(self, url, headers=None):
+        """GET a URL with retries, returning the response and its parsed JSON (None on 304)."""
+        host = urlparse(url).netloc
+        breaker = self.get_breaker(host)
         attempt = 0
         while attempt < self.max_retries:
+            if not breaker.allow_request():
+                raise CircuitOpenError(f"Circuit open for {host}; not sending request to {url}.")
+            response = None
             try:
                 logging.info(f"Sending request to {url}, Attempt {attempt + 1}...")
-                response = requests.get(url, timeout=self.timeout)
+                start = time.perf_counter()
+                try:
+                    response = self.session.get(url, headers=headers, timeout=self.timeout)
+                finally:
+                    self._record_latency(time.perf_counter() - start)
                 response.raise_for_status()  # Raise an HTTPError for bad responses
-                return response.json()  # Return the JSON data from the API
+                breaker.record_success()
+                if response.status_code == 304:
+                    return response, None
+                return response, response.json()  # Return the JSON data from the API
             except Timeout:
+                breaker.record_failure()
                 logging.error(f"Timeout error while accessing {url}. Retrying...")
             except HTTPError as http_err:
+                if not self.retry_policy.is_retryable_status(response.status_code):
+                    # The upstream answered; a 4xx will not succeed on retry
+                    breaker.record_success()
+                    raise APIClientError(f"Non-retryable HTTP error from {url}: {http_err}") from http_err
+                breaker.record_failure()
                 logging.error(f"HTTP error occurred: {http_err}. Retrying...")
             except RequestException as err:
+                breaker.record_failure()
                 logging.error(f"Error occurred: {err}. Retrying...")
-            time.sleep(2)  # Wait before retrying
+            except BaseException:
+                breaker.release_trial()
+                raise
             attempt += 1
-        raise APIClientError(f"Failed to fetch data from {url} after {self.max_retries} retries.")
+            if attempt >= self.max_retries:
+                break
+            if not self.retry_budget.try_acquire(host):
+                logging.warning(f"Retry budget for {host} exhausted; giving up on {url}.")
+                break
+            delay = self.retry_policy.compute_delay(attempt, response)
+            logging.debug(f"Waiting {delay:.2f}s before retrying {url}.")
+            time.sleep(delay)  # Wait before retrying
+        raise APIClientError(f"Failed to fetch data from {url} after {attempt} attempts.")
 
     def get_data(self, endpoint):
         """Retrieve data from an API endpoint."""
@@ -50,9 +473,160 @@ class APIClient:
             logging.error(f"Unexpected error: {e}")
             return None
 
+    def get_many(self, endpoints, concurrency=None):
+        """Retrieve data from several endpoints concurrently, returning results in order."""
+        # More workers than pooled connections would open throwaway connections.
+        concurrency = min(concurrency or self.pool_size, self.pool_size)
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            return list(executor.map(self.get_data, endpoints))
+
+class AsyncAPIClient:
+    """Asyncio counterpart of APIClient with a semaphore-bounded number of requests in flight."""
+
+    def __init__(self, base_url, max_retries=3, timeout=5, concurrency=100, retry_policy=None,
+                 retry_budget=None, failure_threshold=5, recovery_timeout=30.0):
+        self.base_url = base_url
+        self.retry_policy = retry_policy or RetryPolicy(max_retries=max_retries)
+        self.max_retries = self.retry_policy.max_retries
+        self.retry_budget = retry_budget or RetryBudget()
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.breakers = {}  # host -> CircuitBreaker
+        self.timeout = timeout
+        self.concurrency = concurrency
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.session = None
+
+    def get_session(self):
+        """Return the shared aiohttp session, creating it inside the running event loop."""
+        if self.session is None or self.session.closed:
+            connector = aiohttp.TCPConnector(limit=self.concurrency, ttl_dns_cache=300)
+            self.session = aiohttp.ClientSession(connector=connector,
+                                                 timeout=aiohttp.ClientTimeout(total=self.timeout))
+        return self.session
+
+    async def close(self):
+        """Close the session and release pooled connections."""
+        if self.session is not None:
+            await self.session.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+    def get_breaker(self, host):
+        """Return the circuit breaker for a host, creating it on first use."""
+        breaker = self.breakers.get(host)
+        if breaker is None:
+            breaker = CircuitBreaker(self.failure_threshold, self.recovery_timeout)
+            self.breakers[host] = breaker
+        return breaker
+
+    async def send_request(self, endpoint):
+        """Send a GET request to the given endpoint."""
+        url = f"{self.base_url}/{endpoint}"
+        host = urlparse(url).netloc
+        breaker = self.get_breaker(host)
+        session = self.get_session()
+        attempt = 0
+        while attempt < self.max_retries:
+            if not breaker.allow_request():
+                raise CircuitOpenError(f"Circuit open for {host}; not sending request to {url}.")
+            error_response = None
+            try:
+                logging.info(f"Sending request to {url}, Attempt {attempt + 1}...")
+                # Only hold a concurrency slot while the request is in flight, not while backing off
+                async with self.semaphore:
+                    async with session.get(url) as response:
+                        response.raise_for_status()  # Raise a ClientResponseError for bad responses
+                        data = await response.json(content_type=None)
+                breaker.record_success()
+                return data  # Return the JSON data from the API
+            except asyncio.TimeoutError:
+                breaker.record_failure()
+                logging.error(f"Timeout error while accessing {url}. Retrying...")
+            except aiohttp.ClientResponseError as http_err:
+                if not self.retry_policy.is_retryable_status(http_err.status):
+                    breaker.record_success()
+                    raise APIClientError(f"Non-retryable HTTP error from {url}: {http_err}") from http_err
+                breaker.record_failure()
+                error_response = http_err
+                logging.error(f"HTTP error occurred: {http_err}. Retrying...")
+            except (aiohttp.ClientError, ValueError) as err:
+                breaker.record_failure()
+                logging.error(f"Error occurred: {err}. Retrying...")
+            except BaseException:
+                # Cancelled (or otherwise interrupted) mid-request: no outcome, but free the trial slot
+                breaker.release_trial()
+                raise
+            attempt += 1
+            if attempt >= self.max_retries:
+                break
+            if not self.retry_budget.try_acquire(host):
+                logging.warning(f"Retry budget for {host} exhausted; giving up on {url}.")
+                break
+            delay = self.retry_policy.compute_delay(attempt, error_response)
+            logging.debug(f"Waiting {delay:.2f}s before retrying {url}.")
+            await asyncio.sleep(delay)  # Wait before retrying
+        raise APIClientError(f"Failed to fetch data from {url} after {attempt} attempts.")
+
+    async def get_data(self, endpoint):
+        """Retrieve data from an API endpoint."""
+        try:
+            data = await self.send_request(endpoint)
+            logging.info(f"Data retrieved from {endpoint}: {data}")
+            return data
+        except APIClientError as e:
+            logging.error(f"API client error: {e}")
+            return None
+        except Exception as e:
+            logging.error(f"Unexpected error: {e}")
+            return None
+
+    async def get_many(self, endpoints):
+        """Retrieve data from several endpoints concurrently, returning results in order."""
+        return await asyncio.gather(*(self.get_data(endpoint) for endpoint in endpoints))
+
+    async def _fetch_tagged(self, endpoint):
+        return endpoint, await self.get_data(endpoint)
+
+    async def stream(self, endpoints):
+        """Yield (endpoint, data) pairs as they complete, with at most `concurrency` tasks pending.
+
+        Endpoints are pulled lazily, so an arbitrarily long iterable can be streamed
+        without creating a task per endpoint up front.
+        """
+        endpoints = iter(endpoints)
+        pending = set()
+        try:
+            while True:
+                for endpoint in endpoints:
+                    pending.add(asyncio.ensure_future(self._fetch_tagged(endpoint)))
+                    if len(pending) >= self.concurrency:
+                        break
+                if not pending:
+                    return
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    yield task.result()
+        finally:
+            for task in pending:
+                task.cancel()
+
+async def fetch_posts_async(base_url, count=100):
+    """Stream a batch of posts through the asyncio client."""
+    retrieved = 0
+    async with AsyncAPIClient(base_url, concurrency=20) as client:
+        async for endpoint, data in client.stream(f"posts/{i}" for i in range(1, count + 1)):
+            if data:
+                retrieved += 1
+    logging.info(f"Async client retrieved {retrieved} of {count} posts.")
+
 # Example usage
 def main():
-    client = APIClient(base_url="https://jsonplaceholder.typicode.com")
+    client = APIClient(base_url="https://jsonplaceholder.typicode.com", cache=ResponseCache(ttl=60))
 
     # Attempt to get data from an API endpoint
     data = client.get_data("posts/1")
@@ -63,5 +637,14 @@ def main():
     else:
         logging.error("Failed to retrieve data.")
 
+    # Fetch several endpoints over the same pooled connections
+    posts = client.get_many([f"posts/{i}" for i in range(1, 11)], concurrency=5)
+    logging.info(f"Retrieved {sum(1 for post in posts if post)} of {len(posts)} posts.")
+    logging.info(f"Client stats: {client.get_stats()}")
+    client.close()
+
+    # Stream many endpoints through the asyncio client
+    asyncio.run(fetch_posts_async(client.base_url))
+
 if __name__ == "__main__":
     main()
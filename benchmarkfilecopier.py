@@ -0,0 +1,131 @@
+#Benchmark for copyingfilesinparallel.py
+import os
+import sys
+import json
+import time
+import shutil
+import logging
+import argparse
+import resource
+import tempfile
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from copyingfilesinparallel import FileCopier
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+MB = 1024 * 1024
+
+# Scenario name -> list of (relative directory, file count, file size in bytes), scaled by --scale
+SCENARIOS = {
+    "tiny": [("", 5000, 1024)],
+    "huge": [("", 4, 256 * MB)],
+    "mixed": [("small", 2000, 4 * 1024), ("medium", 100, 2 * MB), ("large", 2, 128 * MB)],
+    "deep": [("/".join(f"d{level}" for level in range(depth)), 50, 8 * 1024) for depth in range(1, 21)],
+}
+
+def generate_tree(root, spec, scale=1.0):
+    """Create a synthetic source tree from a scenario spec and return its total size in bytes."""
+    total = 0
+    block = os.urandom(MB)
+    for directory, count, size in spec:
+        count = max(1, int(count * scale))
+        target = os.path.join(root, directory)
+        os.makedirs(target, exist_ok=True)
+        for i in range(count):
+            with open(os.path.join(target, f"file{i}.bin"), 'wb') as f:
+                remaining = size
+                while remaining > 0:
+                    f.write(block[:min(remaining, MB)])
+                    remaining -= MB
+            total += size
+    return total
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(p / 100 * len(sorted_values)))]
+
+def run_once(source_dir, destination_dir, max_threads, copy_strategy):
+    """Copy a tree once in a fresh process and return its measurements."""
+    logging.getLogger().setLevel(logging.WARNING)
+    latencies = []
+    lock = threading.Lock()
+
+    def on_file_copied(file_path, size, seconds):
+        with lock:
+            latencies.append(seconds)
+
+    copier = FileCopier(source_dir, destination_dir, max_threads=max_threads,
+                        copy_strategy=copy_strategy, on_file_copied=on_file_copied)
+    copier.validate_directories()
+    start = time.perf_counter()
+    report = copier.copy_stream(copier.walk_source_files(recursive=True), progress_interval=3600)
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "files": report.files_copied,
+        "bytes": report.bytes_copied,
+        "failures": len(report.failures),
+        "seconds": elapsed,
+        "files_per_second": report.files_copied / elapsed if elapsed else 0.0,
+        "mb_per_second": report.bytes_copied / MB / elapsed if elapsed else 0.0,
+        "latency_p50": percentile(latencies, 50),
+        "latency_p99": percentile(latencies, 99),
+        # ru_maxrss is in kilobytes on Linux and bytes on macOS
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (MB if sys.platform == "darwin" else 1024),
+    }
+
+def run_benchmark(scenarios, worker_counts, strategies, scale=1.0, work_dir=None):
+    """Run every scenario/worker count/strategy combination and return the results."""
+    results = []
+    root = tempfile.mkdtemp(prefix="filecopier-bench-", dir=work_dir)
+    # Each run gets its own spawned process so peak RSS is measured per run
+    context = multiprocessing.get_context("spawn")
+    try:
+        for scenario in scenarios:
+            source_dir = os.path.join(root, scenario, "source")
+            total_bytes = generate_tree(source_dir, SCENARIOS[scenario], scale)
+            logging.info(f"Generated scenario '{scenario}' ({total_bytes / MB:.1f} MB)")
+            for max_threads in worker_counts:
+                for copy_strategy in strategies:
+                    destination_dir = os.path.join(root, scenario, "destination")
+                    shutil.rmtree(destination_dir, ignore_errors=True)
+                    with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+                        result = executor.submit(run_once, source_dir, destination_dir,
+                                                 max_threads, copy_strategy).result()
+                    result.update(scenario=scenario, max_threads=max_threads, copy_strategy=copy_strategy)
+                    logging.info(f"{scenario} threads={max_threads} strategy={copy_strategy}: "
+                                 f"{result['files_per_second']:.0f} files/s, {result['mb_per_second']:.1f} MB/s")
+                    results.append(result)
+            shutil.rmtree(os.path.join(root, scenario), ignore_errors=True)
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark FileCopier on synthetic trees.")
+    parser.add_argument("--scenarios", nargs="+", default=list(SCENARIOS), choices=list(SCENARIOS))
+    parser.add_argument("--workers", nargs="+", type=int, default=[1, 2, 4, 8])
+    parser.add_argument("--strategies", nargs="+", default=list(FileCopier.COPY_STRATEGIES),
+                        choices=list(FileCopier.COPY_STRATEGIES))
+    parser.add_argument("--scale", type=float, default=1.0, help="Multiply every scenario's file counts")
+    parser.add_argument("--work-dir", default=None, help="Directory for the generated trees")
+    parser.add_argument("--output", default=None, help="Write JSON results here instead of stdout")
+    args = parser.parse_args()
+
+    results = run_benchmark(args.scenarios, args.workers, args.strategies, args.scale, args.work_dir)
+    output = json.dumps({"results": results}, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output)
+        logging.info(f"Results written to {args.output}")
+    else:
+        print(output)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+#Benchmark for htmlextraction.py
+import os
+import json
+import time
+import random
+import logging
+import argparse
+import tempfile
+
+from htmlextraction import BACKENDS, HTMLExtractor, etree
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+WORDS = "lorem ipsum dolor sit amet consectetur adipiscing elit sed do eiusmod tempor".split()
+
+def generate_page(rng, paragraphs):
+    """Build a synthetic page shaped like a typical article: head, nav, headings, body text, scripts."""
+    def sentence(n):
+        return " ".join(rng.choice(WORDS) for _ in range(n))
+
+    parts = [
+        "<!DOCTYPE html><html><head><meta charset='utf-8'>",
+        f"<title>{sentence(6)}</title>",
+        "<link rel='stylesheet' href='/style.css'><script>var x = 1;</script></head><body>",
+        "<nav><ul>" + "".join(f"<li><a href='/p{i}'>{sentence(2)}</a></li>" for i in range(20)) + "</ul></nav>",
+        f"<h1>{sentence(5)}</h1>",
+    ]
+    for i in range(paragraphs):
+        if i % 10 == 0:
+            parts.append(f"<h2 class='section'>{sentence(4)}</h2>")
+        if i % 25 == 5:
+            parts.append(f"<h3><a href='#s{i}'>{sentence(3)}</a></h3>")
+        parts.append(f"<p>{sentence(40)} <b>{sentence(3)}</b> &amp; <a href='/l{i}'>{sentence(2)}</a>.</p>")
+    parts.append("<footer>" + sentence(20) + "</footer></body></html>")
+    return "".join(parts)
+
+def generate_corpus(directory, pages, seed=0):
+    """Write a mix of small, medium and large pages to a directory."""
+    rng = random.Random(seed)
+    for i in range(pages):
+        paragraphs = rng.choice([10, 50, 200, 1000])
+        with open(os.path.join(directory, f"page{i}.html"), 'w', encoding='utf-8') as f:
+            f.write(generate_page(rng, paragraphs))
+
+def load_corpus(directory):
+    pages = []
+    for name in sorted(os.listdir(directory)):
+        if name.endswith((".html", ".htm")):
+            with open(os.path.join(directory, name), encoding='utf-8', errors='replace') as f:
+                pages.append(f.read())
+    return pages
+
+def run_case(pages, backend, kind, processes):
+    with HTMLExtractor(backend, processes=processes) as extractor:
+        if processes:
+            extractor.map(kind, pages[:processes])  # Start the workers before timing
+        start = time.perf_counter()
+        extractor.map(kind, pages)
+        elapsed = time.perf_counter() - start
+    total_mb = sum(len(page) for page in pages) / (1024 * 1024)
+    return {
+        "backend": backend,
+        "kind": kind,
+        "processes": processes,
+        "pages": len(pages),
+        "seconds": elapsed,
+        "pages_per_second": len(pages) / elapsed,
+        "mb_per_second": total_mb / elapsed,
+    }
+
+def main():
+    available = [name for name in BACKENDS if name != "lxml" or etree is not None]
+    parser = argparse.ArgumentParser(description="Compare HTML extraction backends on a local corpus.")
+    parser.add_argument("--corpus", default=None, help="Directory of .html files (a synthetic corpus is generated if omitted)")
+    parser.add_argument("--pages", type=int, default=200, help="Pages to generate for the synthetic corpus")
+    parser.add_argument("--backends", nargs="+", default=available, choices=list(BACKENDS))
+    parser.add_argument("--processes", nargs="+", type=int, default=[0, os.cpu_count() or 1],
+                        help="Process pool sizes to try (0 parses inline)")
+    parser.add_argument("--output", default=None, help="Write JSON results here instead of stdout")
+    args = parser.parse_args()
+
+    if args.corpus:
+        pages = load_corpus(args.corpus)
+    else:
+        with tempfile.TemporaryDirectory() as corpus_dir:
+            generate_corpus(corpus_dir, args.pages)
+            pages = load_corpus(corpus_dir)
+    logging.info(f"Loaded {len(pages)} pages ({sum(map(len, pages)) / (1024 * 1024):.1f} MB)")
+
+    results = []
+    for kind in ("title", "headings"):
+        for backend in args.backends:
+            for processes in args.processes:
+                results.append(run_case(pages, backend, kind, processes))
+                logging.info(f"{kind} backend={backend} processes={processes}: "
+                             f"{results[-1]['pages_per_second']:.0f} pages/s")
+
+    output = json.dumps({"results": results}, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output)
+        logging.info(f"Results written to {args.output}")
+    else:
+        print(output)
+
+if __name__ == "__main__":
+    main()
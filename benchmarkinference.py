@@ -0,0 +1,93 @@
+#Benchmark for machinelearingmodel.py
+import os
+import json
+import time
+import logging
+import argparse
+import tempfile
+import joblib
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+
+from machinelearingmodel import MachineLearningModel, ModelServer
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+def benchmark_row_at_a_time(model_path, rows):
+    """Score rows one predict_proba call at a time."""
+    model = joblib.load(model_path, mmap_mode='r')
+    model.set_params(n_jobs=1)  # Same settings as ModelServer
+    latencies = []
+    start = time.perf_counter()
+    for row in rows:
+        call_start = time.perf_counter()
+        model.predict_proba(row.reshape(1, -1))
+        latencies.append(time.perf_counter() - call_start)
+    elapsed = time.perf_counter() - start
+    return {
+        "mode": "row_at_a_time",
+        "rows": len(rows),
+        "seconds": elapsed,
+        "rows_per_second": len(rows) / elapsed,
+        "latency_p50": float(np.percentile(latencies, 50)),
+        "latency_p99": float(np.percentile(latencies, 99)),
+    }
+
+def benchmark_micro_batched(model_path, rows, clients, max_batch_size, max_wait):
+    """Score rows submitted one at a time by concurrent clients through a ModelServer."""
+    with ModelServer(model_path, max_batch_size=max_batch_size, max_wait=max_wait) as server:
+        def client(client_rows):
+            for row in client_rows:
+                server.predict(row)
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=clients) as executor:
+            list(executor.map(client, np.array_split(rows, clients)))
+        elapsed = time.perf_counter() - start
+        stats = server.get_stats()
+    return {
+        "mode": "micro_batched",
+        "rows": len(rows),
+        "clients": clients,
+        "max_batch_size": max_batch_size,
+        "max_wait": max_wait,
+        "seconds": elapsed,
+        "rows_per_second": len(rows) / elapsed,
+        "latency_p50": stats["latency_p50"],
+        "latency_p99": stats["latency_p99"],
+        "batch_sizes": {str(size): count for size, count in stats["batch_sizes"].items()},
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare row-at-a-time and micro-batched inference.")
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--clients", nargs="+", type=int, default=[1, 16, 64])
+    parser.add_argument("--max-batch-size", type=int, default=256)
+    parser.add_argument("--max-wait", type=float, default=0.002)
+    parser.add_argument("--output", default=None, help="Write JSON results here instead of stdout")
+    args = parser.parse_args()
+
+    ml_model = MachineLearningModel(cache_dir=None)
+    ml_model.model.fit(ml_model.X, ml_model.y)
+    rng = np.random.default_rng(0)
+    rows = ml_model.X[rng.integers(0, len(ml_model.X), args.rows)]
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        model_path = ml_model.save_model(os.path.join(work_dir, "model.joblib"))
+        results = [benchmark_row_at_a_time(model_path, rows)]
+        logging.info(f"Row at a time: {results[-1]['rows_per_second']:.0f} rows/s")
+        for clients in args.clients:
+            results.append(benchmark_micro_batched(model_path, rows, clients, args.max_batch_size, args.max_wait))
+            logging.info(f"Micro-batched with {clients} clients: {results[-1]['rows_per_second']:.0f} rows/s")
+
+    output = json.dumps({"results": results}, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output)
+        logging.info(f"Results written to {args.output}")
+    else:
+        print(output)
+
+if __name__ == "__main__":
+    main()
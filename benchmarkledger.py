@@ -0,0 +1,159 @@
+#Benchmark for the durable ledger in simplebankaccountsystem.py
+import os
+import json
+import time
+import random
+import shutil
+import logging
+import argparse
+import tempfile
+import threading
+
+from simplebankaccountsystem import DurableAccountStore, InsufficientFundsError, WriteAheadLog
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+def directory_size(directory):
+    return sum(os.path.getsize(os.path.join(directory, name)) for name in os.listdir(directory))
+
+def run_workload(store, accounts, operations, threads, batch_size, seed=0):
+    """Apply random transfers (and some deposits) from several threads; return (seconds, operations run)."""
+    def worker(index, count):
+        rng = random.Random(seed + index)
+        batch = []
+        for _ in range(count):
+            source, target = rng.randrange(accounts), rng.randrange(accounts)
+            if source == target:
+                transaction = ("deposit", source, rng.randrange(1, 1000))
+            else:
+                transaction = ("transfer", source, target, rng.randrange(1, 1000))
+            try:
+                if batch_size > 1:
+                    batch.append(transaction)
+                    if len(batch) == batch_size:
+                        store.apply_batch(batch)
+                        batch = []
+                elif transaction[0] == "deposit":
+                    store.deposit(transaction[1], transaction[2])
+                else:
+                    store.transfer(*transaction[1:])
+            except InsufficientFundsError:
+                batch = []
+        if batch:
+            try:
+                store.apply_batch(batch)
+            except InsufficientFundsError:
+                pass
+
+    per_thread = operations // threads
+    workers = [threading.Thread(target=worker, args=(i, per_thread)) for i in range(threads)]
+    start = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    return time.perf_counter() - start, per_thread * threads
+
+def run_throughput(work_dir, policy, operations, threads, batch_size, accounts, group_commit_delay):
+    """Measure ops/s for one fsync policy, then reopen the directory to check recovery."""
+    directory = tempfile.mkdtemp(prefix=f"ledger-{policy}-", dir=work_dir)
+    try:
+        store = DurableAccountStore(directory, fsync=policy, group_commit_delay=group_commit_delay,
+                                    snapshot_every=None)
+        store.open_accounts(accounts, balance=1000000)
+        elapsed, operations = run_workload(store, accounts, operations, threads, batch_size)
+        expected = store.balances[:]
+        writes, fsyncs = store.wal.writes, store.wal.fsyncs
+        store.close()
+
+        recovered = DurableAccountStore(directory)
+        consistent = recovered.balances == expected
+        recovered.close()
+        return {
+            "policy": policy,
+            "threads": threads,
+            "batch_size": batch_size,
+            "operations": operations,
+            "seconds": elapsed,
+            "ops_per_second": operations / elapsed,
+            "writes": writes,
+            "fsyncs": fsyncs,
+            "ops_per_fsync": operations / fsyncs if fsyncs else None,
+            "wal_mb": directory_size(directory) / (1024 * 1024),
+            "recovered_consistent": consistent,
+        }
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+def run_recovery(work_dir, operations, accounts, snapshot_every):
+    """Journal `operations` transactions, then time recovery with and without snapshots."""
+    directory = tempfile.mkdtemp(prefix="ledger-recovery-", dir=work_dir)
+    try:
+        store = DurableAccountStore(directory, fsync="never", snapshot_every=snapshot_every)
+        store.open_accounts(accounts, balance=1000000)
+        elapsed, operations = run_workload(store, accounts, operations, 1, 1)
+        expected = store.balances[:]
+        store.close()
+
+        recovered = DurableAccountStore(directory)
+        stats = dict(recovered.recovery_stats)
+        consistent = recovered.balances == expected
+        recovered.close()
+        return {
+            "snapshot_every": snapshot_every,
+            "journaled_operations": operations,
+            "journal_ops_per_second": operations / elapsed,
+            "on_disk_mb": directory_size(directory) / (1024 * 1024),
+            "wal_segments": len(WriteAheadLog.list_segments(directory)),
+            "recovery_seconds": stats["seconds"],
+            "replayed_records": stats["replayed_records"],
+            "recovered_consistent": consistent,
+        }
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark ledger WAL throughput and recovery time.")
+    parser.add_argument("--operations", type=int, default=1000000, help="Operations for the interval/never policies and recovery runs")
+    parser.add_argument("--always-operations", type=int, default=50000, help="Operations for the fsync=always runs")
+    parser.add_argument("--accounts", type=int, default=100000)
+    parser.add_argument("--threads", nargs="+", type=int, default=[1, 16])
+    parser.add_argument("--batch-size", type=int, default=100, help="Transactions per apply_batch in the batched run")
+    parser.add_argument("--group-commit-delay", type=float, default=0.0)
+    parser.add_argument("--snapshot-every", nargs="+", type=int, default=[0, 300000],
+                        help="Snapshot intervals for the recovery runs (0 disables snapshots)")
+    parser.add_argument("--work-dir", default=None, help="Directory on the filesystem to test")
+    parser.add_argument("--output", default=None, help="Write JSON results here instead of stdout")
+    args = parser.parse_args()
+    # The ledger logs every batch at DEBUG (and configures logging first on import); keep its
+    # recovery and snapshot messages but not the per-batch noise
+    logging.getLogger().setLevel(logging.INFO)
+
+    throughput = []
+    for policy in WriteAheadLog.FSYNC_POLICIES:
+        operations = args.always_operations if policy == "always" else args.operations
+        for threads in args.threads:
+            throughput.append(run_throughput(args.work_dir, policy, operations, threads, 1,
+                                             args.accounts, args.group_commit_delay))
+            logging.info(f"fsync={policy} threads={threads}: {throughput[-1]['ops_per_second']:.0f} ops/s")
+        throughput.append(run_throughput(args.work_dir, policy, operations, 1, args.batch_size,
+                                         args.accounts, args.group_commit_delay))
+        logging.info(f"fsync={policy} batch={args.batch_size}: {throughput[-1]['ops_per_second']:.0f} ops/s")
+
+    recovery = []
+    for snapshot_every in args.snapshot_every:
+        recovery.append(run_recovery(args.work_dir, args.operations, args.accounts, snapshot_every or None))
+        logging.info(f"snapshot_every={snapshot_every}: recovery {recovery[-1]['recovery_seconds']:.2f}s "
+                     f"({recovery[-1]['replayed_records']} records replayed)")
+
+    output = json.dumps({"throughput": throughput, "recovery": recovery}, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output)
+        logging.info(f"Results written to {args.output}")
+    else:
+        print(output)
+
+if __name__ == "__main__":
+    main()
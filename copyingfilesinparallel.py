@@ -1,6 +1,11 @@
 #Chat gpt
 import os
+import json
+import errno
 import shutil
+import hashlib
+import queue
+import time
 import threading
 import logging
 from pathlib import Path
@@ -12,12 +17,218 @@ class FileCopyError(Exception):
     """Custom exception for file copy errors."""
     pass
 
+class CopyReport:
+    """Thread-safe summary of a copy run, including errors raised in worker threads."""
+
+    def __init__(self):
+        self.files_copied = 0
+        self.bytes_copied = 0
+        self.failures = []  # (path, error message)
+        self.lock = threading.Lock()
+
+    def record_success(self, file_path, size):
+        with self.lock:
+            self.files_copied += 1
+            self.bytes_copied += size
+
+    def record_failure(self, file_path, error):
+        with self.lock:
+            self.failures.append((str(file_path), str(error)))
+
+    @property
+    def succeeded(self):
+        return not self.failures
+
+    def __str__(self):
+        return (f"CopyReport(files_copied={self.files_copied}, bytes_copied={self.bytes_copied}, "
+                f"failures={len(self.failures)})")
+
+class CopyProgress:
+    """Live counters for a copy run, used to report files/s, MB/s and ETA."""
+
+    def __init__(self):
+        self.start_time = time.monotonic()
+        self.files_found = 0
+        self.bytes_found = 0
+        self.files_done = 0
+        self.bytes_done = 0
+        self.scan_complete = False
+        self.lock = threading.Lock()
+
+    def discover(self, size):
+        with self.lock:
+            self.files_found += 1
+            self.bytes_found += size
+
+    def advance(self, files=0, nbytes=0):
+        with self.lock:
+            self.files_done += files
+            self.bytes_done += nbytes
+
+    def snapshot(self):
+        """Return the current counters, rates and ETA in seconds (None while it cannot be estimated)."""
+        with self.lock:
+            elapsed = max(time.monotonic() - self.start_time, 1e-9)
+            bytes_per_second = self.bytes_done / elapsed
+            remaining = self.bytes_found - self.bytes_done
+            eta = remaining / bytes_per_second if bytes_per_second > 0 else None
+            return {
+                "files_found": self.files_found,
+                "files_done": self.files_done,
+                "bytes_done": self.bytes_done,
+                "elapsed": elapsed,
+                "files_per_second": self.files_done / elapsed,
+                "mb_per_second": bytes_per_second / (1024 * 1024),
+                "eta": eta,
+                "scan_complete": self.scan_complete,
+            }
+
+    def __str__(self):
+        snap = self.snapshot()
+        if snap["eta"] is None:
+            eta = "unknown"
+        else:
+            # Until the scan finishes the ETA only covers the files found so far
+            eta = f"{snap['eta']:.1f}s" if snap["scan_complete"] else f">={snap['eta']:.1f}s"
+        return (f"{snap['files_done']}/{snap['files_found']} files, {snap['bytes_done'] / (1024 * 1024):.1f} MB, "
+                f"{snap['files_per_second']:.1f} files/s, {snap['mb_per_second']:.1f} MB/s, ETA {eta}")
+
+class LargeFileCopy:
+    """Tracks the outstanding chunks of one large file copied in parallel."""
+
+    def __init__(self, file_path, dest_path, size, chunk_size):
+        self.file_path = file_path
+        self.dest_path = dest_path
+        self.size = size
+        self.chunks = max(1, -(-size // chunk_size))
+        self.remaining = self.chunks
+        self.error = None
+        self.start_time = None  # perf_counter() when the first chunk started
+        self.lock = threading.Lock()
+
+    def chunk_started(self):
+        with self.lock:
+            if self.start_time is None:
+                self.start_time = time.perf_counter()
+
+    def chunk_done(self, error=None):
+        """Mark a chunk finished, returning True when it was the last one."""
+        with self.lock:
+            if error is not None and self.error is None:
+                self.error = error
+            self.remaining -= 1
+            return self.remaining == 0
+
+class SyncManifest:
+    """Persistent index of copied files (relative path, size, mtime and optional content hash).
+
+    Every completed copy is appended to a journal file straight away, so an
+    interrupted sync can resume from where it stopped. `compact` rewrites the
+    journal as one line per live entry.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.entries = {}  # relative path -> {"size", "mtime_ns", "hash"}
+        self.journal = None
+        self.lock = threading.Lock()
+
+    def load(self):
+        """Load entries from the journal, ignoring a torn final line."""
+        if not self.path.exists():
+            return
+        with open(self.path, 'r') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    logging.warning(f"Skipping corrupt manifest line in {self.path}")
+                    continue
+                if record.get("deleted"):
+                    self.entries.pop(record["path"], None)
+                else:
+                    self.entries[record.pop("path")] = record
+        logging.info(f"Loaded {len(self.entries)} entries from manifest {self.path}")
+
+    def open(self):
+        self.journal = open(self.path, 'a')
+
+    def close(self):
+        if self.journal is not None:
+            self.journal.close()
+            self.journal = None
+
+    def _append(self, record):
+        self.journal.write(json.dumps(record) + "\n")
+        self.journal.flush()
+
+    def get(self, rel_path):
+        return self.entries.get(rel_path)
+
+    def record(self, rel_path, size, mtime_ns, digest=None):
+        entry = {"size": size, "mtime_ns": mtime_ns, "hash": digest}
+        with self.lock:
+            self.entries[rel_path] = entry
+            self._append({"path": rel_path, **entry})
+
+    def remove(self, rel_path):
+        with self.lock:
+            if self.entries.pop(rel_path, None) is not None:
+                self._append({"path": rel_path, "deleted": True})
+
+    def compact(self):
+        """Atomically rewrite the journal with only the current entries."""
+        with self.lock:
+            reopen = self.journal is not None
+            self.close()
+            tmp_path = self.path.with_name(self.path.name + ".tmp")
+            with open(tmp_path, 'w') as f:
+                for rel_path, entry in self.entries.items():
+                    f.write(json.dumps({"path": rel_path, **entry}) + "\n")
+            os.replace(tmp_path, self.path)
+            if reopen:
+                self.open()
+
+def file_digest(file_path, buffer_size=1024 * 1024):
+    """Return the SHA-256 hex digest of a file's contents."""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(buffer_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+# Errors meaning a kernel copy primitive is unsupported for this pair of files
+_FAST_PATH_UNSUPPORTED = {errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP, errno.EBADF, errno.ENOTSUP}
+
 class FileCopier:
-    def __init__(self, source_dir, destination_dir, max_threads=4):
+    COPY_STRATEGIES = ("auto", "copy_file_range", "sendfile", "buffered")
+    MANIFEST_NAME = ".filecopier_manifest.jsonl"
+
+    def __init__(self, source_dir, destination_dir, max_threads=4, batch_size=64,
+                 small_file_threshold=1024 * 1024, large_file_threshold=128 * 1024 * 1024,
+                 chunk_size=32 * 1024 * 1024, buffer_size=1024 * 1024, copy_strategy="auto",
+                 on_file_copied=None):
+        if copy_strategy not in self.COPY_STRATEGIES:
+            raise FileCopyError(f"Unknown copy strategy {copy_strategy!r}; expected one of {self.COPY_STRATEGIES}.")
         self.source_dir = Path(source_dir)
         self.destination_dir = Path(destination_dir)
         self.max_threads = max_threads
+        self.batch_size = batch_size  # Number of small files copied per worker task
+        self.small_file_threshold = small_file_threshold
+        self.large_file_threshold = large_file_threshold  # Files at least this big are copied in parallel chunks
+        self.chunk_size = chunk_size
+        self.buffer_size = buffer_size
+        self.copy_strategy = copy_strategy
+        # Optional instrumentation hook, called from worker threads as on_file_copied(path, size, seconds)
+        self.on_file_copied = on_file_copied
         self.files_to_copy = []
+        self.report = CopyReport()
+        self.progress = CopyProgress()
+        self.created_dirs = set()
+        # Set while syncing: completed copies are recorded in the manifest
+        self.manifest = None
+        self.use_hash = False
+        self.pending_stats = {}  # file path -> (size, mtime_ns) observed when the sync was planned
 
     def validate_directories(self):
         """Validate if source and destination directories exist."""
@@ -27,44 +238,384 @@ class FileCopier:
             os.makedirs(self.destination_dir)
             logging.info(f"Created destination directory: {self.destination_dir}")
     
-    def get_files_to_copy(self):
+    def walk_source_files(self, recursive=True):
+        """Yield (path, stat result) for every regular file under the source directory."""
+        stack = [self.source_dir]
+        while stack:
+            directory = stack.pop()
+            try:
+                with os.scandir(directory) as entries:
+                    for entry in entries:
+                        if entry.is_file(follow_symlinks=False):
+                            yield Path(entry.path), entry.stat(follow_symlinks=False)
+                        elif recursive and entry.is_dir(follow_symlinks=False):
+                            stack.append(entry.path)
+            except OSError as e:
+                logging.error(f"Failed to scan {directory}: {e}")
+                self.report.record_failure(directory, e)
+
+    def get_files_to_copy(self, recursive=False):
         """Get all files in the source directory to copy."""
-        self.files_to_copy = [file for file in self.source_dir.iterdir() if file.is_file()]
+        self.files_to_copy = [file for file, _ in self.walk_source_files(recursive)]
         logging.info(f"Found {len(self.files_to_copy)} files to copy.")
     
+    def get_destination_path(self, file_path):
+        """Return the destination path for a source file."""
+        return self.destination_dir / file_path.relative_to(self.source_dir)
+
+    def get_relative_path(self, file_path):
+        return file_path.relative_to(self.source_dir).as_posix()
+
+    def _ensure_parent(self, dest_path):
+        parent = dest_path.parent
+        if parent not in self.created_dirs:
+            parent.mkdir(parents=True, exist_ok=True)
+            self.created_dirs.add(parent)
+
+    def _record_copied(self, file_path, size, seconds):
+        """Record a completed copy in the report and, when syncing, in the manifest.
+
+        The hook and the digest run first, so a file whose bookkeeping raises is
+        reported as a failure only, not as both copied and failed.
+        """
+        if self.on_file_copied is not None:
+            self.on_file_copied(file_path, size, seconds)
+        if self.manifest is not None:
+            manifest_size, mtime_ns = self.pending_stats.pop(file_path, (size, None))
+            digest = file_digest(file_path) if self.use_hash else None
+        self.report.record_success(file_path, size)
+        if self.manifest is not None:
+            self.manifest.record(self.get_relative_path(file_path), manifest_size, mtime_ns, digest)
+
+    def _copy_range(self, src_fd, dst_fd, offset, length):
+        """Copy `length` bytes at `offset` between two descriptors using the fastest available path."""
+        end = offset + length
+        strategy = self.copy_strategy
+
+        if strategy in ("auto", "copy_file_range") and hasattr(os, "copy_file_range"):
+            try:
+                while offset < end:
+                    copied = os.copy_file_range(src_fd, dst_fd, end - offset, offset, offset)
+                    if copied == 0:
+                        return
+                    offset += copied
+                return
+            except OSError as e:
+                if e.errno not in _FAST_PATH_UNSUPPORTED:
+                    raise
+
+        if strategy in ("auto", "sendfile") and hasattr(os, "sendfile"):
+            try:
+                os.lseek(dst_fd, offset, os.SEEK_SET)
+                while offset < end:
+                    sent = os.sendfile(dst_fd, src_fd, offset, min(end - offset, self.chunk_size))
+                    if sent == 0:
+                        return
+                    offset += sent
+                return
+            except OSError as e:
+                if e.errno not in _FAST_PATH_UNSUPPORTED:
+                    raise
+
+        # Buffered fallback
+        while offset < end:
+            data = os.pread(src_fd, min(self.buffer_size, end - offset), offset)
+            if not data:
+                return
+            written = 0
+            while written < len(data):
+                written += os.pwrite(dst_fd, memoryview(data)[written:], offset + written)
+            offset += len(data)
+
+    def _copy_chunk(self, file_path, dest_path, offset, length):
+        """Copy one byte range of a large file into its preallocated destination."""
+        src_fd = os.open(file_path, os.O_RDONLY)
+        try:
+            dst_fd = os.open(dest_path, os.O_WRONLY)
+            try:
+                self._copy_range(src_fd, dst_fd, offset, length)
+            finally:
+                os.close(dst_fd)
+        finally:
+            os.close(src_fd)
+
     def copy_file(self, file_path):
         """Copy a single file to the destination directory."""
         try:
-            dest_path = self.destination_dir / file_path.name
-            shutil.copy(file_path, dest_path)
-            logging.info(f"Successfully copied {file_path.name} to {self.destination_dir}")
+            dest_path = self.get_destination_path(file_path)
+            self._ensure_parent(dest_path)
+            size = os.stat(file_path).st_size
+            src_fd = os.open(file_path, os.O_RDONLY)
+            try:
+                dst_fd = os.open(dest_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o666)
+                try:
+                    self._copy_range(src_fd, dst_fd, 0, size)
+                finally:
+                    os.close(dst_fd)
+            finally:
+                os.close(src_fd)
+            shutil.copymode(file_path, dest_path)
+            logging.debug(f"Successfully copied {file_path.name} to {dest_path.parent}")
+            return size
         except Exception as e:
             logging.error(f"Failed to copy {file_path.name}: {e}")
             raise FileCopyError(f"Error copying {file_path.name}: {e}")
 
+    def copy_batch(self, batch):
+        """Copy a batch of small files, recording each result in the report."""
+        for file_path in batch:
+            try:
+                start = time.perf_counter()
+                size = self.copy_file(file_path)
+                self._record_copied(file_path, size, time.perf_counter() - start)
+                self.progress.advance(files=1, nbytes=size)
+            except FileCopyError as e:
+                self.report.record_failure(file_path, e)
+                self.progress.advance(files=1)
+            except Exception as e:
+                # E.g. the on_file_copied hook or the manifest digest; keep going with the rest of the batch
+                logging.error(f"Failed to record copy of {file_path.name}: {e}")
+                self.report.record_failure(file_path, e)
+                self.progress.advance(files=1)
+
+    def copy_large_chunk(self, large_file, offset, length):
+        """Copy one chunk of a large file, finalizing the file after its last chunk."""
+        error = None
+        large_file.chunk_started()
+        try:
+            self._copy_chunk(large_file.file_path, large_file.dest_path, offset, length)
+            self.progress.advance(nbytes=length)
+        except Exception as e:
+            error = e
+        if not large_file.chunk_done(error):
+            return
+        file_path = large_file.file_path
+        try:
+            if large_file.error is not None:
+                raise large_file.error
+            shutil.copymode(file_path, large_file.dest_path)
+            logging.debug(f"Successfully copied {file_path.name} in {large_file.chunks} chunks")
+            self._record_copied(file_path, large_file.size, time.perf_counter() - large_file.start_time)
+        except Exception as e:
+            logging.error(f"Failed to copy {file_path.name}: {e}")
+            self.report.record_failure(file_path, e)
+        self.progress.advance(files=1)
+
+    def plan_work(self, entries):
+        """Turn a stream of (path, stat result) pairs into batch and chunk work items."""
+        batch = []
+        try:
+            for file_path, stat_result in entries:
+                yield from self._plan_entry(file_path, stat_result, batch)
+                if len(batch) >= self.batch_size:
+                    yield self.copy_batch, (batch,)
+                    batch = []
+        except Exception:
+            # Still copy what was found before the scan failed
+            if batch:
+                yield self.copy_batch, (batch,)
+            raise
+        if batch:
+            yield self.copy_batch, (batch,)
+
+    def _plan_entry(self, file_path, stat_result, batch):
+        """Yield the work items for one file, or append it to `batch` if it is small."""
+        size = stat_result.st_size
+        self.progress.discover(size)
+        if size >= self.large_file_threshold:
+            try:
+                dest_path = self.get_destination_path(file_path)
+                self._ensure_parent(dest_path)
+                with open(dest_path, 'wb') as f:
+                    f.truncate(size)  # Preallocate so chunks can be written independently
+            except OSError as e:
+                logging.error(f"Failed to copy {file_path.name}: {e}")
+                self.report.record_failure(file_path, e)
+                self.progress.advance(files=1)
+                return
+            large_file = LargeFileCopy(file_path, dest_path, size, self.chunk_size)
+            for offset in range(0, size, self.chunk_size):
+                yield self.copy_large_chunk, (large_file, offset, min(self.chunk_size, size - offset))
+        elif size >= self.small_file_threshold:
+            # Files between the two thresholds get a work item of their own
+            yield self.copy_batch, ([file_path],)
+        else:
+            batch.append(file_path)
+
+    def _worker(self, work_queue):
+        while True:
+            item = work_queue.get()
+            if item is None:
+                return
+            func, args = item
+            try:
+                func(*args)
+            except Exception as e:
+                # Work items record their own errors; this only guards the worker loop
+                logging.error(f"Unexpected error in copy worker: {e}")
+
+    def copy_stream(self, entries, queue_size=1024, progress_interval=5.0):
+        """Copy a stream of (path, stat result) pairs through a bounded producer/consumer pipeline.
+
+        A scanner thread plans work items from `entries` into a queue of at most
+        `queue_size` items, `max_threads` workers copy from it, and progress is
+        logged every `progress_interval` seconds. Copying starts as soon as the
+        first batch is planned, and memory stays bounded by the queue size.
+        """
+        self.report = CopyReport()
+        self.progress = CopyProgress()
+        work_queue = queue.Queue(maxsize=queue_size)
+        finished = threading.Event()
+
+        def scan():
+            try:
+                for item in self.plan_work(entries):
+                    work_queue.put(item)  # Blocks while workers are behind
+            except Exception as e:
+                logging.error(f"Failed to scan {self.source_dir}: {e}")
+                self.report.record_failure(self.source_dir, e)
+            finally:
+                self.progress.scan_complete = True
+                for _ in range(self.max_threads):
+                    work_queue.put(None)
+
+        def report_progress():
+            while not finished.wait(progress_interval):
+                logging.info(f"Progress: {self.progress}")
+
+        scanner = threading.Thread(target=scan, name="copy-scanner", daemon=True)
+        workers = [threading.Thread(target=self._worker, args=(work_queue,), name=f"copy-worker-{i}", daemon=True)
+                   for i in range(self.max_threads)]
+        reporter = threading.Thread(target=report_progress, name="copy-progress", daemon=True)
+        scanner.start()
+        for worker in workers:
+            worker.start()
+        reporter.start()
+
+        scanner.join()
+        for worker in workers:
+            worker.join()
+        finished.set()
+        reporter.join()
+        logging.info(f"Finished: {self.progress}")
+        return self.report
+
     def copy_files_concurrently(self):
-        """Copy files concurrently using threading."""
-        threads = []
-        for file in self.files_to_copy:
-            thread = threading.Thread(target=self.copy_file, args=(file,))
-            threads.append(thread)
-            thread.start()
-
-        # Wait for all threads to complete
-        for thread in threads:
-            thread.join()
-
-    def run(self):
+        """Copy `files_to_copy` on a bounded pool of `max_threads` workers.
+
+        Small files are grouped into batches, large files are split into chunks
+        copied in parallel, and every error is collected into `self.report`.
+        """
+        def entries():
+            for file_path in self.files_to_copy:
+                try:
+                    yield file_path, file_path.stat()
+                except OSError as e:
+                    logging.error(f"Failed to copy {file_path.name}: {e}")
+                    self.report.record_failure(file_path, e)
+
+        return self.copy_stream(entries())
+
+    def is_up_to_date(self, file_path, stat_result):
+        """Return True if the destination already holds this version of the source file."""
+        rel_path = self.get_relative_path(file_path)
+        entry = self.manifest.get(rel_path)
+        if entry is None or entry["size"] != stat_result.st_size:
+            return False
+        try:
+            if self.get_destination_path(file_path).stat().st_size != stat_result.st_size:
+                return False
+        except FileNotFoundError:
+            return False
+        if entry["mtime_ns"] == stat_result.st_mtime_ns:
+            return True
+        # Same size but touched: with hashing enabled, an identical hash means no copy is needed
+        if self.use_hash and entry.get("hash") and entry["hash"] == file_digest(file_path):
+            self.manifest.record(rel_path, stat_result.st_size, stat_result.st_mtime_ns, entry["hash"])
+            return True
+        return False
+
+    def delete_orphans(self, source_paths):
+        """Delete destination files (and emptied directories) that no longer exist in the source."""
+        deleted = 0
+        for dirpath, dirnames, filenames in os.walk(self.destination_dir, topdown=False):
+            directory = Path(dirpath)
+            for name in filenames:
+                dest_path = directory / name
+                rel_path = dest_path.relative_to(self.destination_dir).as_posix()
+                if rel_path == self.MANIFEST_NAME or rel_path in source_paths:
+                    continue
+                try:
+                    dest_path.unlink()
+                    deleted += 1
+                    logging.debug(f"Deleted orphaned file {dest_path}")
+                except OSError as e:
+                    logging.error(f"Failed to delete orphaned file {dest_path}: {e}")
+                self.manifest.remove(rel_path)
+            if directory != self.destination_dir and not (self.source_dir / directory.relative_to(self.destination_dir)).is_dir():
+                try:
+                    directory.rmdir()
+                except OSError:
+                    pass  # Not empty
+        logging.info(f"Deleted {deleted} orphaned files from {self.destination_dir}")
+        return deleted
+
+    def sync(self, delete_orphans=False, use_hash=False):
+        """Recursively copy only new or changed files, tracked by a manifest in the destination.
+
+        Files are compared by size and mtime against the manifest; with `use_hash`
+        a content hash is also stored and used to skip files that were only touched.
+        Re-running after an interruption resumes from the manifest.
+        """
+        self.validate_directories()
+        self.manifest = SyncManifest(self.destination_dir / self.MANIFEST_NAME)
+        self.use_hash = use_hash
+        self.manifest.load()
+        self.manifest.open()
+        try:
+            source_paths = set()
+            skipped = 0
+
+            def changed_files():
+                nonlocal skipped
+                for file_path, stat_result in self.walk_source_files(recursive=True):
+                    source_paths.add(self.get_relative_path(file_path))
+                    if self.is_up_to_date(file_path, stat_result):
+                        skipped += 1
+                        continue
+                    self.pending_stats[file_path] = (stat_result.st_size, stat_result.st_mtime_ns)
+                    yield file_path, stat_result
+
+            report = self.copy_stream(changed_files())
+            logging.info(f"Sync: {report.files_copied} files copied, {skipped} unchanged.")
+            if delete_orphans and report.succeeded:
+                self.delete_orphans(source_paths)
+            elif delete_orphans:
+                logging.warning("Skipping orphan deletion because the sync had failures.")
+            self.manifest.compact()
+            return report
+        finally:
+            self.manifest.close()
+            self.manifest = None
+            self.pending_stats.clear()
+
+    def run(self, recursive=False):
         """Run the file copying process."""
         try:
             self.validate_directories()
-            self.get_files_to_copy()
-            self.copy_files_concurrently()
-            logging.info("File copy operation completed successfully.")
+            # Stream directory entries straight into the copy workers
+            report = self.copy_stream(self.walk_source_files(recursive))
+            if report.succeeded:
+                logging.info(f"File copy operation completed successfully: {report}")
+            else:
+                logging.error(f"File copy operation finished with {len(report.failures)} failures: {report}")
+                for file_path, error in report.failures:
+                    logging.error(f"  {file_path}: {error}")
         except FileCopyError as e:
             logging.error(f"File copy operation failed: {e}")
         except Exception as e:
             logging.error(f"Unexpected error: {e}")
+        return self.report
 
 # Example usage
 def main():
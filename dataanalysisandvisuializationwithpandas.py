@@ -1,7 +1,25 @@
 #Chatgpt
+import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+import os
+import re
+import math
+import json
+import time
+import hashlib
 import logging
+from concurrent.futures import ProcessPoolExecutor
+from pandas.api.types import union_categoricals
+
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+except ImportError:  # The columnar cache is optional
+    pa = None
+    feather = None
 
 # Configure logging
 logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -10,26 +28,533 @@ class DataAnalysisError(Exception):
     """Custom exception for data analysis errors."""
     pass
 
+class QuantileSketch:
+    """Mergeable t-digest style quantile sketch.
+
+    Values are kept as weighted centroids. Once more than `10 * compression`
+    centroids accumulate, neighbours are merged into bins of the arcsine scale
+    function, which keeps centroids small near the tails and larger around the
+    median. Quantiles are interpolated between centroid centres using the same
+    linear convention as pandas, so they are exact until the first compression.
+    After that the rank error is at most about pi / (2 * compression) near the
+    median (0.3% at the default of 500) and shrinks towards the tails; each
+    further round of merging can add about as much again, so chunked or
+    merged summaries stay within roughly pi / compression for continuous data.
+    """
+
+    def __init__(self, compression=500):
+        self.compression = compression
+        self.means = np.empty(0)
+        self.weights = np.empty(0)
+        self.min = np.nan
+        self.max = np.nan
+
+    def _add(self, means, weights):
+        """Merge sorted centroids into the existing sorted centroids in linear time."""
+        total = len(self.means) + len(means)
+        positions = np.searchsorted(self.means, means, side='right') + np.arange(len(means))
+        is_new = np.zeros(total, dtype=bool)
+        is_new[positions] = True
+        merged_means = np.empty(total)
+        merged_weights = np.empty(total)
+        merged_means[positions] = means
+        merged_weights[positions] = weights
+        merged_means[~is_new] = self.means
+        merged_weights[~is_new] = self.weights
+        self.means, self.weights = merged_means, merged_weights
+        if len(self.means) > 10 * self.compression:
+            self._compress()
+
+    def _compress(self):
+        total = self.weights.sum()
+        q_left = (np.cumsum(self.weights) - self.weights) / total
+        k = self.compression / (2 * math.pi) * np.arcsin(2 * q_left - 1)
+        bins = np.floor(k - k[0]).astype(np.int64)
+        starts = np.concatenate([[0], np.flatnonzero(np.diff(bins)) + 1])
+        weights = np.add.reduceat(self.weights, starts)
+        self.means = np.add.reduceat(self.means * self.weights, starts) / weights
+        self.weights = weights
+
+    def update(self, values):
+        """Add an array of non-null values."""
+        if len(values) == 0:
+            return
+        self.min = np.fmin(self.min, values.min())
+        self.max = np.fmax(self.max, values.max())
+        self._add(np.sort(np.asarray(values, dtype='float64')), np.ones(len(values)))
+
+    def merge(self, other):
+        """Fold another sketch into this one."""
+        if len(other.means) == 0:
+            return
+        self.min = np.fmin(self.min, other.min)
+        self.max = np.fmax(self.max, other.max)
+        self._add(other.means, other.weights)
+
+    def quantile(self, q):
+        """Return the approximate q-quantile (0 <= q <= 1)."""
+        if len(self.means) == 0:
+            return np.nan
+        total = self.weights.sum()
+        centers = np.cumsum(self.weights) - self.weights / 2
+        # Rank q * (n - 1) in pandas' 0-based linear convention, shifted to centroid centres
+        rank = q * (total - 1) + 0.5
+        return float(np.interp(rank, np.concatenate([[0.0], centers, [total]]),
+                               np.concatenate([[self.min], self.means, [self.max]])))
+
+class ColumnStats:
+    """Count, mean, M2 (sum of squared deviations), min, max and a quantile sketch for one column."""
+
+    def __init__(self, compression=500):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = np.nan
+        self.max = np.nan
+        self.sketch = QuantileSketch(compression)
+
+    def merge_moments(self, count, mean, m2, minimum, maximum):
+        """Combine moments with Chan et al.'s pairwise update."""
+        if count == 0:
+            return
+        total = self.count + count
+        delta = mean - self.mean
+        self.mean += delta * count / total
+        self.m2 += m2 + delta ** 2 * self.count * count / total
+        self.count = total
+        self.min = np.fmin(self.min, minimum)
+        self.max = np.fmax(self.max, maximum)
+
+    def merge(self, other):
+        self.merge_moments(other.count, other.mean, other.m2, other.min, other.max)
+        self.sketch.merge(other.sketch)
+
+    @property
+    def std(self):
+        return math.sqrt(self.m2 / (self.count - 1)) if self.count > 1 else np.nan
+
+class StreamingStats:
+    """Single-pass, mergeable replacement for `describe()` plus `isnull().sum()`.
+
+    Feed DataFrame chunks to `update`; partial results from other chunks or
+    files can be combined with `merge`. count, mean, std, min and max match
+    `describe()` up to floating-point rounding; the quartiles carry the error
+    bound documented on QuantileSketch.
+    """
+
+    def __init__(self, compression=500):
+        self.compression = compression
+        self.columns = {}  # numeric column name -> ColumnStats
+        self.null_counts = {}  # column name -> missing values
+
+    def update(self, chunk):
+        """Accumulate one DataFrame chunk in a single vectorized pass per statistic."""
+        for column, nulls in chunk.isnull().sum().items():
+            self.null_counts[column] = self.null_counts.get(column, 0) + int(nulls)
+        numeric = chunk.select_dtypes(include='number')
+        if numeric.empty:
+            for column in numeric.columns:
+                self.columns.setdefault(column, ColumnStats(self.compression))
+            return
+
+        values = numeric.to_numpy(dtype='float64', na_value=np.nan)
+        mask = ~np.isnan(values)
+        counts = mask.sum(axis=0)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            means = np.where(mask, values, 0.0).sum(axis=0) / counts
+            m2 = (np.where(mask, values - means, 0.0) ** 2).sum(axis=0)
+        minimums = np.fmin.reduce(values, axis=0)
+        maximums = np.fmax.reduce(values, axis=0)
+
+        for j, column in enumerate(numeric.columns):
+            stats = self.columns.setdefault(column, ColumnStats(self.compression))
+            stats.merge_moments(int(counts[j]), means[j], m2[j], minimums[j], maximums[j])
+            stats.sketch.update(values[mask[:, j], j])
+
+    def merge(self, other):
+        """Fold another StreamingStats (e.g. from another file or process) into this one."""
+        for column, nulls in other.null_counts.items():
+            self.null_counts[column] = self.null_counts.get(column, 0) + nulls
+        for column, stats in other.columns.items():
+            self.columns.setdefault(column, ColumnStats(self.compression)).merge(stats)
+        return self
+
+    def summary(self, percentiles=(0.25, 0.5, 0.75)):
+        """Return a DataFrame laid out like `DataFrame.describe()`."""
+        index = ['count', 'mean', 'std', 'min'] + [f"{p * 100:g}%" for p in percentiles] + ['max']
+        data = {}
+        for column, stats in self.columns.items():
+            data[column] = ([float(stats.count), stats.mean if stats.count else np.nan, stats.std, stats.min]
+                            + [stats.sketch.quantile(p) for p in percentiles] + [stats.max])
+        return pd.DataFrame(data, index=index, dtype='float64')
+
+    def missing(self):
+        """Return missing-value counts per column, like `isnull().sum()`."""
+        return pd.Series(self.null_counts, dtype='int64')
+
+class ColumnarCache:
+    """On-disk Feather (Arrow IPC) cache of parsed CSV files.
+
+    Entries are keyed by the source's absolute path, size, mtime, a content hash
+    and the parse options, so an edited source or changed options never hits a
+    stale entry. Files are written uncompressed so reads can be memory-mapped
+    and projected to a subset of columns. The least recently used entries are
+    evicted once the directory grows past `max_bytes`.
+    """
+
+    def __init__(self, cache_dir='.analysis_cache', max_bytes=2 * 1024 ** 3, hash_bytes=1024 * 1024):
+        if feather is None:
+            raise DataAnalysisError("The columnar cache requires pyarrow to be installed.")
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        # Bytes hashed from each end of the source; None hashes the whole file
+        self.hash_bytes = hash_bytes
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def content_hash(self, data_file, size):
+        digest = hashlib.sha256()
+        with open(data_file, 'rb') as f:
+            if self.hash_bytes is None or size <= 2 * self.hash_bytes:
+                for block in iter(lambda: f.read(1024 * 1024), b''):
+                    digest.update(block)
+            else:
+                digest.update(f.read(self.hash_bytes))
+                f.seek(size - self.hash_bytes)
+                digest.update(f.read(self.hash_bytes))
+        return digest.hexdigest()
+
+    def entry_path(self, data_file, options):
+        """Return the cache file path for the current version of a source file."""
+        source = os.path.abspath(data_file)
+        stat_result = os.stat(source)
+        fingerprint = json.dumps([source, stat_result.st_size, stat_result.st_mtime_ns,
+                                  self.content_hash(source, stat_result.st_size), options], sort_keys=True)
+        source_id = hashlib.sha256(source.encode()).hexdigest()[:16]
+        options_id = hashlib.sha256(json.dumps(options, sort_keys=True).encode()).hexdigest()[:8]
+        key = hashlib.sha256(fingerprint.encode()).hexdigest()[:32]
+        return os.path.join(self.cache_dir, f"{source_id}-{options_id}-{key}.feather")
+
+    def lookup(self, data_file, options):
+        """Return the cache file for a source if it is present and current, else None."""
+        path = self.entry_path(data_file, options)
+        if not os.path.exists(path):
+            return None
+        os.utime(path)  # Mark as recently used for eviction
+        return path
+
+    def load(self, path, columns=None):
+        """Read a cached frame, memory-mapped and limited to `columns`."""
+        return feather.read_table(path, columns=columns, memory_map=True).to_pandas()
+
+    def iter_batches(self, path, columns=None):
+        """Yield a cached frame record batch by record batch."""
+        with pa.memory_map(path) as source:
+            reader = pa.ipc.open_file(source)
+            for i in range(reader.num_record_batches):
+                batch = reader.get_batch(i)
+                yield (batch.select(columns) if columns else batch).to_pandas()
+
+    def store(self, data_file, options, frame, chunksize=100000):
+        """Write a parsed frame to the cache, replacing older entries for the same source and options."""
+        path = self.entry_path(data_file, options)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        frame.reset_index(drop=True).to_feather(tmp_path, compression='uncompressed', chunksize=chunksize)
+        self._install(tmp_path, path)
+        return path
+
+    def store_chunks(self, data_file, options, chunks):
+        """Yield `chunks` unchanged while appending them to a new cache entry.
+
+        The entry is only installed once every chunk has been written, so a
+        stream abandoned part way leaves the cache untouched. Integer and float
+        columns are stored at full width, because per-chunk downcasting can give
+        each chunk a different type; categorical columns become one growing
+        dictionary. If a chunk still does not fit the first chunk's schema the
+        entry is dropped and the stream carries on uncached.
+        """
+        path = self.entry_path(data_file, options)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        sink = writer = schema = None
+        categories = {}  # column -> categories so far; each chunk's dictionary must extend the last
+        failed = complete = False
+        try:
+            for chunk in chunks:
+                if not failed:
+                    try:
+                        frame = chunk.copy(deep=False)
+                        for column in [name for name, dtype in frame.dtypes.items() if isinstance(dtype, pd.CategoricalDtype)]:
+                            known = categories.get(column, pd.Index([]))
+                            known = known.append(frame[column].cat.categories.difference(known))
+                            categories[column] = known
+                            frame[column] = frame[column].cat.set_categories(known)
+                        table = pa.Table.from_pandas(frame, preserve_index=False)
+                        if writer is None:
+                            schema = pa.schema([pa.field(field.name, _widened_type(field.type)) for field in table.schema],
+                                               metadata=table.schema.metadata)
+                            sink = pa.OSFile(tmp_path, 'wb')
+                            writer = pa.ipc.new_file(sink, schema, options=pa.ipc.IpcWriteOptions(emit_dictionary_deltas=True))
+                        writer.write_table(table.cast(schema))
+                    except (pa.ArrowException, ValueError, TypeError) as e:
+                        logging.warning(f"Not caching {data_file}: chunk does not match the cached schema ({e}).")
+                        failed = True
+                yield chunk
+            complete = True
+        finally:
+            if writer is not None:
+                try:
+                    writer.close()
+                except pa.ArrowException:
+                    failed = True
+                sink.close()
+            if writer is not None and complete and not failed:
+                self._install(tmp_path, path)
+                logging.info(f"Cached {data_file} in {path} while streaming it.")
+            elif os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def _install(self, tmp_path, path):
+        """Move a written entry into place, replacing older entries for the same source and options."""
+        prefix = '-'.join(os.path.basename(path).split('-')[:2]) + '-'
+        for name in os.listdir(self.cache_dir):
+            if name.startswith(prefix) and name.endswith('.feather'):
+                os.remove(os.path.join(self.cache_dir, name))
+        os.replace(tmp_path, path)
+        self.evict()
+
+    def evict(self):
+        """Delete least recently used entries until the cache fits in `max_bytes`."""
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if name.endswith('.feather'):
+                stat_result = os.stat(os.path.join(self.cache_dir, name))
+                entries.append((stat_result.st_mtime, stat_result.st_size, name))
+        total = sum(size for _, size, _ in entries)
+        for _, size, name in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            os.remove(os.path.join(self.cache_dir, name))
+            total -= size
+            logging.info(f"Evicted {name} from the columnar cache.")
+
+def _widened_type(arrow_type):
+    """The type a streamed cache entry stores a column as, wide enough for every chunk."""
+    if pa.types.is_signed_integer(arrow_type):
+        return pa.int64()
+    if pa.types.is_unsigned_integer(arrow_type):
+        return pa.uint64()
+    if pa.types.is_floating(arrow_type):
+        return pa.float64()
+    if pa.types.is_dictionary(arrow_type):
+        return pa.dictionary(pa.int32(), arrow_type.value_type, arrow_type.ordered)
+    return arrow_type
+
+def render_histogram(column, counts, edges, path):
+    """Draw a pre-binned histogram to an image file without touching pyplot state."""
+    figure = Figure(figsize=(6, 4))
+    FigureCanvasAgg(figure)
+    axes = figure.add_subplot()
+    axes.stairs(counts, edges, fill=True)
+    axes.set_title(f"Histogram of {column}")
+    axes.set_xlabel(column)
+    axes.set_ylabel("Count")
+    figure.savefig(path)
+    return path
+
+def render_scatter(x_label, y_label, payload, path):
+    """Draw a scatter plot from sampled points, or a density image from 2D bin counts."""
+    figure = Figure(figsize=(6, 5))
+    FigureCanvasAgg(figure)
+    axes = figure.add_subplot()
+    if payload[0] == 'points':
+        _, xs, ys = payload
+        axes.scatter(xs, ys, alpha=0.5, s=4)
+        axes.set_title(f"Scatter Plot of {x_label} vs {y_label} ({len(xs)} points)")
+    else:
+        _, counts, x_edges, y_edges = payload
+        mesh = axes.pcolormesh(x_edges, y_edges, np.ma.masked_equal(counts.T, 0), cmap='viridis')
+        figure.colorbar(mesh, ax=axes, label="Count")
+        axes.set_title(f"Density of {x_label} vs {y_label}")
+    axes.set_xlabel(x_label)
+    axes.set_ylabel(y_label)
+    figure.savefig(path)
+    return path
+
+def summarize_file(data_file, analyzer_options=None):
+    """Compute StreamingStats for one CSV file; used as a process-pool task."""
+    analyzer = DataAnalyzer(data_file, **(analyzer_options or {}))
+    return analyzer.compute_stats()
+
 class DataAnalyzer:
-    def __init__(self, data_file):
+    def __init__(self, data_file, usecols=None, chunksize=None, optimize_dtypes=False, sample_rows=10000,
+                 category_threshold=0.5, downcast_floats=False, compression=500, cache_dir=None,
+                 cache_max_bytes=2 * 1024 ** 3, output_dir=None, image_format='png'):
         self.data_file = data_file
         self.data = None
+        self.usecols = usecols  # Only these columns are read from the file
+        self.chunksize = chunksize  # When set, analyze_data streams the file in chunks of this many rows
+        self.optimize_dtypes = optimize_dtypes or chunksize is not None
+        self.sample_rows = sample_rows
+        self.category_threshold = category_threshold  # Max unique/non-null ratio for a string column to become categorical
+        self.downcast_floats = downcast_floats  # float64 -> float32 loses precision, so it is opt-in
+        self.compression = compression  # Quantile sketch size; see QuantileSketch for the error bound
+        self.category_columns = None
+        self.numeric_columns = None
+        # Optional Feather cache of the parsed file, reused by later runs
+        self.cache = ColumnarCache(cache_dir, cache_max_bytes) if cache_dir else None
+        # When set, figures are written here as image files instead of shown on screen
+        self.output_dir = output_dir
+        self.image_format = image_format
+        self.stats = None  # StreamingStats from the last analyze_data call
+
+    def cache_options(self):
+        """Parse options that change the cached frame and so belong in its cache key."""
+        return {
+            'optimize_dtypes': self.optimize_dtypes,
+            'sample_rows': self.sample_rows,
+            'category_threshold': self.category_threshold,
+            'downcast_floats': self.downcast_floats,
+        }
+
+    def infer_dtypes(self, usecols=None):
+        """Sample the head of the file to pick categorical and downcastable numeric columns."""
+        sample = pd.read_csv(self.data_file, usecols=usecols, nrows=self.sample_rows)
+        self.category_columns = []
+        self.numeric_columns = []
+        for column in sample.columns:
+            series = sample[column]
+            if pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series):
+                self.numeric_columns.append(column)
+            elif pd.api.types.is_object_dtype(series) or pd.api.types.is_string_dtype(series):
+                non_null = series.count()
+                if non_null and series.nunique() / non_null <= self.category_threshold:
+                    self.category_columns.append(column)
+        logging.info(f"Inferred categorical columns {self.category_columns} and "
+                     f"numeric columns {self.numeric_columns} from {len(sample)} sample rows.")
+
+    def compact_chunk(self, chunk):
+        """Downcast the numeric columns of a chunk to the smallest dtype that holds its values."""
+        numeric_columns = self.numeric_columns
+        if numeric_columns is None:  # Not inferred, e.g. when reading a cache entry
+            numeric_columns = chunk.select_dtypes('number').columns
+        for column in numeric_columns:
+            if column not in chunk:
+                continue
+            series = chunk[column]
+            if pd.api.types.is_integer_dtype(series):
+                chunk[column] = pd.to_numeric(series, downcast='integer')
+            elif pd.api.types.is_float_dtype(series):
+                if self.downcast_floats:
+                    chunk[column] = pd.to_numeric(series, downcast='float')
+        return chunk
+
+    def iter_chunks(self, usecols=None, use_cache=True):
+        """Yield the CSV file as compact DataFrame chunks without loading it whole.
+
+        With a cache, a miss streams every column from the CSV and writes the
+        cache entry on the way, so the next pass (or run) reads from the cache.
+        """
+        usecols = self.usecols if usecols is None else usecols
+        if use_cache and self.cache is not None:
+            options = self.cache_options()
+            path = self.cache.lookup(self.data_file, options)
+            if path is not None:
+                logging.info(f"Streaming {self.data_file} from columnar cache {path}.")
+                for chunk in self.cache.iter_batches(path, usecols):
+                    yield self.compact_chunk(chunk) if self.optimize_dtypes else chunk
+                return
+            columns = pd.read_csv(self.data_file, nrows=0).columns.tolist()
+            for chunk in self.cache.store_chunks(self.data_file, options, self.iter_chunks(columns, use_cache=False)):
+                yield chunk[list(usecols)] if usecols else chunk
+            return
+        if self.optimize_dtypes and self.category_columns is None:
+            self.infer_dtypes(usecols)
+        dtype = {column: 'category' for column in self.category_columns or []}
+        reader = pd.read_csv(self.data_file, usecols=usecols, dtype=dtype or None,
+                             chunksize=self.chunksize or 100000)
+        with reader:
+            for chunk in reader:
+                yield self.compact_chunk(chunk) if self.optimize_dtypes else chunk
+
+    def parse_csv(self, usecols=None):
+        """Parse the CSV file into a DataFrame, with compact dtypes if enabled."""
+        if not self.optimize_dtypes:
+            return pd.read_csv(self.data_file, usecols=usecols)
+        chunks = list(self.iter_chunks(usecols, use_cache=False))
+        # Chunks see different category sets; unify them so concat keeps the categorical dtype
+        for column in self.category_columns:
+            if chunks and column in chunks[0]:
+                categories = union_categoricals([chunk[column] for chunk in chunks]).categories
+                for chunk in chunks:
+                    chunk[column] = chunk[column].cat.set_categories(categories)
+        return pd.concat(chunks, ignore_index=True) if chunks else pd.DataFrame()
 
     def load_data(self):
         """Load data from a CSV file into a Pandas DataFrame."""
         try:
-            self.data = pd.read_csv(self.data_file)
-            logging.info(f"Data loaded from {self.data_file}.")
+            if self.cache is None:
+                self.data = self.parse_csv(self.usecols)
+                logging.info(f"Data loaded from {self.data_file}.")
+            else:
+                options = self.cache_options()
+                path = self.cache.lookup(self.data_file, options)
+                if path is not None:
+                    self.data = self.cache.load(path, self.usecols)
+                    if self.optimize_dtypes:
+                        self.data = self.compact_chunk(self.data)  # Entries written while streaming are full width
+                    logging.info(f"Data loaded from columnar cache {path}.")
+                else:
+                    # Cache every column so later runs can project any subset. The header is passed
+                    # explicitly because parse_csv(None) would fall back to self.usecols.
+                    columns = pd.read_csv(self.data_file, nrows=0).columns.tolist()
+                    data = self.parse_csv(columns)
+                    path = self.cache.store(self.data_file, options, data, self.chunksize or 100000)
+                    logging.info(f"Data loaded from {self.data_file} and cached in {path}.")
+                    self.data = data[self.usecols] if self.usecols else data
+            if self.optimize_dtypes:
+                memory = self.data.memory_usage(deep=True).sum() / (1024 * 1024)
+                logging.info(f"Loaded frame uses {memory:.1f} MB with compact dtypes.")
         except Exception as e:
             logging.error(f"Failed to load data: {e}")
             raise DataAnalysisError(f"Error loading data from {self.data_file}: {e}")
-    
+
+    def iter_frames(self):
+        """Yield the data in chunks, from memory if loaded, otherwise streamed from the file."""
+        if self.data is None:
+            yield from self.iter_chunks()
+            return
+        step = self.chunksize or 100000
+        for start in range(0, max(len(self.data), 1), step):
+            yield self.data.iloc[start:start + step]
+
+    def compute_stats(self):
+        """Build StreamingStats over all chunks of the data."""
+        stats = StreamingStats(self.compression)
+        for chunk in self.iter_frames():
+            stats.update(chunk)
+        return stats
+
+    @classmethod
+    def analyze_files(cls, data_files, max_workers=None, **analyzer_options):
+        """Summarize several CSV files in a process pool and merge the partial statistics."""
+        try:
+            with ProcessPoolExecutor(max_workers=max_workers) as executor:
+                partials = list(executor.map(summarize_file, data_files,
+                                             [analyzer_options] * len(data_files)))
+        except Exception as e:
+            logging.error(f"Failed to analyze files: {e}")
+            raise DataAnalysisError(f"Error during data analysis: {e}")
+        stats = StreamingStats(analyzer_options.get('compression', 500))
+        for partial in partials:
+            stats.merge(partial)
+        return stats.summary(), stats.missing()
+
     def analyze_data(self):
-        """Perform basic data analysis (summary stats, missing values)."""
+        """Perform basic data analysis (summary stats, missing values) in one pass over the data."""
         try:
             logging.info("Analyzing data...")
-            summary = self.data.describe()  # Summary statistics
-            missing_data = self.data.isnull().sum()  # Count missing values
+            stats = self.stats = self.compute_stats()
+            summary = stats.summary()  # Summary statistics
+            missing_data = stats.missing()  # Count missing values
             logging.info(f"Summary Statistics:\n{summary}")
             logging.info(f"Missing Data:\n{missing_data}")
             return summary, missing_data
@@ -37,10 +562,100 @@ class DataAnalyzer:
             logging.error(f"Failed to analyze data: {e}")
             raise DataAnalysisError(f"Error during data analysis: {e}")
     
-    def visualize_data(self):
+    def histogram_counts(self, bins=20):
+        """Bin every numeric column with NumPy, streaming chunks if the data is not loaded."""
+        if self.stats is None:
+            self.stats = self.compute_stats()
+        edges = {column: np.histogram_bin_edges([], bins=bins, range=(stats.min, stats.max))
+                 for column, stats in self.stats.columns.items() if stats.count}
+        counts = {column: np.zeros(bins, dtype=np.int64) for column in edges}
+        for chunk in self.iter_frames():
+            for column in edges:
+                if column in chunk:
+                    values = chunk[column].to_numpy(dtype='float64', na_value=np.nan)
+                    counts[column] += np.histogram(values[~np.isnan(values)], bins=edges[column])[0]
+        return {column: (counts[column], edges[column]) for column in edges}
+
+    def scatter_payload(self, x='X', y='Y', max_points=100000, mode='density', grid=200, seed=0):
+        """Return plot data for x vs y that stays small however many rows there are.
+
+        Up to `max_points` rows are returned as points. Above that, 'density'
+        mode returns 2D bin counts and 'sample' mode returns a uniform random
+        sample of `max_points` rows (bottom-k sampling over random keys, which
+        works across chunks).
+        """
+        if self.stats is None:
+            self.stats = self.compute_stats()
+        x_stats, y_stats = self.stats.columns[x], self.stats.columns[y]
+        x_edges = np.histogram_bin_edges([], bins=grid, range=(x_stats.min, x_stats.max))
+        y_edges = np.histogram_bin_edges([], bins=grid, range=(y_stats.min, y_stats.max))
+        rng = np.random.default_rng(seed)
+        density = np.zeros((grid, grid), dtype=np.int64)
+        keys = np.empty(0)
+        xs = np.empty(0)
+        ys = np.empty(0)
+        total = 0
+        for chunk in self.iter_frames():
+            chunk_x = chunk[x].to_numpy(dtype='float64', na_value=np.nan)
+            chunk_y = chunk[y].to_numpy(dtype='float64', na_value=np.nan)
+            valid = ~(np.isnan(chunk_x) | np.isnan(chunk_y))
+            chunk_x, chunk_y = chunk_x[valid], chunk_y[valid]
+            total += len(chunk_x)
+            if mode == 'density':
+                density += np.histogram2d(chunk_x, chunk_y, bins=(x_edges, y_edges))[0].astype(np.int64)
+                if total > max_points:
+                    keys = xs = ys = np.empty(0)  # Points are no longer needed
+                    continue
+            # Keep the max_points rows with the smallest random keys seen so far
+            keys = np.concatenate([keys, rng.random(len(chunk_x))])
+            xs = np.concatenate([xs, chunk_x])
+            ys = np.concatenate([ys, chunk_y])
+            if len(keys) > max_points:
+                keep = np.argpartition(keys, max_points)[:max_points]
+                keys, xs, ys = keys[keep], xs[keep], ys[keep]
+        if total <= max_points:
+            return ('points', xs, ys)
+        if mode == 'density':
+            return ('density', density, x_edges, y_edges)
+        return ('points', xs, ys)
+
+    def render_figures(self, output_dir=None, image_format=None, bins=20, max_points=100000,
+                       scatter_mode='density', max_workers=None):
+        """Render one histogram per numeric column plus an X/Y scatter to image files in a process pool."""
+        output_dir = output_dir or self.output_dir
+        image_format = image_format or self.image_format
+        os.makedirs(output_dir, exist_ok=True)
+        start = time.perf_counter()
+
+        def output_path(name):
+            return os.path.join(output_dir, f"{re.sub(r'[^A-Za-z0-9_.-]+', '_', str(name))}.{image_format}")
+
+        histograms = self.histogram_counts(bins)
+        scatter = None
+        if 'X' in self.stats.columns and 'Y' in self.stats.columns:
+            scatter = self.scatter_payload('X', 'Y', max_points, scatter_mode)
+        else:
+            logging.warning("'X' and 'Y' columns not found for scatter plot.")
+        binned = time.perf_counter()
+
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            futures = [executor.submit(render_histogram, column, counts, edges, output_path(f"hist_{column}"))
+                       for column, (counts, edges) in histograms.items()]
+            if scatter is not None:
+                futures.append(executor.submit(render_scatter, 'X', 'Y', scatter, output_path("scatter_X_Y")))
+            paths = [future.result() for future in futures]
+
+        elapsed = time.perf_counter() - start
+        logging.info(f"Rendered {len(paths)} figures to {output_dir} in {elapsed:.2f}s "
+                     f"(binning {binned - start:.2f}s, drawing {elapsed - (binned - start):.2f}s).")
+        return paths, elapsed
+
+    def visualize_data(self, output_dir=None, **render_options):
         """Create visualizations (histograms and scatter plots)."""
         try:
             logging.info("Visualizing data...")
+            if output_dir or self.output_dir:
+                return self.render_figures(output_dir, **render_options)
             
             # Histogram of numerical columns
             self.data.hist(figsize=(10, 8), bins=20)
@@ -62,9 +677,13 @@ class DataAnalyzer:
     def run(self):
         """Run the data analysis and visualization pipeline."""
         try:
-            self.load_data()
+            if self.chunksize is None:
+                self.load_data()
             self.analyze_data()
-            self.visualize_data()
+            if self.data is not None or self.output_dir:
+                self.visualize_data()
+            else:
+                logging.info("Skipping visualization in chunked mode; the full data set is not loaded.")
         except DataAnalysisError as e:
             logging.error(f"Data analysis failed: {e}")
         except Exception as e:
@@ -0,0 +1,268 @@
+#Shared HTML extraction for the scrapers
+import logging
+from html.parser import HTMLParser
+from concurrent.futures import Future, ProcessPoolExecutor
+from bs4 import BeautifulSoup, SoupStrainer
+
+try:
+    from lxml import etree
+except ImportError:  # The lxml backend is optional
+    etree = None
+
+HEADING_TAGS = ('h1', 'h2', 'h3')
+FEED_SIZE = 16 * 1024  # Streaming backends feed the parser this many characters at a time
+
+class HTMLExtractionError(Exception):
+    """Custom exception for HTML extraction errors."""
+    pass
+
+# Text inside these is code, not content; BeautifulSoup's get_text() leaves it out too
+SKIPPED_TEXT_TAGS = frozenset(('script', 'style'))
+
+def element_text(strings):
+    """Join text pieces the way BeautifulSoup's get_text(strip=True) does."""
+    return ''.join(piece.strip() for piece in strings if piece.strip())
+
+class _TagTextParser(HTMLParser):
+    """Collects the text of the wanted tags and nothing else.
+
+    Wanted tags can nest (a heading inside a heading); each gets its own result,
+    in the order the tags start, as BeautifulSoup's find_all returns them.
+    """
+
+    def __init__(self, tags, first_only):
+        super().__init__()
+        self.tags = set(tags)
+        self.first_only = first_only
+        self.results = []
+        self.open = []  # (tag, result index, text nodes) of each wanted tag still open, outermost first
+        self.node = []  # Raw data of the text node being read; a node can span several feed() calls
+        self.skipping = None  # Script or style tag whose text is being ignored
+        self.done = False
+
+    def end_node(self):
+        if self.node:
+            text = ''.join(self.node)
+            for _, _, pieces in self.open:
+                pieces.append(text)
+            self.node = []
+
+    def handle_starttag(self, tag, attrs):
+        self.end_node()
+        if tag in SKIPPED_TEXT_TAGS:
+            self.skipping = tag
+        elif tag in self.tags:
+            self.open.append((tag, len(self.results), []))
+            self.results.append(None)
+
+    def handle_endtag(self, tag):
+        self.end_node()
+        if tag == self.skipping:
+            self.skipping = None
+        elif any(open_tag == tag for open_tag, _, _ in self.open):
+            # Closing a tag also closes any wanted tags left open inside it
+            while self.open:
+                open_tag, index, pieces = self.open.pop()
+                self.results[index] = element_text(pieces)
+                if open_tag == tag:
+                    break
+            self.done = self.first_only and self.results[0] is not None
+
+    def handle_comment(self, data):
+        self.end_node()
+
+    def handle_data(self, data):
+        if self.open and self.skipping is None:
+            self.node.append(data)
+
+    def finish(self):
+        """Close the tags still open at the end of the document, as the tree builders do."""
+        self.end_node()
+        while self.open:
+            _, index, pieces = self.open.pop()
+            self.results[index] = element_text(pieces)
+
+def extract_streaming(html, tags, first_only=False):
+    """Stdlib HTMLParser backend; stops feeding as soon as `first_only` has its match."""
+    parser = _TagTextParser(tags, first_only)
+    for start in range(0, len(html), FEED_SIZE):
+        parser.feed(html[start:start + FEED_SIZE])
+        if parser.done:
+            return parser.results[:1]
+    parser.close()
+    parser.finish()
+    return parser.results[:1] if first_only else parser.results
+
+def _lxml_strings(element):
+    """Yield an element's text nodes, leaving out comments, processing instructions, scripts and styles."""
+    if element.text:
+        yield element.text
+    for child in element:
+        if isinstance(child.tag, str) and child.tag not in SKIPPED_TEXT_TAGS:
+            yield from _lxml_strings(child)
+        if child.tail:
+            yield child.tail
+
+def extract_lxml(html, tags, first_only=False):
+    """lxml pull-parser backend; only the wanted tags' start and end events are delivered."""
+    if etree is None:
+        raise HTMLExtractionError("The lxml backend requires lxml to be installed.")
+    parser = etree.HTMLPullParser(events=('start', 'end'), tag=tags)
+    results = []
+    slots = {}  # Element -> index of its result; results are kept in start order like the other backends
+
+    def read_events():
+        for event, element in parser.read_events():
+            if event == 'start':
+                slots[element] = len(results)
+                results.append(None)
+            else:
+                results[slots.pop(element)] = element_text(_lxml_strings(element))
+
+    for start in range(0, len(html), FEED_SIZE):
+        parser.feed(html[start:start + FEED_SIZE])
+        read_events()
+        if first_only and results and results[0] is not None:
+            return results[:1]
+    if html:
+        parser.close()
+        read_events()
+    return results[:1] if first_only else results
+
+def extract_soup(html, tags, first_only=False):
+    """BeautifulSoup backend that only materializes the wanted tags."""
+    soup = BeautifulSoup(html, 'html.parser', parse_only=SoupStrainer(list(tags)))
+    elements = soup.find_all(list(tags), limit=1 if first_only else None)
+    return [element.get_text(strip=True) for element in elements]
+
+def extract_full_soup(html, tags, first_only=False):
+    """Original approach: build the whole BeautifulSoup tree. Kept as the benchmark baseline."""
+    soup = BeautifulSoup(html, 'html.parser')
+    elements = soup.find_all(list(tags), limit=1 if first_only else None)
+    return [element.get_text(strip=True) for element in elements]
+
+BACKENDS = {
+    "lxml": extract_lxml,
+    "streaming": extract_streaming,
+    "soup": extract_soup,
+    "full_soup": extract_full_soup,
+}
+
+def resolve_backend(backend):
+    """Map a backend name ('auto' picks lxml when installed) to its extraction function."""
+    if backend == "auto":
+        backend = "lxml" if etree is not None else "streaming"
+    try:
+        return BACKENDS[backend]
+    except KeyError:
+        raise HTMLExtractionError(f"Unknown parser backend '{backend}'. Choose from {', '.join(BACKENDS)}.")
+
+def extract_title(html, backend="auto"):
+    """Return the text of the page's <title>, or None if it has none."""
+    if not html:
+        return None
+    results = resolve_backend(backend)(html, ('title',), first_only=True)
+    return results[0] if results else None
+
+def extract_headings(html, tags=HEADING_TAGS, backend="auto"):
+    """Return the text of every heading tag, in document order."""
+    if not html:
+        return []
+    return resolve_backend(backend)(html, tuple(tags))
+
+class _LinkParser(HTMLParser):
+    def __init__(self):
+        super().__init__()
+        self.links = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag == 'a':
+            href = dict(attrs).get('href')
+            if href:
+                self.links.append(href)
+
+def extract_links(html, backend="auto"):
+    """Return the raw href of every <a> tag, in document order."""
+    if not html:
+        return []
+    if resolve_backend(backend) is extract_lxml:
+        parser = etree.HTMLPullParser(events=('start',), tag='a')
+        parser.feed(html)
+        parser.close()
+        return [element.get('href') for _, element in parser.read_events() if element.get('href')]
+    parser = _LinkParser()
+    parser.feed(html)
+    parser.close()
+    return parser.links
+
+EXTRACTION_KINDS = ("title", "headings", "page")
+
+def _extract_job(kind, html, tags, backend):
+    if kind == "title":
+        return extract_title(html, backend)
+    if kind == "page":
+        # Headings and links in one job so the page is only shipped to a worker once
+        return extract_headings(html, tags, backend), extract_links(html, backend)
+    return extract_headings(html, tags, backend)
+
+class HTMLExtractor:
+    """Runs extraction of many pages in a process pool so parsing is not serialized on the GIL.
+
+    Single pages (title, headings, page) are parsed inline: shipping one page to a
+    worker and blocking on it costs more than it saves. Use map() for batches, or
+    submit() from several threads at once (e.g. fetch workers). With processes=0
+    everything runs inline.
+    """
+
+    def __init__(self, backend="auto", processes=None, tags=HEADING_TAGS):
+        resolve_backend(backend)  # Fail fast on a bad name
+        self.backend = backend
+        self.tags = tuple(tags)
+        self.executor = ProcessPoolExecutor(max_workers=processes) if processes != 0 else None
+
+    def _run(self, kind, html):
+        return _extract_job(kind, html, self.tags, self.backend)
+
+    def title(self, html):
+        return self._run("title", html)
+
+    def headings(self, html):
+        return self._run("headings", html)
+
+    def page(self, html):
+        """Return (headings, links) for a page."""
+        return self._run("page", html)
+
+    def submit(self, kind, html):
+        """Queue extraction of one page on the pool and return a Future for its result."""
+        if kind not in EXTRACTION_KINDS:
+            raise HTMLExtractionError(f"Unknown extraction kind '{kind}'.")
+        if self.executor is not None:
+            return self.executor.submit(_extract_job, kind, html, self.tags, self.backend)
+        future = Future()
+        try:
+            future.set_result(_extract_job(kind, html, self.tags, self.backend))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+    def map(self, kind, pages, chunksize=16):
+        """Extract "title", "headings" or "page" from many pages, returning results in input order."""
+        if kind not in EXTRACTION_KINDS:
+            raise HTMLExtractionError(f"Unknown extraction kind '{kind}'.")
+        count = len(pages)
+        args = ([kind] * count, pages, [self.tags] * count, [self.backend] * count)
+        if self.executor is None:
+            return list(map(_extract_job, *args))
+        return list(self.executor.map(_extract_job, *args, chunksize=chunksize))
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown()
+            logging.debug("HTML extraction pool shut down.")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -1,57 +1,620 @@
 #chatgpt
+import os
+import json
+import time
+import queue
+import hashlib
+import random
+import threading
+from abc import ABC, abstractmethod
+from collections import Counter, deque
+from concurrent.futures import Future, ProcessPoolExecutor, wait, FIRST_COMPLETED
+from multiprocessing import shared_memory
 import numpy as np
+import pandas as pd
 import matplotlib.pyplot as plt
+import joblib
+import sklearn
+from sklearn.base import clone
 from sklearn.datasets import load_iris
-from sklearn.model_selection import train_test_split, cross_val_score
+from sklearn.model_selection import train_test_split, cross_val_score, StratifiedKFold
 from sklearn.ensemble import RandomForestClassifier
+from sklearn.linear_model import SGDClassifier
 from sklearn.metrics import classification_report, confusion_matrix
 import logging
 
 # Configure logging
 logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s')
 
-class MachineLearningModel:
+class MachineLearningError(Exception):
+    """Custom exception for model training errors."""
+    pass
+
+class Dataset(ABC):
+    """Source of training data that can be streamed in (X, y) batches or loaded whole."""
+    feature_names = None
+    classes = None  # Known class labels, needed by incremental learners on their first batch
+
+    @abstractmethod
+    def iter_batches(self, batch_size=10000):
+        """Yield (X, y) array pairs of at most `batch_size` rows."""
+
+    def load(self):
+        """Materialize the whole dataset as (X, y) arrays."""
+        batches = list(self.iter_batches())
+        if not batches:
+            raise MachineLearningError("Dataset is empty.")
+        return np.concatenate([X for X, _ in batches]), np.concatenate([y for _, y in batches])
+
+class IrisDataset(Dataset):
+    """The scikit-learn iris dataset, held in memory."""
+
     def __init__(self):
-        self.data = load_iris()
-        self.X = self.data.data
-        self.y = self.data.target
-        self.model = RandomForestClassifier(n_estimators=100)
-    
+        data = load_iris()
+        self.X = data.data
+        self.y = data.target
+        self.feature_names = list(data.feature_names)
+        self.classes = np.unique(self.y)
+
+    def iter_batches(self, batch_size=10000):
+        for start in range(0, len(self.X), batch_size):
+            yield self.X[start:start + batch_size], self.y[start:start + batch_size]
+
+    def load(self):
+        return self.X, self.y
+
+class CSVDataset(Dataset):
+    """A CSV file read in chunks, with one column as the target."""
+
+    def __init__(self, path, target_column, feature_columns=None, classes=None, dtype=np.float32):
+        self.path = path
+        self.target_column = target_column
+        self.feature_columns = feature_columns
+        self.classes = None if classes is None else np.asarray(classes)
+        self.dtype = dtype
+        if feature_columns is None:
+            header = pd.read_csv(path, nrows=0).columns
+            self.feature_columns = [column for column in header if column != target_column]
+        self.feature_names = list(self.feature_columns)
+
+    def iter_batches(self, batch_size=10000):
+        usecols = self.feature_columns + [self.target_column]
+        with pd.read_csv(self.path, usecols=usecols, chunksize=batch_size) as reader:
+            for chunk in reader:
+                yield chunk[self.feature_columns].to_numpy(dtype=self.dtype), chunk[self.target_column].to_numpy()
+
+class NumpyDataset(Dataset):
+    """Feature and label `.npy` files opened as read-only memmaps, so only touched pages are read."""
+
+    def __init__(self, X_path, y_path, feature_names=None, classes=None):
+        self.X = np.load(X_path, mmap_mode='r')
+        self.y = np.load(y_path, mmap_mode='r')
+        if len(self.X) != len(self.y):
+            raise MachineLearningError(f"{X_path} has {len(self.X)} rows but {y_path} has {len(self.y)}.")
+        self.feature_names = feature_names or [f"feature_{i}" for i in range(self.X.shape[1])]
+        self.classes = None if classes is None else np.asarray(classes)
+
+    def iter_batches(self, batch_size=10000):
+        for start in range(0, len(self.X), batch_size):
+            yield np.asarray(self.X[start:start + batch_size]), np.asarray(self.y[start:start + batch_size])
+
+    def load(self):
+        return self.X, self.y
+
+class GeneratorDataset(Dataset):
+    """Batches produced by a callable returning an iterable of (X, y) chunks.
+
+    A callable rather than a generator is taken so the data can be iterated
+    more than once (e.g. for several epochs).
+    """
+
+    def __init__(self, batch_factory, feature_names=None, classes=None):
+        self.batch_factory = batch_factory
+        self.feature_names = feature_names
+        self.classes = None if classes is None else np.asarray(classes)
+
+    def iter_batches(self, batch_size=None):
+        for X, y in self.batch_factory():
+            yield np.asarray(X), np.asarray(y)
+
+# Hyperparameter space sampled by MachineLearningModel.search_hyperparameters
+SEARCH_SPACE = {
+    'max_depth': [None, 4, 8, 16, 32],
+    'max_features': ['sqrt', 'log2', 0.5, None],
+    'min_samples_leaf': [1, 2, 4, 8],
+    'min_samples_split': [2, 5, 10],
+    'criterion': ['gini', 'entropy'],
+}
+
+# Per-process state for search workers, set once by _init_search_worker
+_search_state = {}
+
+def _attach_shared_array(name, shape, dtype):
+    block = shared_memory.SharedMemory(name=name)
+    return block, np.ndarray(shape, dtype=dtype, buffer=block.buf)
+
+def _init_search_worker(X_spec, y_spec, splits, random_state):
+    """Attach a search worker to the shared dataset once, instead of pickling it per task."""
+    X_block, X = _attach_shared_array(*X_spec)
+    y_block, y = _attach_shared_array(*y_spec)
+    _search_state.update(X=X, y=y, blocks=(X_block, y_block), splits=splits, random_state=random_state)
+
+def _evaluate_fold(params, n_estimators, fold):
+    """Fit one candidate forest on one CV fold and return its accuracy."""
+    X, y = _search_state['X'], _search_state['y']
+    train_idx, test_idx = _search_state['splits'][fold]
+    model = RandomForestClassifier(n_estimators=n_estimators, n_jobs=1,
+                                   random_state=_search_state['random_state'], **params)
+    model.fit(X[train_idx], y[train_idx])
+    return model.score(X[test_idx], y[test_idx])
+
+def _terminate_pool(executor):
+    """Shut down a process pool without waiting, killing any task still running."""
+    # ProcessPoolExecutor has no public way to stop running tasks before Python 3.14
+    processes = list((executor._processes or {}).values())
+    executor.shutdown(wait=False, cancel_futures=True)
+    for process in processes:
+        process.terminate()
+    for process in processes:
+        process.join()
+
+class MachineLearningModel:
+    def __init__(self, n_jobs=-1, cv=5, random_state=42, cache_dir='.model_cache', dataset=None):
+        self.dataset = dataset or IrisDataset()
+        self._X = None
+        self._y = None
+        self.n_jobs = n_jobs  # -1 uses every core
+        self.cv = cv
+        self.random_state = random_state
+        self.cache_dir = cache_dir  # None disables the on-disk model cache
+        self.model = RandomForestClassifier(n_estimators=100, n_jobs=n_jobs, random_state=random_state)
+        self.timings = {}
+        self.incremental_model = None
+
+    @property
+    def X(self):
+        """Features of the whole dataset, loaded on first use."""
+        if self._X is None:
+            self._X, self._y = self.dataset.load()
+        return self._X
+
+    @property
+    def y(self):
+        """Labels of the whole dataset, loaded on first use."""
+        if self._y is None:
+            self._X, self._y = self.dataset.load()
+        return self._y
+
+    def fingerprint(self, *arrays):
+        """Hash the training data and hyperparameters into a cache key."""
+        digest = hashlib.sha256()
+        for array in arrays:
+            array = np.ascontiguousarray(array)
+            digest.update(str((array.shape, array.dtype.str)).encode())
+            digest.update(array.tobytes())
+        params = {key: value for key, value in self.model.get_params().items() if key not in ('n_jobs', 'verbose')}
+        digest.update(json.dumps([params, self.cv, sklearn.__version__], sort_keys=True, default=str).encode())
+        return digest.hexdigest()
+
+    def load_cached(self, key):
+        """Return the cached (model, cv scores) for a key, or None."""
+        if not self.cache_dir:
+            return None
+        path = os.path.join(self.cache_dir, f"{key}.joblib")
+        if not os.path.exists(path):
+            return None
+        try:
+            return joblib.load(path)
+        except Exception as e:
+            logging.warning(f"Ignoring unreadable model cache entry {path}: {e}")
+            return None
+
+    def save_cached(self, key, model, scores):
+        if not self.cache_dir:
+            return
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = os.path.join(self.cache_dir, f"{key}.joblib")
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        joblib.dump((model, scores), tmp_path)
+        os.replace(tmp_path, path)
+
+    def timed(self, stage, func, *args, **kwargs):
+        """Run one pipeline stage and record its wall time."""
+        start = time.perf_counter()
+        result = func(*args, **kwargs)
+        self.timings[stage] = time.perf_counter() - start
+        return result
+
+    def cross_validate(self):
+        """Score the model with CV folds run in parallel, one single-threaded forest per fold."""
+        # Parallelising both the folds and each forest's trees would oversubscribe the cores
+        fold_model = clone(self.model).set_params(n_jobs=1)
+        return cross_val_score(fold_model, self.X, self.y, cv=self.cv, n_jobs=self.n_jobs)
+
     def train_and_evaluate(self):
         """Train the model and evaluate using cross-validation."""
         logging.info("Training the model...")
+        self.timings = {}
         X_train, X_test, y_train, y_test = train_test_split(self.X, self.y, test_size=0.3, random_state=42)
-        
-        self.model.fit(X_train, y_train)
-        logging.info("Model trained successfully.")
-        
-        # Evaluate model using cross-validation
-        scores = cross_val_score(self.model, self.X, self.y, cv=5)
+
+        key = self.fingerprint(X_train, y_train, self.X, self.y)
+        cached = self.load_cached(key)
+        if cached is not None:
+            self.model, scores = cached
+            self.timings['fit'] = self.timings['cv'] = 0.0
+            logging.info(f"Loaded fitted model and CV scores from cache ({key[:12]}).")
+        else:
+            self.timed('fit', self.model.fit, X_train, y_train)
+            logging.info("Model trained successfully.")
+
+            # Evaluate model using cross-validation
+            scores = self.timed('cv', self.cross_validate)
+            self.save_cached(key, self.model, scores)
         logging.info(f"Cross-validation scores: {scores}")
         logging.info(f"Mean cross-validation score: {scores.mean()}")
 
         # Predictions and evaluation
-        y_pred = self.model.predict(X_test)
-        logging.info(f"Classification report:\n{classification_report(y_test, y_pred)}")
+        y_pred = self.timed('predict', self.model.predict, X_test)
+        report = self.timed('report', classification_report, y_test, y_pred)
+        logging.info(f"Classification report:\n{report}")
         logging.info(f"Confusion Matrix:\n{confusion_matrix(y_test, y_pred)}")
-        
+        logging.info("Stage timings: " + ", ".join(f"{stage} {seconds:.3f}s" for stage, seconds in self.timings.items()))
+
         # Plotting feature importance
         self.plot_feature_importance()
+        return scores
+
+    def train_incremental(self, dataset=None, learner=None, classes=None, batch_size=10000, epochs=1):
+        """Train an incremental learner batch by batch with partial_fit, for data larger than RAM.
+
+        `learner` is any estimator with partial_fit (an SGDClassifier by default);
+        calling this again keeps training the same learner on new data.
+        """
+        dataset = dataset or self.dataset
+        if learner is not None:
+            self.incremental_model = learner
+        elif self.incremental_model is None:
+            self.incremental_model = SGDClassifier(loss='log_loss', random_state=self.random_state)
+        classes = classes if classes is not None else dataset.classes
+        if classes is None and not hasattr(self.incremental_model, 'classes_'):
+            raise MachineLearningError("Pass `classes` (or give the dataset classes) for the first partial_fit.")
+
+        start = time.perf_counter()
+        rows = 0
+        for epoch in range(epochs):
+            for X_batch, y_batch in dataset.iter_batches(batch_size):
+                self.incremental_model.partial_fit(X_batch, y_batch, classes=classes)
+                rows += len(X_batch)
+        self.timings['partial_fit'] = time.perf_counter() - start
+        logging.info(f"Incrementally trained on {rows} rows in {self.timings['partial_fit']:.3f}s.")
+        return self.incremental_model
+
+    def add_trees(self, X_batch, y_batch, n_new_trees=10, max_trees=None):
+        """Grow the fitted forest with `n_new_trees` trees trained only on a new batch.
+
+        Existing trees are kept (warm start). With `max_trees`, the oldest trees
+        are dropped so the forest tracks a rolling window of batches.
+        """
+        if not hasattr(self.model, 'estimators_'):
+            self.model.set_params(n_estimators=n_new_trees)
+            self.model.fit(X_batch, y_batch)
+            return self.model
+        # New trees must see exactly the fitted classes or their probabilities won't line up with the old trees
+        batch_classes = set(np.unique(y_batch))
+        missing = set(self.model.classes_) - batch_classes
+        if missing:
+            raise MachineLearningError(f"Batch is missing classes {', '.join(map(str, sorted(missing)))}; cannot add trees.")
+        unseen = batch_classes - set(self.model.classes_)
+        if unseen:
+            raise MachineLearningError(f"Batch has classes {', '.join(map(str, sorted(unseen)))} the forest "
+                                       f"was not trained on; retrain instead of adding trees.")
+        self.model.set_params(warm_start=True, n_estimators=len(self.model.estimators_) + n_new_trees)
+        try:
+            self.model.fit(X_batch, y_batch)
+        finally:
+            # Leave warm start off so a later fit() retrains from scratch instead of doing nothing
+            self.model.set_params(warm_start=False)
+        if max_trees is not None and len(self.model.estimators_) > max_trees:
+            self.model.estimators_ = self.model.estimators_[-max_trees:]
+            self.model.set_params(n_estimators=max_trees)
+        return self.model
+
+    def train_on_delta(self, dataset, n_new_trees=10, batch_size=100000, max_trees=None):
+        """Update the forest from a dataset of new rows (e.g. a daily delta) instead of refitting."""
+        start = time.perf_counter()
+        for X_batch, y_batch in dataset.iter_batches(batch_size):
+            self.add_trees(X_batch, y_batch, n_new_trees, max_trees)
+        self.timings['delta'] = time.perf_counter() - start
+        logging.info(f"Forest now has {len(self.model.estimators_)} trees "
+                     f"(delta training took {self.timings['delta']:.3f}s).")
+        return self.model
+
+    def load_model(self, path):
+        """Load a previously saved model, e.g. yesterday's forest before training on a delta."""
+        self.model = joblib.load(path)
+        logging.info(f"Model loaded from {path}.")
+        return self.model
+
+    def search_hyperparameters(self, n_candidates=27, eta=3, min_estimators=10, max_estimators=270,
+                               time_budget=60.0, max_workers=None, refit=True, search_space=None):
+        """Successive-halving random search over forests, evaluated in a process pool.
+
+        `n_candidates` random configurations are scored with a small forest; after
+        each rung the best 1/eta survive and get eta times more trees. The dataset
+        is placed in shared memory and the CV splits are computed once, so workers
+        attach to them instead of receiving a pickled copy per task. Once
+        `time_budget` seconds have passed, pending work is cancelled and the best
+        configuration found so far is returned. The result holds the best
+        parameters, their score and a trace of (elapsed, score) evaluations.
+
+        The best configuration comes from the last rung that finished; scores are
+        only compared within a rung, since rungs use different numbers of trees.
+        If the budget runs out, fits still running are terminated, so the call
+        returns shortly after `time_budget` seconds.
+        """
+        search_space = search_space or SEARCH_SPACE
+        rng = random.Random(self.random_state)
+        candidates = []
+        while len(candidates) < n_candidates:
+            params = {name: rng.choice(values) for name, values in search_space.items()}
+            if params not in candidates:
+                candidates.append(params)
+            elif len(candidates) >= np.prod([len(values) for values in search_space.values()]):
+                break
+
+        X = np.ascontiguousarray(self.X)
+        y = np.ascontiguousarray(self.y)
+        splits = list(StratifiedKFold(n_splits=self.cv, shuffle=True, random_state=self.random_state).split(X, y))
+        blocks = []
+        specs = []
+        for array in (X, y):
+            block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+            np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[...] = array
+            blocks.append(block)
+            specs.append((block.name, array.shape, array.dtype.str))
+
+        start = time.perf_counter()
+        deadline = start + time_budget
+        trace = []
+        best = {'params': None, 'score': -np.inf, 'n_estimators': None}
+        n_estimators = min_estimators
+        rung = 0
+        out_of_time = False
+        executor = ProcessPoolExecutor(max_workers=max_workers, initializer=_init_search_worker,
+                                       initargs=(specs[0], specs[1], splits, self.random_state))
+        try:
+            while candidates and not out_of_time:
+                futures = {executor.submit(_evaluate_fold, params, n_estimators, fold): index
+                           for index, params in enumerate(candidates) for fold in range(len(splits))}
+                fold_scores = [[] for _ in candidates]
+                rung_best = {'params': None, 'score': -np.inf, 'n_estimators': n_estimators}
+                pending = set(futures)
+                while pending:
+                    remaining = deadline - time.perf_counter()
+                    if remaining <= 0:
+                        out_of_time = True
+                        break
+                    done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        index = futures[future]
+                        fold_scores[index].append(future.result())
+                        if len(fold_scores[index]) < len(splits):
+                            continue
+                        score = float(np.mean(fold_scores[index]))
+                        if score > rung_best['score']:
+                            rung_best = {'params': candidates[index], 'score': score, 'n_estimators': n_estimators}
+                        trace.append({'elapsed': time.perf_counter() - start, 'rung': rung,
+                                      'n_estimators': n_estimators, 'params': candidates[index],
+                                      'score': score, 'best_score': rung_best['score']})
+                if out_of_time:
+                    for future in pending:
+                        future.cancel()
+                    logging.warning(f"Search time budget of {time_budget}s exhausted during rung {rung}.")
+                    # A partial rung only counts if no earlier rung finished
+                    if best['params'] is None:
+                        best = rung_best
+                    break
+                # Later rungs win regardless of score: they were measured with more trees
+                best = rung_best
+
+                finished = [(float(np.mean(scores)), index) for index, scores in enumerate(fold_scores)]
+                finished.sort(key=lambda item: item[0], reverse=True)
+                keep = max(1, len(candidates) // eta)
+                if len(candidates) == 1 or n_estimators >= max_estimators:
+                    break
+                candidates = [candidates[index] for _, index in finished[:keep]]
+                n_estimators = min(n_estimators * eta, max_estimators)
+                rung += 1
+                logging.info(f"Rung {rung}: {len(candidates)} candidates with {n_estimators} trees.")
+        finally:
+            if out_of_time:
+                _terminate_pool(executor)
+            else:
+                executor.shutdown()
+            for block in blocks:
+                block.close()
+                block.unlink()
+
+        elapsed = time.perf_counter() - start
+        if best['params'] is None:
+            raise MachineLearningError(f"No candidate finished within the {time_budget}s time budget.")
+        logging.info(f"Best configuration {best['params']} with {best['n_estimators']} trees: "
+                     f"CV score {best['score']:.4f} after {elapsed:.2f}s.")
+        if refit:
+            self.model = RandomForestClassifier(n_estimators=best['n_estimators'], n_jobs=self.n_jobs,
+                                                random_state=self.random_state, **best['params'])
+            self.timed('refit', self.model.fit, self.X, self.y)
+        return {'best_params': best['params'], 'best_n_estimators': best['n_estimators'],
+                'best_score': best['score'], 'elapsed': elapsed, 'trace': trace}
+
+    def save_model(self, path):
+        """Persist the fitted model uncompressed, so its arrays can be memory-mapped on load."""
+        joblib.dump(self.model, path)
+        logging.info(f"Model saved to {path}.")
+        return path
 
     def plot_feature_importance(self):
         """Plot feature importance using a bar chart."""
         feature_importance = self.model.feature_importances_
-        feature_names = self.data.feature_names
-        
+        feature_names = self.dataset.feature_names or [f"feature_{i}" for i in range(len(feature_importance))]
+
         plt.barh(feature_names, feature_importance)
         plt.xlabel("Feature Importance")
         plt.title("Feature Importance in RandomForest Classifier")
         plt.show()
 
+class ModelServerError(Exception):
+    """Custom exception for model serving errors."""
+    pass
+
+class ModelServer:
+    """Serve a persisted model, micro-batching single-row requests into vectorized predict_proba calls.
+
+    Rows submitted from any thread are queued; a batcher thread waits at most
+    `max_wait` seconds after the first queued row (or until `max_batch_size`
+    rows are waiting) and scores the whole batch in one call.
+    """
+
+    def __init__(self, model_path, max_batch_size=256, max_wait=0.002, n_jobs=1, latency_window=100000):
+        # mmap_mode maps the model's NumPy arrays read-only instead of copying them
+        self.model = joblib.load(model_path, mmap_mode='r')
+        if hasattr(self.model, 'n_jobs'):
+            self.model.set_params(n_jobs=n_jobs)  # Thread fan-out costs more than it saves on small batches
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.requests = queue.Queue()
+        self.latencies = deque(maxlen=latency_window)
+        self.batch_sizes = Counter()
+        self.stats_lock = threading.Lock()
+        self.n_features = getattr(self.model, 'n_features_in_', None)
+        self.submit_lock = threading.Lock()  # Orders submits against the batcher shutting down
+        self.running = True
+        self.batcher = threading.Thread(target=self._batch_loop, name="model-batcher", daemon=True)
+        self.batcher.start()
+        logging.info(f"Model loaded from {model_path} for serving.")
+
+    def close(self):
+        """Stop the batcher after draining queued requests."""
+        with self.submit_lock:
+            self.running = False
+        self.requests.put(None)
+        self.batcher.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def submit(self, row):
+        """Queue one feature row; the Future resolves to (label, class probabilities)."""
+        try:
+            row = np.asarray(row, dtype=np.float64)
+        except (TypeError, ValueError) as e:
+            raise ModelServerError(f"Invalid feature row: {e}")
+        if row.ndim != 1 or (self.n_features is not None and row.shape[0] != self.n_features):
+            raise ModelServerError(f"Expected a row of {self.n_features} features, got shape {row.shape}.")
+        future = Future()
+        with self.submit_lock:
+            if not self.running or not self.batcher.is_alive():
+                raise ModelServerError("Model server is closed.")
+            self.requests.put((row, future, time.perf_counter()))
+        return future
+
+    def predict(self, row, timeout=None):
+        """Predict the label of one row, batched with concurrent requests."""
+        return self.submit(row).result(timeout)[0]
+
+    def predict_proba(self, row, timeout=None):
+        """Predict class probabilities for one row, batched with concurrent requests."""
+        return self.submit(row).result(timeout)[1]
+
+    def _collect_batch(self):
+        item = self.requests.get()
+        if item is None:
+            return None
+        batch = [item]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                item = self.requests.get(timeout=remaining) if remaining > 0 else self.requests.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                self.requests.put(None)  # Let the loop see the shutdown after this batch
+                break
+            batch.append(item)
+        return batch
+
+    def _batch_loop(self):
+        try:
+            while True:
+                batch = self._collect_batch()
+                if batch is None:
+                    return
+                self._score_batch(batch)
+        except BaseException as e:
+            logging.error(f"Model batcher stopped unexpectedly: {e}")
+            raise
+        finally:
+            # Refuse new work, then fail anything still queued so no caller waits forever
+            with self.submit_lock:
+                self.running = False
+            while True:
+                try:
+                    item = self.requests.get_nowait()
+                except queue.Empty:
+                    break
+                if item is not None and not item[1].done():
+                    item[1].set_exception(ModelServerError("Model server stopped before scoring this row."))
+
+    def _score_batch(self, batch):
+        try:
+            rows = np.vstack([row for row, _, _ in batch])
+            probabilities = self.model.predict_proba(rows)
+            labels = self.model.classes_[np.argmax(probabilities, axis=1)]
+        except Exception as e:
+            if len(batch) > 1:
+                # Find the offending row(s) so only their callers get the error
+                logging.warning(f"Batch prediction failed ({e}); scoring its {len(batch)} rows one at a time.")
+                for item in batch:
+                    self._score_batch([item])
+                return
+            logging.error(f"Prediction failed: {e}")
+            batch[0][1].set_exception(ModelServerError(f"Prediction failed: {e}"))
+            return
+        now = time.perf_counter()
+        with self.stats_lock:
+            self.batch_sizes[len(batch)] += 1
+            self.latencies.extend(now - submitted for _, _, submitted in batch)
+        for (_, future, _), label, proba in zip(batch, labels, probabilities):
+            future.set_result((label, proba))
+
+    def get_stats(self):
+        """Return request latency percentiles and the batch-size histogram."""
+        with self.stats_lock:
+            latencies = np.array(self.latencies)
+            batch_sizes = dict(sorted(self.batch_sizes.items()))
+        if len(latencies) == 0:
+            return {"requests": 0, "latency_p50": 0.0, "latency_p99": 0.0, "batch_sizes": batch_sizes}
+        return {
+            "requests": len(latencies),
+            "latency_p50": float(np.percentile(latencies, 50)),
+            "latency_p99": float(np.percentile(latencies, 99)),
+            "batch_sizes": batch_sizes,
+        }
+
 # Example usage
 def main():
     ml_model = MachineLearningModel()
     ml_model.train_and_evaluate()
 
+    # Serve the trained model with micro-batched single-row predictions
+    model_path = ml_model.save_model('iris_model.joblib')
+    with ModelServer(model_path) as server:
+        logging.info(f"Prediction for first sample: {server.predict(ml_model.X[0])}")
+        logging.info(f"Serving stats: {server.get_stats()}")
+
 if __name__ == "__main__":
     main()
@@ -1,7 +1,17 @@
 #Chatgpt
-import socket
+import math
+import heapq
+import bisect
 import threading
+import random
+import socket
+import asyncio
+import time
 import logging
+from array import array
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 
 # Configure logging
 logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -10,11 +20,200 @@ class NetworkMonitorError(Exception):
     """Custom exception for network monitoring errors."""
     pass
 
+# Result of one asynchronous probe; latency is the connect time in seconds (None if it failed)
+CheckResult = namedtuple('CheckResult', ['host', 'port', 'reachable', 'latency', 'error'])
+
+def parse_target(target, default_port=80):
+    """Split a target given as "host", "host:port", "[v6]:port" or (host, port) into (host, port)."""
+    if isinstance(target, (tuple, list)):
+        host, port = target
+        return host, int(port)
+    if target.startswith('['):
+        host, _, rest = target[1:].partition(']')
+        return host, int(rest[1:]) if rest.startswith(':') else default_port
+    if target.count(':') == 1:
+        host, port = target.split(':')
+        return host, int(port)
+    return target, default_port
+
+class DNSCache:
+    """Async getaddrinfo cache with a TTL; concurrent lookups of one host share a single query."""
+
+    def __init__(self, ttl=300, negative_ttl=30, timeout=None):
+        self.ttl = ttl
+        # Failed lookups are cached for a shorter time, so a fixed resolver is noticed quickly
+        self.negative_ttl = min(negative_ttl, ttl)
+        self.timeout = timeout  # Seconds before a hung lookup counts as a failure; None waits forever
+        self.entries = {}  # host -> (expires at, (family, address) or exception)
+        self.inflight = {}  # host -> Future of a lookup in progress
+        self.hits = 0
+        self.misses = 0
+
+    async def resolve(self, host):
+        """Return (family, address) for a host, raising the lookup error (usually gaierror) if it fails."""
+        entry = self.entries.get(host)
+        if entry is not None and entry[0] > time.monotonic():
+            self.hits += 1
+            if isinstance(entry[1], Exception):
+                raise entry[1].with_traceback(None)  # Don't let each re-raise grow the stored traceback
+            return entry[1]
+
+        future = self.inflight.get(host)
+        if future is not None:
+            self.hits += 1
+            try:
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                if future.cancelled() and not asyncio.current_task().cancelling():
+                    return await self.resolve(host)  # The lookup we joined was cancelled, not us
+                raise
+
+        self.misses += 1
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self.inflight[host] = future
+        try:
+            try:
+                infos = await asyncio.wait_for(loop.getaddrinfo(host, None, type=socket.SOCK_STREAM), self.timeout)
+            except asyncio.TimeoutError:
+                raise socket.gaierror(socket.EAI_AGAIN, f"lookup timed out after {self.timeout}s") from None
+            family, _, _, _, sockaddr = infos[0]
+            result = (family, sockaddr[0])
+            self.entries[host] = (time.monotonic() + self.ttl, result)
+            future.set_result(result)
+            return result
+        except Exception as e:
+            # Not just gaierror: a malformed or over-long name raises UnicodeError from the IDNA codec
+            self.entries[host] = (time.monotonic() + self.negative_ttl, e)
+            future.set_exception(e)
+            future.exception()  # Mark retrieved so an unawaited failure is not logged
+            raise
+        except BaseException:
+            future.cancel()  # Never leave callers sharing this lookup waiting on it
+            raise
+        finally:
+            del self.inflight[host]
+
+class LatencyRing:
+    """Fixed-size ring of probe outcomes: connect latency in seconds, NaN for a failed probe."""
+    __slots__ = ('size', 'latencies', 'index', 'count')
+
+    def __init__(self, size=128):
+        self.size = size
+        self.latencies = array('d', [math.nan]) * size
+        self.index = 0
+        self.count = 0
+
+    def record(self, latency):
+        self.latencies[self.index] = math.nan if latency is None else latency
+        self.index = (self.index + 1) % self.size
+        self.count = min(self.count + 1, self.size)
+
+    def samples(self):
+        """Return the recorded outcomes, oldest first."""
+        if self.count < self.size:
+            return self.latencies[:self.count]
+        return self.latencies[self.index:] + self.latencies[:self.index]
+
+    def percentiles(self, points=(50, 95, 99)):
+        """Nearest-rank percentiles of successful probes' latency, or None for each if there were none."""
+        values = sorted(value for value in self.samples() if value == value)
+        if not values:
+            return {p: None for p in points}
+        return {p: values[min(len(values) - 1, int(p / 100 * len(values)))] for p in points}
+
+    def availability(self):
+        """Fraction of recorded probes that succeeded."""
+        if not self.count:
+            return None
+        return sum(1 for value in self.samples() if value == value) / self.count
+
+    def change_rate(self):
+        """Fraction of consecutive probe pairs whose outcome differs."""
+        samples = self.samples()
+        if len(samples) < 2:
+            return 0.0
+        ok = [value == value for value in samples]
+        return sum(1 for a, b in zip(ok, ok[1:]) if a != b) / (len(ok) - 1)
+
+# Upper bounds (seconds) of the exported connect-latency histogram buckets
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+def escape_label(value):
+    """Escape a Prometheus label value."""
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+class TargetState:
+    """Schedule and rolling health of one monitored host:port."""
+    __slots__ = ('host', 'port', 'interval', 'ring', 'up', 'streak', 'flapping', 'last_change',
+                 'labels', 'buckets', 'latency_sum', 'probes', 'failures')
+
+    def __init__(self, host, port, interval, window):
+        self.host = host
+        self.port = port
+        self.interval = interval
+        self.ring = LatencyRing(window)
+        self.up = None  # None until the first probe settles the state
+        self.streak = 0  # Consecutive probes disagreeing with the current state
+        self.flapping = False
+        self.last_change = None
+
+        # Lifetime counters for the metrics endpoint; buckets are per-bucket (not cumulative) counts
+        self.labels = f'target="{escape_label(self.name)}"'
+        self.buckets = array('Q', [0]) * (len(LATENCY_BUCKETS) + 1)
+        self.latency_sum = 0.0
+        self.probes = 0
+        self.failures = 0
+
+    @property
+    def name(self):
+        return f"{self.host}:{self.port}"
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    """Serves the owning server's monitor.render_metrics() at /metrics."""
+
+    def do_GET(self):
+        if self.path.split('?')[0] != '/metrics':
+            self.send_error(404)
+            return
+        body = self.server.monitor.render_metrics()
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logging.debug(f"Metrics request: {format % args}")
+
 class NetworkMonitor:
-    def __init__(self, servers, timeout=5, max_threads=4):
+    def __init__(self, servers, timeout=5, max_threads=4, default_port=80, concurrency=1000, dns_ttl=300,
+                 interval=30, intervals=None, window=128, rise=2, fall=3, flap_start=0.5, flap_stop=0.25):
         self.servers = servers
         self.timeout = timeout
         self.max_threads = max_threads
+        self.default_port = default_port
+        self.targets = [parse_target(server, default_port) for server in servers]
+        self.concurrency = concurrency  # Max probes in flight in the asyncio engine; keep below the fd limit
+        self.dns_cache = DNSCache(ttl=dns_ttl, timeout=timeout)
+
+        # Continuous monitoring: per-target probe interval (intervals maps a server entry or (host, port) to seconds)
+        intervals = {parse_target(target, default_port): seconds for target, seconds in (intervals or {}).items()}
+        self.states = [TargetState(host, port, intervals.get((host, port), interval), window)
+                       for host, port in self.targets]
+        self.rise = rise  # Consecutive successes needed to mark a DOWN target UP
+        self.fall = fall  # Consecutive failures needed to mark an UP target DOWN
+        self.flap_start = flap_start  # Change rate over the window at which a target starts flapping...
+        self.flap_stop = flap_stop  # ...and the lower rate it must drop below to stop
+
+        # Scheduler health: how late probes start relative to their due time
+        self.probe_lag = 0.0
+        self.probe_lag_total = 0.0
+        self.probes_scheduled = 0
+        self.probes_in_flight = 0
+        self.metrics_max_age = 1.0  # Seconds a rendered exposition is reused for
+        self._metrics_cache = (0.0, b'')
+        self._metrics_lock = threading.Lock()
     
     def check_server(self, server, port=80):
         """Check if a server is reachable on a specific port."""
@@ -27,33 +226,272 @@ class NetworkMonitor:
         except socket.timeout:
             logging.error(f"Connection to {server} timed out.")
             return (server, False)
-        except socket.error as e:
+        except (socket.error, UnicodeError) as e:
             logging.error(f"Failed to connect to {server}: {e}")
             return (server, False)
 
     def check_servers_concurrently(self):
-        """Check servers concurrently using multithreading."""
-        threads = []
-        results = []
+        """Check servers concurrently on a pool of `max_threads` threads."""
+        with ThreadPoolExecutor(max_workers=self.max_threads) as executor:
+            return list(executor.map(lambda target: self.check_server(*target), self.targets))
+
+    async def check_server_async(self, host, port):
+        """Probe host:port with a non-blocking connect bounded by the timeout."""
+        loop = asyncio.get_running_loop()
+        try:
+            family, address = await self.dns_cache.resolve(host)
+        except Exception as e:
+            logging.debug(f"Failed to resolve {host}: {e}")
+            return CheckResult(host, port, False, None, f"DNS: {e}")
+
+        sock = socket.socket(family, socket.SOCK_STREAM)
+        sock.setblocking(False)
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(loop.sock_connect(sock, (address, port)), self.timeout)
+            latency = time.perf_counter() - start
+            logging.debug(f"Server {host}:{port} is reachable ({latency * 1000:.1f} ms).")
+            return CheckResult(host, port, True, latency, None)
+        except asyncio.TimeoutError:
+            logging.debug(f"Connection to {host}:{port} timed out.")
+            return CheckResult(host, port, False, None, "timeout")
+        except OSError as e:
+            logging.debug(f"Failed to connect to {host}:{port}: {e}")
+            return CheckResult(host, port, False, None, str(e))
+        finally:
+            sock.close()
+
+    async def stream_checks(self, targets=None):
+        """Yield CheckResults as probes finish, with at most `concurrency` probes in flight."""
+        targets = iter(self.targets if targets is None else targets)
+        pending = set()
+        try:
+            while True:
+                for host, port in targets:
+                    pending.add(asyncio.ensure_future(self.check_server_async(host, port)))
+                    if len(pending) >= self.concurrency:
+                        break
+                if not pending:
+                    return
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    yield task.result()
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def check_servers_async(self, targets=None):
+        """Check all targets with the asyncio engine and return the results in completion order."""
+        return [result async for result in self.stream_checks(targets)]
+
+    def record_probe(self, state, result):
+        """Store a probe outcome and update the target's UP/DOWN and flapping state."""
+        state.ring.record(result.latency if result.reachable else None)
+        state.probes += 1
+        if result.reachable:
+            state.buckets[bisect.bisect_left(LATENCY_BUCKETS, result.latency)] += 1
+            state.latency_sum += result.latency
+        else:
+            state.failures += 1
 
-        def target(server):
-            result = self.check_server(server)
-            results.append(result)
+        if state.up is None:
+            state.up = result.reachable
+            state.last_change = time.time()
+            logging.info(f"{state.name} is {'UP' if state.up else 'DOWN'}.")
+        elif result.reachable != state.up:
+            state.streak += 1
+            if state.streak >= (self.rise if result.reachable else self.fall):
+                state.up = result.reachable
+                state.streak = 0
+                state.last_change = time.time()
+                if state.up:
+                    logging.info(f"{state.name} is UP.")
+                else:
+                    logging.warning(f"{state.name} is DOWN: {result.error}")
+        else:
+            state.streak = 0
 
-        for server in self.servers:
-            thread = threading.Thread(target=target, args=(server,))
-            threads.append(thread)
-            thread.start()
+        if state.ring.count < state.ring.size // 2:
+            return  # Too few probes to judge flapping
+        change_rate = state.ring.change_rate()
+        if not state.flapping and change_rate >= self.flap_start:
+            state.flapping = True
+            logging.warning(f"{state.name} is flapping ({change_rate:.0%} state changes).")
+        elif state.flapping and change_rate < self.flap_stop:
+            state.flapping = False
+            logging.info(f"{state.name} stopped flapping.")
 
-        for thread in threads:
-            thread.join()
+    async def _probe(self, state, semaphore):
+        self.probes_in_flight += 1
+        try:
+            async with semaphore:
+                result = await self.check_server_async(state.host, state.port)
+        finally:
+            self.probes_in_flight -= 1
+        self.record_probe(state, result)
+
+    async def monitor(self, duration=None, report_interval=60):
+        """Probe every target on its own interval until cancelled or `duration` seconds pass.
+
+        First probes are spread evenly across each target's interval and every later one gets a
+        little jitter, so probes don't fire in bursts. A target is rescheduled only once its
+        previous probe has finished, so a slow target never has more than one probe in flight.
+        """
+        loop = asyncio.get_running_loop()
+        semaphore = asyncio.Semaphore(self.concurrency)
+        start = loop.time()
+        count = len(self.states)
+        schedule = [(start + state.interval * i / count, i) for i, state in enumerate(self.states)]
+        heapq.heapify(schedule)
+        tasks = set()
+        rescheduled = asyncio.Event()  # Wakes the scheduler when a finished probe puts its target back
+        next_report = start + report_interval
+
+        def reschedule(task, due, i):
+            tasks.discard(task)
+            interval = self.states[i].interval
+            next_due = max(due + interval, loop.time()) + random.uniform(0, interval * 0.1)
+            heapq.heappush(schedule, (next_due, i))
+            rescheduled.set()
+
+        try:
+            while duration is None or loop.time() - start < duration:
+                now = loop.time()
+                while schedule and schedule[0][0] <= now:
+                    due, i = heapq.heappop(schedule)
+                    self.probe_lag = now - due
+                    self.probe_lag_total += self.probe_lag
+                    self.probes_scheduled += 1
+                    task = asyncio.ensure_future(self._probe(self.states[i], semaphore))
+                    task.add_done_callback(lambda task, due=due, i=i: reschedule(task, due, i))
+                    tasks.add(task)
+                if now >= next_report:
+                    self.log_summary()
+                    next_report = now + report_interval
+                wake = min(schedule[0][0] if schedule else now + 1, next_report)
+                if duration is not None:
+                    wake = min(wake, start + duration)
+                rescheduled.clear()
+                try:
+                    await asyncio.wait_for(rescheduled.wait(), max(0, wake - loop.time()))
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    def get_summary(self):
+        """Return rolling latency percentiles, availability and state for every target."""
+        summary = {}
+        for state in self.states:
+            percentiles = state.ring.percentiles()
+            summary[state.name] = {
+                "up": state.up,
+                "flapping": state.flapping,
+                "availability": state.ring.availability(),
+                "latency_p50": percentiles[50],
+                "latency_p95": percentiles[95],
+                "latency_p99": percentiles[99],
+                "samples": state.ring.count,
+            }
+        return summary
 
-        return results
+    def log_summary(self):
+        summary = self.get_summary()
+        up = sum(1 for entry in summary.values() if entry["up"])
+        flapping = [name for name, entry in summary.items() if entry["flapping"]]
+        logging.info(f"{up}/{len(summary)} targets UP, {len(flapping)} flapping.")
+        for name, entry in summary.items():
+            if entry["latency_p50"] is not None:
+                logging.debug(f"{name}: availability {entry['availability']:.1%}, "
+                              f"p50 {entry['latency_p50'] * 1000:.1f} ms, p95 {entry['latency_p95'] * 1000:.1f} ms, "
+                              f"p99 {entry['latency_p99'] * 1000:.1f} ms")
+
+    def render_metrics(self):
+        """Render all metrics in Prometheus text format, reusing the last rendering for `metrics_max_age` seconds."""
+        with self._metrics_lock:
+            rendered_at, body = self._metrics_cache
+            if time.monotonic() - rendered_at < self.metrics_max_age:
+                return body
+
+            bounds = [f'{bound:g}' for bound in LATENCY_BUCKETS] + ['+Inf']
+            up, flapping, probes, failures, histogram = [], [], [], [], []
+            for state in self.states:
+                labels = state.labels
+                if state.up is not None:
+                    up.append(f'network_monitor_target_up{{{labels}}} {int(state.up)}')
+                flapping.append(f'network_monitor_target_flapping{{{labels}}} {int(state.flapping)}')
+                probes.append(f'network_monitor_probes_total{{{labels}}} {state.probes}')
+                failures.append(f'network_monitor_probe_failures_total{{{labels}}} {state.failures}')
+                cumulative = 0
+                for bound, count in zip(bounds, state.buckets):
+                    cumulative += count
+                    histogram.append(f'network_monitor_connect_latency_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+                histogram.append(f'network_monitor_connect_latency_seconds_sum{{{labels}}} {state.latency_sum}')
+                histogram.append(f'network_monitor_connect_latency_seconds_count{{{labels}}} {cumulative}')
+
+            lines = [
+                '# HELP network_monitor_target_up Whether the target is UP after rise/fall hysteresis.',
+                '# TYPE network_monitor_target_up gauge', *up,
+                '# HELP network_monitor_target_flapping Whether the target is flapping.',
+                '# TYPE network_monitor_target_flapping gauge', *flapping,
+                '# HELP network_monitor_probes_total Probes completed per target.',
+                '# TYPE network_monitor_probes_total counter', *probes,
+                '# HELP network_monitor_probe_failures_total Failed probes per target.',
+                '# TYPE network_monitor_probe_failures_total counter', *failures,
+                '# HELP network_monitor_connect_latency_seconds TCP connect latency of successful probes.',
+                '# TYPE network_monitor_connect_latency_seconds histogram', *histogram,
+                '# HELP network_monitor_probe_lag_seconds How late the most recently started probe was.',
+                '# TYPE network_monitor_probe_lag_seconds gauge',
+                f'network_monitor_probe_lag_seconds {self.probe_lag}',
+                '# HELP network_monitor_probe_lag_seconds_total Summed start lag of all scheduled probes.',
+                '# TYPE network_monitor_probe_lag_seconds_total counter',
+                f'network_monitor_probe_lag_seconds_total {self.probe_lag_total}',
+                '# HELP network_monitor_probes_scheduled_total Probes started by the scheduler.',
+                '# TYPE network_monitor_probes_scheduled_total counter',
+                f'network_monitor_probes_scheduled_total {self.probes_scheduled}',
+                '# HELP network_monitor_probes_in_flight Probes currently running or waiting for a slot.',
+                '# TYPE network_monitor_probes_in_flight gauge',
+                f'network_monitor_probes_in_flight {self.probes_in_flight}',
+            ]
+            body = ('\n'.join(lines) + '\n').encode('utf-8')
+            self._metrics_cache = (time.monotonic(), body)
+            return body
+
+    def start_metrics_server(self, port=9100, host='0.0.0.0'):
+        """Serve /metrics from a background thread so scrapes never block the probe loop."""
+        server = ThreadingHTTPServer((host, port), MetricsHandler)
+        server.daemon_threads = True
+        server.monitor = self
+        thread = threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True)
+        thread.start()
+        logging.info(f"Serving metrics on http://{host}:{server.server_address[1]}/metrics")
+        return server
+
+    def run_continuous(self, duration=None, report_interval=60, metrics_port=None):
+        """Monitor continuously until interrupted or `duration` seconds pass, then log a final summary."""
+        server = self.start_metrics_server(metrics_port) if metrics_port is not None else None
+        try:
+            asyncio.run(self.monitor(duration, report_interval))
+        except KeyboardInterrupt:
+            logging.info("Monitoring stopped.")
+        finally:
+            if server is not None:
+                server.shutdown()
+                server.server_close()
+        self.log_summary()
 
-    def run(self):
+    def run(self, use_asyncio=True):
         """Run the network monitoring process."""
         try:
-            results = self.check_servers_concurrently()
+            if use_asyncio:
+                start = time.perf_counter()
+                results = asyncio.run(self.check_servers_async())
+                logging.info(f"Checked {len(results)} targets in {time.perf_counter() - start:.2f}s.")
+                results = [(f"{result.host}:{result.port}", result.reachable) for result in results]
+            else:
+                results = self.check_servers_concurrently()
             logging.info("Network monitoring results:")
             for server, is_reachable in results:
                 status = "UP" if is_reachable else "DOWN"
@@ -65,7 +503,7 @@ class NetworkMonitor:
 
 # Example usage
 def main():
-    servers = ["google.com", "example.com", "nonexistentwebsite.xyz"]
+    servers = ["google.com", "example.com:443", "nonexistentwebsite.xyz"]
     monitor = NetworkMonitor(servers)
     monitor.run()
 
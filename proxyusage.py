@@ -1,40 +1,187 @@
 #chatgpt
 import requests
-from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+from htmlextraction import HTMLExtractor
 import random
+import threading
+import time
 import logging
 
 # Configure logging
 logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s')
 
+class ProxyPoolError(Exception):
+    """Custom exception for proxy pool errors."""
+    pass
+
+class ProxyState:
+    """Health of one proxy plus the keep-alive session that routes through it."""
+
+    def __init__(self, proxy, pool_size, initial_latency):
+        self.proxy = proxy
+        self.session = requests.Session()
+        self.session.proxies = {"http": proxy, "https": proxy}
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.successes = 0
+        self.failures = 0
+        self.success_ewma = 1.0  # Start optimistic so new proxies get traffic
+        self.latency_ewma = initial_latency
+        self.consecutive_failures = 0
+        self.quarantines = 0  # Quarantines since the last success; drives the cooldown exponent
+        self.quarantined_until = 0.0
+
+    def score(self):
+        """Higher is better: expected successes per second of latency."""
+        return max(self.success_ewma, 0.01) / max(self.latency_ewma, 0.001)
+
+class ProxyPool:
+    """Routes requests across proxies by health score and quarantines failing ones.
+
+    Each proxy keeps a success-rate and latency EWMA. Proxies are picked at random with
+    probability proportional to their score, so most traffic moves to the fast, reliable
+    proxies while the others still get the occasional request that lets them recover.
+    After `failure_threshold` consecutive failures a proxy is quarantined for
+    `base_cooldown * 2 ** n` seconds (capped at `max_cooldown`), where n counts
+    quarantines since its last success. Until it succeeds again, a proxy that
+    comes out of quarantine goes straight back in on its first failure.
+    """
+
+    def __init__(self, proxies, alpha=0.3, failure_threshold=3, base_cooldown=5.0, max_cooldown=300.0,
+                 pool_size=10, initial_latency=1.0, clock=time.monotonic):
+        if not proxies:
+            raise ProxyPoolError("At least one proxy is required.")
+        self.alpha = alpha  # EWMA weight of the newest observation
+        self.failure_threshold = failure_threshold
+        self.base_cooldown = base_cooldown
+        self.max_cooldown = max_cooldown
+        self.clock = clock
+        self.states = {proxy: ProxyState(proxy, pool_size, initial_latency) for proxy in proxies}
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Pick a proxy by weighted score, skipping quarantined ones.
+
+        If every proxy is quarantined, the one whose cooldown ends first is returned so
+        requests keep flowing as a probe instead of failing outright.
+        """
+        with self.lock:
+            now = self.clock()
+            available = [state for state in self.states.values() if state.quarantined_until <= now]
+            if not available:
+                state = min(self.states.values(), key=lambda s: s.quarantined_until)
+                logging.warning(f"All proxies quarantined; probing {state.proxy}")
+                return state
+            return random.choices(available, weights=[state.score() for state in available])[0]
+
+    def report_success(self, state, latency):
+        with self.lock:
+            state.successes += 1
+            state.success_ewma += self.alpha * (1.0 - state.success_ewma)
+            state.latency_ewma += self.alpha * (latency - state.latency_ewma)
+            state.consecutive_failures = 0
+            state.quarantines = 0
+            state.quarantined_until = 0.0
+
+    def report_failure(self, state):
+        with self.lock:
+            state.failures += 1
+            state.success_ewma -= self.alpha * state.success_ewma
+            state.consecutive_failures += 1
+            now = self.clock()
+            if state.quarantined_until > now:
+                return  # Late failures of requests sent before the quarantine (or probes) don't extend it
+            on_probation = state.quarantines > 0  # Not recovered since its last quarantine
+            if on_probation or state.consecutive_failures >= self.failure_threshold:
+                cooldown = min(self.max_cooldown, self.base_cooldown * 2 ** state.quarantines)
+                state.quarantines += 1
+                state.consecutive_failures = 0
+                state.quarantined_until = now + cooldown
+                logging.warning(f"Quarantining proxy {state.proxy} for {cooldown:.0f}s")
+
+    def get_stats(self):
+        """Return per-proxy counters, EWMAs and quarantine status."""
+        with self.lock:
+            now = self.clock()
+            return {
+                state.proxy: {
+                    "successes": state.successes,
+                    "failures": state.failures,
+                    "success_ewma": state.success_ewma,
+                    "latency_ewma": state.latency_ewma,
+                    "score": state.score(),
+                    "quarantined_for": max(0.0, state.quarantined_until - now),
+                }
+                for state in self.states.values()
+            }
+
+    def close(self):
+        for state in self.states.values():
+            state.session.close()
+
 class WebScraperWithProxy:
-    def __init__(self, url, proxies):
+    # Statuses that indicate the proxy, not the origin, failed
+    PROXY_FAILURE_STATUSES = {407, 502, 503, 504}
+
+    def __init__(self, url, proxies, timeout=5, max_attempts=3, pool=None, parser_backend="auto", parse_processes=0):
         self.url = url
         self.proxies = proxies
+        self.timeout = timeout
+        self.max_attempts = max_attempts  # Proxies tried per page before giving up
+        self.pool = pool or ProxyPool(proxies)
+        self.extractor = HTMLExtractor(parser_backend, processes=parse_processes)
 
-    def fetch_page(self):
-        """Fetch a web page using a random proxy."""
-        proxy = random.choice(self.proxies)
-        logging.info(f"Using proxy: {proxy}")
-        
-        try:
-            response = requests.get(self.url, proxies={"http": proxy, "https": proxy}, timeout=5)
-            response.raise_for_status()
-            logging.info(f"Successfully fetched page: {self.url}")
+    def fetch_page(self, url=None):
+        """Fetch a web page through the healthiest proxies, moving on to another proxy when one fails."""
+        url = url or self.url
+        for attempt in range(1, self.max_attempts + 1):
+            state = self.pool.acquire()
+            logging.info(f"Using proxy: {state.proxy}")
+            start = time.perf_counter()
+            try:
+                response = state.session.get(url, timeout=self.timeout)
+                if response.status_code in self.PROXY_FAILURE_STATUSES:
+                    raise requests.exceptions.ProxyError(f"Proxy returned status {response.status_code}")
+                response.raise_for_status()
+            except requests.exceptions.HTTPError as e:
+                # The origin answered, so the proxy did its job
+                self.pool.report_success(state, time.perf_counter() - start)
+                logging.error(f"Error fetching page: {e}")
+                return None
+            except requests.exceptions.RequestException as e:
+                self.pool.report_failure(state)
+                logging.warning(f"Proxy {state.proxy} failed (attempt {attempt}/{self.max_attempts}): {e}")
+                continue
+            self.pool.report_success(state, time.perf_counter() - start)
+            logging.info(f"Successfully fetched page: {url}")
             return response.text
-        except requests.exceptions.RequestException as e:
-            logging.error(f"Error fetching page: {e}")
-            return None
+        logging.error(f"Error fetching page: all {self.max_attempts} attempts failed for {url}")
+        return None
 
     def parse_html(self, html):
         """Parse HTML and extract data."""
         if not html:
             logging.error("No HTML to parse.")
             return None
-        
-        soup = BeautifulSoup(html, 'html.parser')
-        title = soup.title.string if soup.title else "No title"
+
+        title = self.extractor.title(html) or "No title"
         logging.info(f"Page title: {title}")
         return title
 
-   
+    def close(self):
+        self.pool.close()
+        self.extractor.close()
+
+# Example usage
+def main():
+    proxies = ["http://127.0.0.1:8080", "http://127.0.0.1:8081"]
+    scraper = WebScraperWithProxy("http://example.com", proxies)
+    try:
+        scraper.parse_html(scraper.fetch_page())
+        logging.info(f"Proxy stats: {scraper.pool.get_stats()}")
+    finally:
+        scraper.close()
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,13 @@
 #chat gpt AI
+import os
+import json
+import time
+import zlib
+import struct
 import logging
+import threading
+from array import array
+from decimal import Decimal, InvalidOperation
 
 # Configure logging
 logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -8,6 +16,585 @@ class InsufficientFundsError(Exception):
     """Custom exception for insufficient funds."""
     pass
 
+class AccountNotFoundError(Exception):
+    """Custom exception for unknown account ids."""
+    pass
+
+class LedgerError(Exception):
+    """Custom exception for ledger persistence and recovery errors."""
+    pass
+
+def to_minor_units(amount):
+    """Convert a currency amount such as 12.34 or "12.34" to integer cents without float rounding."""
+    try:
+        cents = Decimal(str(amount)) * 100
+    except InvalidOperation:
+        raise ValueError(f"Invalid amount: {amount!r}")
+    if cents != cents.to_integral_value():
+        raise ValueError(f"Amount has fractions of a cent: {amount!r}")
+    return int(cents)
+
+def format_minor_units(cents):
+    sign = "-" if cents < 0 else ""
+    return f"{sign}${abs(cents) // 100}.{abs(cents) % 100:02d}"
+
+class AccountStore:
+    """Many accounts in compact, thread-safe storage.
+
+    Balances are integer minor units (cents) in one array of signed 64-bit ints, indexed by
+    account id, so an account costs 8 bytes plus its holder name. Accounts are guarded by
+    `stripes` locks (account id modulo stripes): operations on different accounts rarely
+    contend, and multi-account operations take their stripes in ascending order so they
+    cannot deadlock. Amounts passed to the methods are positive integers in minor units;
+    use to_minor_units() to convert from dollars. Individual operations are not logged.
+
+    Subclasses can persist changes through the _journal_open/_journal_deltas hooks, which run
+    while the affected locks are held and before anything is changed (so a hook that raises
+    leaves the store untouched), and _commit, which runs after the locks are released.
+    """
+
+    def __init__(self, stripes=256):
+        self.balances = array('q')
+        self.holders = []
+        self.locks = [threading.Lock() for _ in range(stripes)]
+        self.create_lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.balances)
+
+    def open_account(self, account_holder, balance=0):
+        """Create an account and return its id."""
+        self._check_opening_balance(balance)
+        with self.create_lock:
+            token = self._journal_open(1, account_holder, balance)
+            self.holders.append(account_holder)
+            self.balances.append(balance)
+            account_id = len(self.balances) - 1
+        self._commit(token)
+        return account_id
+
+    def open_accounts(self, count, account_holder="", balance=0):
+        """Create `count` accounts in one step and return the id of the first."""
+        if type(count) is not int or count < 1:
+            raise ValueError(f"Account count must be a positive integer, got {count!r}.")
+        self._check_opening_balance(balance)
+        with self.create_lock:
+            token = self._journal_open(count, account_holder, balance)
+            first = len(self.balances)
+            self.holders.extend([account_holder] * count)
+            self.balances.extend(array('q', [balance]) * count)
+        self._commit(token)
+        return first
+
+    def _journal_open(self, count, account_holder, balance):
+        """Hook: `count` accounts are about to be appended. Returns a token passed to _commit."""
+        return None
+
+    def _journal_deltas(self, deltas):
+        """Hook: balances are about to change by the (account_id, change) pairs. Returns a token passed to _commit."""
+        return None
+
+    def _commit(self, token):
+        """Hook: called once the locks are released, e.g. to wait for durability."""
+        pass
+
+    def _check(self, account_id, amount=None):
+        if not 0 <= account_id < len(self.balances):
+            raise AccountNotFoundError(f"No account with id {account_id}.")
+        if amount is not None and (type(amount) is not int or amount <= 0):
+            raise ValueError(f"Amount must be a positive integer number of minor units, got {amount!r}.")
+
+    def _check_opening_balance(self, balance):
+        # Checked before the holders and balances arrays are touched, so they always line up
+        if type(balance) is not int:
+            raise ValueError(f"Initial balance must be an integer number of minor units, got {balance!r}.")
+        if balance < 0:
+            raise ValueError("Initial balance cannot be negative.")
+        self._check_range(balance)
+
+    @staticmethod
+    def _check_range(balance):
+        """Reject balances the int64 array cannot hold, before anything is journaled."""
+        if not -2 ** 63 <= balance < 2 ** 63:
+            raise OverflowError(f"Balance {balance} does not fit in 64 bits.")
+
+    def _lock(self, account_id):
+        return self.locks[account_id % len(self.locks)]
+
+    def get_balance(self, account_id):
+        self._check(account_id)
+        return self.balances[account_id]
+
+    def get_holder(self, account_id):
+        self._check(account_id)
+        return self.holders[account_id]
+
+    def deposit(self, account_id, amount):
+        """Deposit money into the account and return the new balance."""
+        self._check(account_id, amount)
+        with self._lock(account_id):
+            balance = self.balances[account_id] + amount
+            self._check_range(balance)
+            token = self._journal_deltas(((account_id, amount),))
+            self.balances[account_id] = balance
+        self._commit(token)
+        return balance
+
+    def withdraw(self, account_id, amount):
+        """Withdraw money from the account and return the new balance."""
+        self._check(account_id, amount)
+        with self._lock(account_id):
+            if amount > self.balances[account_id]:
+                raise InsufficientFundsError(f"Insufficient funds in account {account_id} for this withdrawal.")
+            balance = self.balances[account_id] - amount
+            token = self._journal_deltas(((account_id, -amount),))
+            self.balances[account_id] = balance
+        self._commit(token)
+        return balance
+
+    def _acquire(self, account_ids):
+        """Acquire the stripes covering the accounts in ascending order; return them for release."""
+        stripes = sorted({account_id % len(self.locks) for account_id in account_ids})
+        for stripe in stripes:
+            self.locks[stripe].acquire()
+        return stripes
+
+    def _release(self, stripes):
+        for stripe in reversed(stripes):
+            self.locks[stripe].release()
+
+    def transfer(self, source_id, target_id, amount):
+        """Atomically move money between two accounts."""
+        self._check(source_id, amount)
+        self._check(target_id)
+        if source_id == target_id:
+            raise ValueError("Cannot transfer to the same account.")
+        stripes = self._acquire((source_id, target_id))
+        try:
+            if amount > self.balances[source_id]:
+                raise InsufficientFundsError(f"Insufficient funds in account {source_id} for this transfer.")
+            self._check_range(self.balances[target_id] + amount)
+            token = self._journal_deltas(((source_id, -amount), (target_id, amount)))
+            self.balances[source_id] -= amount
+            self.balances[target_id] += amount
+        finally:
+            self._release(stripes)
+        self._commit(token)
+
+    def apply_batch(self, transactions):
+        """Validate and apply many operations atomically: either all of them take effect or none do.
+
+        Each transaction is ("deposit", account_id, amount), ("withdraw", account_id, amount)
+        or ("transfer", source_id, target_id, amount). Operations are checked in order against
+        the balances left by the ones before them, so a batch may spend money it deposits.
+        Raises ValueError, AccountNotFoundError or InsufficientFundsError naming the first
+        failing transaction, leaving every balance unchanged.
+        """
+        transactions = list(transactions)
+        deltas = []  # (account_id, change) pairs, in order
+        for index, transaction in enumerate(transactions):
+            try:
+                kind = transaction[0]
+                if kind == "deposit":
+                    _, account_id, amount = transaction
+                    self._check(account_id, amount)
+                    deltas.append((account_id, amount))
+                elif kind == "withdraw":
+                    _, account_id, amount = transaction
+                    self._check(account_id, amount)
+                    deltas.append((account_id, -amount))
+                elif kind == "transfer":
+                    _, source_id, target_id, amount = transaction
+                    self._check(source_id, amount)
+                    self._check(target_id)
+                    if source_id == target_id:
+                        raise ValueError("Cannot transfer to the same account.")
+                    deltas.append((source_id, -amount))
+                    deltas.append((target_id, amount))
+                else:
+                    raise ValueError(f"Unknown transaction type {kind!r}.")
+            except (ValueError, TypeError, IndexError) as e:
+                raise ValueError(f"Transaction {index} is invalid: {e}") from e
+            except AccountNotFoundError as e:
+                raise AccountNotFoundError(f"Transaction {index}: {e}") from e
+
+        stripes = self._acquire(account_id for account_id, _ in deltas)
+        try:
+            # Check every intermediate balance before touching any of them
+            running = {}
+            position = 0
+            for index, transaction in enumerate(transactions):
+                changes = 2 if transaction[0] == "transfer" else 1
+                for account_id, change in deltas[position:position + changes]:
+                    balance = running.get(account_id, self.balances[account_id]) + change
+                    if balance < 0:
+                        raise InsufficientFundsError(f"Transaction {index} would overdraw account {account_id}.")
+                    self._check_range(balance)
+                    running[account_id] = balance
+                position += changes
+            net = [(account_id, balance - self.balances[account_id]) for account_id, balance in running.items()]
+            token = self._journal_deltas(net)  # One record, so recovery sees all of the batch or none of it
+            for account_id, balance in running.items():
+                self.balances[account_id] = balance
+        finally:
+            self._release(stripes)
+        self._commit(token)
+        logging.debug(f"Applied batch of {len(transactions)} transactions across {len(running)} accounts.")
+        return len(transactions)
+
+def fsync_directory(directory):
+    """Make file creations and renames in a directory durable (a no-op where unsupported)."""
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+class WriteAheadLog:
+    """Append-only, checksummed log of ledger changes, split into segment files.
+
+    Each record is framed as (payload length, CRC32) + (sequence number, kind, body) and lands
+    in wal-<first sequence number>.log. Appending only queues the record; a flusher thread
+    writes whatever has queued up in a single write, so concurrent operations share writes
+    and fsyncs (group commit). The fsync policy decides durability:
+
+      "always"   - wait_durable() returns only once the record is fsynced.
+      "interval" - the log is fsynced at most every `fsync_interval` seconds; a crash can lose
+                   operations from that last window.
+      "never"    - records reach the OS but are only fsynced on rotate() and close().
+
+    `group_commit_delay` makes the flusher wait that long before each write to gather more
+    records per fsync, trading a little latency for throughput.
+    """
+    FSYNC_POLICIES = ("always", "interval", "never")
+    HEADER = struct.Struct('<II')  # Payload length, CRC32 of the payload
+    RECORD = struct.Struct('<QB')  # Sequence number, record kind
+
+    def __init__(self, directory, next_seq=1, fsync="always", fsync_interval=1.0, group_commit_delay=0.0):
+        if fsync not in self.FSYNC_POLICIES:
+            raise LedgerError(f"Unknown fsync policy '{fsync}'. Choose from {', '.join(self.FSYNC_POLICIES)}.")
+        self.directory = directory
+        self.fsync = fsync
+        self.fsync_interval = fsync_interval
+        self.group_commit_delay = group_commit_delay
+        self.last_seq = next_seq - 1  # Last sequence number handed out
+        self.written_seq = self.last_seq  # Last one written to the file
+        self.durable_seq = self.last_seq  # Last one fsynced
+        self.pending = []
+        self.lock = threading.Lock()
+        self.has_pending = threading.Condition(self.lock)
+        self.synced = threading.Condition(self.lock)
+        self.io_lock = threading.Lock()  # Serializes writes, fsyncs and segment rotation
+        self.closed = False
+        self.error = None
+        self.last_sync = time.monotonic()
+        self.writes = 0
+        self.fsyncs = 0
+        self.file = self._open_segment(next_seq)
+        self.flusher = threading.Thread(target=self._flush_loop, name="wal-flusher", daemon=True)
+        self.flusher.start()
+
+    @staticmethod
+    def segment_path(directory, start_seq):
+        return os.path.join(directory, f"wal-{start_seq:020d}.log")
+
+    @staticmethod
+    def list_segments(directory):
+        """Return (start sequence number, path) for every segment, oldest first."""
+        segments = []
+        for name in os.listdir(directory):
+            if name.startswith("wal-") and name.endswith(".log"):
+                segments.append((int(name[4:-4]), os.path.join(directory, name)))
+        return sorted(segments)
+
+    def _open_segment(self, start_seq):
+        f = open(self.segment_path(self.directory, start_seq), 'ab', buffering=0)
+        fsync_directory(self.directory)
+        return f
+
+    def append(self, kind, body):
+        """Queue a record and return its sequence number."""
+        with self.lock:
+            if self.error is not None:
+                raise LedgerError(f"Write-ahead log failed earlier: {self.error}")
+            if self.closed:
+                raise LedgerError("Write-ahead log is closed.")
+            self.last_seq += 1
+            payload = self.RECORD.pack(self.last_seq, kind) + body
+            self.pending.append(self.HEADER.pack(len(payload), zlib.crc32(payload)) + payload)
+            if len(self.pending) == 1:
+                self.has_pending.notify()
+            return self.last_seq
+
+    def wait_durable(self, seq):
+        """Block until record `seq` is fsynced; returns immediately unless the policy is "always"."""
+        if self.fsync != "always":
+            return
+        with self.lock:
+            while self.durable_seq < seq and self.error is None:
+                self.synced.wait()
+            if self.durable_seq < seq:
+                raise LedgerError(f"Write-ahead log failed: {self.error}")
+
+    def flush(self, force_sync=False):
+        """Write every queued record and fsync if the policy (or `force_sync`) calls for it."""
+        with self.io_lock:
+            with self.lock:
+                batch, self.pending = self.pending, []
+                seq = self.last_seq
+            now = time.monotonic()
+            sync = seq > self.durable_seq and (force_sync or self.fsync == "always" or (
+                self.fsync == "interval" and now - self.last_sync >= self.fsync_interval))
+            try:
+                if batch:
+                    self.file.write(b''.join(batch))
+                    self.writes += 1
+                if sync:
+                    os.fsync(self.file.fileno())
+                    self.fsyncs += 1
+                    self.last_sync = now
+            except OSError as e:
+                logging.error(f"Write-ahead log write failed: {e}")
+                with self.lock:
+                    self.error = e
+                    self.synced.notify_all()
+                raise LedgerError(f"Write-ahead log write failed: {e}") from e
+            with self.lock:
+                self.written_seq = seq
+                if sync:
+                    self.durable_seq = seq
+                self.synced.notify_all()
+
+    def _flush_loop(self):
+        while True:
+            with self.lock:
+                if not self.pending and not self.closed:
+                    timeout = None
+                    if self.fsync == "interval" and self.written_seq > self.durable_seq:
+                        timeout = max(0.0, self.last_sync + self.fsync_interval - time.monotonic())
+                    self.has_pending.wait(timeout)
+                if self.closed:
+                    return
+            if self.group_commit_delay:
+                time.sleep(self.group_commit_delay)
+            try:
+                self.flush()
+            except LedgerError:
+                return
+
+    def rotate(self):
+        """Flush and fsync the current segment and start a new one; returns the last sequence number
+        in the old segments. The caller must stop appends while this runs."""
+        self.flush(force_sync=True)
+        with self.io_lock:
+            self.file.close()
+            self.file = self._open_segment(self.last_seq + 1)
+        return self.last_seq
+
+    def close(self):
+        with self.lock:
+            if self.closed:
+                return
+            self.closed = True
+            self.has_pending.notify()
+        self.flusher.join()
+        try:
+            self.flush(force_sync=True)
+        finally:
+            self.file.close()
+
+class DurableAccountStore(AccountStore):
+    """AccountStore that journals every change to a write-ahead log and recovers it on start.
+
+    `directory` holds the WAL segments and at most one snapshot. Every `snapshot_every`
+    records, a background thread briefly pauses writers, rotates the WAL and copies the
+    balances, then writes them out as a compact snapshot and deletes the segments it covers.
+    Recovery then only replays the records since the last snapshot. A torn record at the end
+    of the newest segment (a crash mid-write) is truncated away; damage anywhere else raises
+    LedgerError. With fsync="always", operations return only once they are durable.
+    """
+    RECORD_OPEN = 1
+    RECORD_DELTAS = 2
+    OPEN_BODY = struct.Struct('<Qq')  # Account count, initial balance; the holder name follows
+    SNAPSHOT_MAGIC = b'LEDGSNP1'
+    SNAPSHOT_HEADER = struct.Struct('<8sQQII')  # Magic, sequence number, accounts, CRC32, holders size
+
+    def __init__(self, directory, stripes=256, fsync="always", fsync_interval=1.0, group_commit_delay=0.0,
+                 snapshot_every=1000000):
+        super().__init__(stripes)
+        self.directory = directory
+        self.snapshot_every = snapshot_every
+        self.snapshot_lock = threading.Lock()  # Held for a whole snapshot
+        self.snapshot_start_lock = threading.Lock()  # Only guards starting the background snapshot thread
+        self.snapshot_thread = None
+        os.makedirs(directory, exist_ok=True)
+
+        start = time.perf_counter()
+        self.snapshot_seq, last_seq, replayed = self._recover()
+        self.recovery_stats = {"seconds": time.perf_counter() - start, "snapshot_seq": self.snapshot_seq,
+                               "replayed_records": replayed, "accounts": len(self.balances)}
+        logging.info(f"Recovered {len(self.balances)} accounts from {directory} "
+                     f"(snapshot at {self.snapshot_seq}, {replayed} records replayed) "
+                     f"in {self.recovery_stats['seconds']:.2f}s.")
+        self.wal = WriteAheadLog(directory, last_seq + 1, fsync, fsync_interval, group_commit_delay)
+
+    # Journaling hooks
+
+    def _journal_open(self, count, account_holder, balance):
+        return self.wal.append(self.RECORD_OPEN, self.OPEN_BODY.pack(count, balance) + account_holder.encode('utf-8'))
+
+    def _journal_deltas(self, deltas):
+        flat = [value for pair in deltas for value in pair]
+        return self.wal.append(self.RECORD_DELTAS, struct.pack(f'<I{len(flat)}q', len(deltas), *flat))
+
+    def _commit(self, seq):
+        self.wal.wait_durable(seq)
+        if self.snapshot_every and seq - self.snapshot_seq >= self.snapshot_every:
+            with self.snapshot_start_lock:
+                if self.snapshot_thread is None or not self.snapshot_thread.is_alive():
+                    self.snapshot_thread = threading.Thread(target=self.snapshot, name="ledger-snapshot", daemon=True)
+                    self.snapshot_thread.start()
+
+    # Snapshots
+
+    def _snapshot_files(self):
+        return sorted(name for name in os.listdir(self.directory)
+                      if name.startswith("snapshot-") and name.endswith(".snap"))
+
+    def snapshot(self):
+        """Write a snapshot of every balance and drop the WAL segments it makes redundant."""
+        with self.snapshot_lock:
+            # Pause writers only for the rotation and an in-memory copy
+            self.create_lock.acquire()
+            for lock in self.locks:
+                lock.acquire()
+            try:
+                seq = self.wal.rotate()
+                balances = self.balances[:]
+                holders = list(self.holders)
+            finally:
+                for lock in reversed(self.locks):
+                    lock.release()
+                self.create_lock.release()
+
+            balance_bytes = balances.tobytes()
+            holder_bytes = zlib.compress(json.dumps(holders).encode('utf-8'), 1)
+            checksum = zlib.crc32(holder_bytes, zlib.crc32(balance_bytes))
+            path = os.path.join(self.directory, f"snapshot-{seq:020d}.snap")
+            tmp_path = path + ".tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(self.SNAPSHOT_HEADER.pack(self.SNAPSHOT_MAGIC, seq, len(balances), checksum, len(holder_bytes)))
+                f.write(balance_bytes)
+                f.write(holder_bytes)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, path)
+            fsync_directory(self.directory)
+            self.snapshot_seq = seq
+
+            for name in self._snapshot_files():
+                if name != os.path.basename(path):
+                    os.remove(os.path.join(self.directory, name))
+            for start_seq, segment in WriteAheadLog.list_segments(self.directory):
+                if start_seq <= seq:
+                    os.remove(segment)
+            logging.info(f"Snapshot of {len(balances)} accounts written at record {seq}.")
+            return path
+
+    def _load_snapshot(self, path):
+        with open(path, 'rb') as f:
+            header = f.read(self.SNAPSHOT_HEADER.size)
+            magic, seq, count, checksum, holders_size = self.SNAPSHOT_HEADER.unpack(header)
+            if magic != self.SNAPSHOT_MAGIC:
+                raise LedgerError(f"{path} is not a ledger snapshot.")
+            balance_bytes = f.read(count * 8)
+            holder_bytes = f.read(holders_size)
+        if zlib.crc32(holder_bytes, zlib.crc32(balance_bytes)) != checksum:
+            raise LedgerError(f"Snapshot {path} is corrupt.")
+        self.balances = array('q')
+        self.balances.frombytes(balance_bytes)
+        self.holders = json.loads(zlib.decompress(holder_bytes))
+        return seq
+
+    # Recovery
+
+    def _recover(self):
+        """Load the latest snapshot and replay newer WAL records; return (snapshot seq, last seq, records replayed)."""
+        for name in os.listdir(self.directory):
+            if name.endswith(".tmp"):
+                os.remove(os.path.join(self.directory, name))  # Unfinished snapshot
+        snapshots = self._snapshot_files()
+        snapshot_seq = self._load_snapshot(os.path.join(self.directory, snapshots[-1])) if snapshots else 0
+
+        last_seq = snapshot_seq
+        replayed = 0
+        segments = WriteAheadLog.list_segments(self.directory)
+        for index, (_, path) in enumerate(segments):
+            last_seq, count = self._replay_segment(path, last_seq, newest=index == len(segments) - 1)
+            replayed += count
+        return snapshot_seq, last_seq, replayed
+
+    def _replay_segment(self, path, last_seq, newest):
+        with open(path, 'rb') as f:
+            data = f.read()
+        view = memoryview(data)
+        header_size = WriteAheadLog.HEADER.size
+        record_size = WriteAheadLog.RECORD.size
+        offset = 0
+        replayed = 0
+        balances = self.balances
+        while offset + header_size <= len(data):
+            length, checksum = WriteAheadLog.HEADER.unpack_from(data, offset)
+            start = offset + header_size
+            end = start + length
+            if end > len(data) or zlib.crc32(view[start:end]) != checksum:
+                break
+            seq, kind = WriteAheadLog.RECORD.unpack_from(data, start)
+            if seq > last_seq:
+                if seq != last_seq + 1:
+                    raise LedgerError(f"Missing records {last_seq + 1}-{seq - 1} before {path}.")
+                body = start + record_size
+                if kind == self.RECORD_DELTAS:
+                    (pairs,) = struct.unpack_from('<I', data, body)
+                    values = struct.unpack_from(f'<{pairs * 2}q', data, body + 4)
+                    for i in range(0, len(values), 2):
+                        balances[values[i]] += values[i + 1]
+                elif kind == self.RECORD_OPEN:
+                    count, balance = self.OPEN_BODY.unpack_from(data, body)
+                    holder = bytes(view[body + self.OPEN_BODY.size:end]).decode('utf-8')
+                    self.holders.extend([holder] * count)
+                    balances.extend(array('q', [balance]) * count)
+                else:
+                    raise LedgerError(f"Unknown record kind {kind} in {path}.")
+                last_seq = seq
+                replayed += 1
+            offset = end
+
+        view.release()
+        if offset < len(data):
+            if not newest:
+                raise LedgerError(f"Corrupt record at offset {offset} in {path}.")
+            logging.warning(f"Truncating torn record at offset {offset} in {path}.")
+            with open(path, 'r+b') as f:
+                f.truncate(offset)
+        return last_seq, replayed
+
+    def close(self):
+        if self.snapshot_thread is not None:
+            self.snapshot_thread.join()
+        self.wal.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
 class BankAccount:
     def __init__(self, account_holder, balance=0):
         self.account_holder = account_holder
@@ -58,5 +645,26 @@ def main():
     except Exception as e:
         logging.error(f"Unexpected error: {e}")
 
+    # Example of many accounts in an AccountStore (amounts in cents)
+    try:
+        store = AccountStore()
+        alice = store.open_account("Alice", to_minor_units("500.00"))
+        bob = store.open_account("Bob")
+        store.transfer(alice, bob, to_minor_units("120.50"))
+        store.apply_batch([
+            ("deposit", bob, to_minor_units(30)),
+            ("withdraw", alice, to_minor_units(50)),
+            ("transfer", bob, alice, to_minor_units("10.25")),
+        ])
+        for account_id in (alice, bob):
+            logging.info(f"{store.get_holder(account_id)}: {format_minor_units(store.get_balance(account_id))}")
+        store.apply_batch([("withdraw", bob, to_minor_units(1000))])  # Rejected; nothing is applied
+    except InsufficientFundsError as e:
+        logging.error(f"Transaction failed: {e}")
+    except ValueError as e:
+        logging.error(f"Invalid input: {e}")
+    except Exception as e:
+        logging.error(f"Unexpected error: {e}")
+
 if __name__ == "__main__":
     main()
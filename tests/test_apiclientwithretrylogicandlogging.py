@@ -0,0 +1,289 @@
+import json
+import time
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import formatdate
+from urllib.parse import parse_qsl
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import pytest
+
+from apiclientwithretrylogicandlogging import (APIClient, APIClientError, AsyncAPIClient, CircuitBreaker,
+                                               CircuitOpenError, ResponseCache, RetryBudget, RetryPolicy)
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """Answers /status/<code> with that status, /slow after a delay, anything else with 200.
+
+    A `retry-after=<value>` query parameter is sent back as a Retry-After header. /versioned
+    carries an ETag of the server's `version` and answers 304 to a matching If-None-Match.
+    """
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.hits[self.path] = server.hits.get(self.path, 0) + 1
+        path, _, query = self.path.partition("?")
+        params = dict(parse_qsl(query))
+        code = 200
+        if path.startswith("/status/"):
+            code = int(path.split("/")[2])
+        elif path == "/slow":
+            with server.lock:
+                server.active += 1
+                server.peak = max(server.peak, server.active)
+            time.sleep(server.slow_delay)
+            with server.lock:
+                server.active -= 1
+        body = json.dumps({"path": self.path}).encode()
+        etag = None
+        if path == "/versioned":
+            etag = f'"v{server.version}"'
+            body = json.dumps({"version": server.version}).encode()
+            if self.headers.get("If-None-Match") == etag:
+                code, body = 304, b""
+        self.send_response(code)
+        if etag:
+            self.send_header("ETag", etag)
+        self.send_header("Content-Type", "application/json")
+        if "retry-after" in params:
+            self.send_header("Retry-After", params["retry-after"])
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), StandInHandler)
+    httpd.hits = {}
+    httpd.lock = threading.Lock()
+    httpd.slow_delay = 0.5
+    httpd.active = httpd.peak = 0
+    httpd.version = 1
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    httpd.base_url = f"http://127.0.0.1:{httpd.server_address[1]}"
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+def make_client(base_url, **kwargs):
+    policy = RetryPolicy(max_retries=kwargs.pop("max_retries", 3), backoff_base=0.01, jitter=False)
+    return AsyncAPIClient(base_url, retry_policy=policy, **kwargs)
+
+def test_success_returns_json(server):
+    async def run():
+        async with make_client(server.base_url) as client:
+            return await client.send_request("posts/1")
+    assert asyncio.run(run()) == {"path": "/posts/1"}
+
+def test_client_error_is_not_retried(server):
+    async def run():
+        async with make_client(server.base_url) as client:
+            with pytest.raises(APIClientError):
+                await client.send_request("status/404")
+            return client.get_breaker(f"127.0.0.1:{server.server_address[1]}")
+    breaker = asyncio.run(run())
+    assert server.hits["/status/404"] == 1
+    assert breaker.state == CircuitBreaker.CLOSED
+
+def test_server_error_is_retried_and_opens_breaker(server):
+    async def run():
+        async with make_client(server.base_url, failure_threshold=3) as client:
+            with pytest.raises(APIClientError):
+                await client.send_request("status/503")
+            with pytest.raises(CircuitOpenError):
+                await client.send_request("posts/1")
+    asyncio.run(run())
+    assert server.hits["/status/503"] == 3
+    assert "/posts/1" not in server.hits
+
+def test_cancelled_trial_releases_half_open_breaker(server):
+    async def run():
+        async with make_client(server.base_url, max_retries=1, failure_threshold=1,
+                               recovery_timeout=0.05) as client:
+            with pytest.raises(APIClientError):
+                await client.send_request("status/503")
+            breaker = client.get_breaker(f"127.0.0.1:{server.server_address[1]}")
+            assert breaker.state == CircuitBreaker.OPEN
+            await asyncio.sleep(0.1)
+
+            trial = asyncio.ensure_future(client.send_request("slow"))
+            await asyncio.sleep(0.1)
+            assert breaker.trial_in_flight
+            trial.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await trial
+            assert not breaker.trial_in_flight
+
+            # The next request becomes the trial and closes the circuit again
+            assert await client.send_request("posts/2") == {"path": "/posts/2"}
+            assert breaker.state == CircuitBreaker.CLOSED
+    asyncio.run(run())
+
+def test_stream_yields_every_endpoint(server):
+    async def run():
+        async with make_client(server.base_url, concurrency=4) as client:
+            return [pair async for pair in client.stream(f"posts/{i}" for i in range(20))]
+    results = asyncio.run(run())
+    assert sorted(endpoint for endpoint, _ in results) == sorted(f"posts/{i}" for i in range(20))
+    assert all(data == {"path": f"/{endpoint}"} for endpoint, data in results)
+
+def make_sync_client(base_url, **kwargs):
+    policy = RetryPolicy(max_retries=kwargs.pop("max_retries", 3), backoff_base=0.01, jitter=False)
+    return APIClient(base_url, retry_policy=policy, **kwargs)
+
+def test_sync_client_reuses_one_pooled_connection(server):
+    with make_sync_client(server.base_url) as client:
+        for i in range(5):
+            assert client.send_request(f"posts/{i}") == {"path": f"/posts/{i}"}
+        stats = client.get_stats()
+    assert stats["requests"] == 5
+    assert stats["connections_opened"] == 1
+    assert stats["connections_reused"] == 4
+
+def test_get_many_runs_concurrently_in_order_capped_at_pool_size(server):
+    server.slow_delay = 0.2
+    with make_sync_client(server.base_url, pool_size=4) as client:
+        start = time.monotonic()
+        results = client.get_many([f"slow?{i}" for i in range(8)] + ["status/404"], concurrency=16)
+        elapsed = time.monotonic() - start
+        stats = client.get_stats()
+    assert results == [{"path": f"/slow?{i}"} for i in range(8)] + [None]  # Failures come back as None
+    assert server.peak == 4  # concurrency is capped at the connection pool size
+    assert elapsed < 8 * 0.2 / 2
+    assert stats["connections_opened"] == 4
+
+class Headers:
+    def __init__(self, **headers):
+        self.headers = {name.replace("_", "-"): value for name, value in headers.items()}
+
+def test_retry_policy_backs_off_exponentially_up_to_the_cap():
+    policy = RetryPolicy(backoff_base=0.5, backoff_max=3.0, jitter=False)
+    assert [policy.compute_delay(attempt) for attempt in range(1, 6)] == [0.5, 1.0, 2.0, 3.0, 3.0]
+    jittered = RetryPolicy(backoff_base=0.5, backoff_max=3.0)
+    delays = [jittered.compute_delay(3) for _ in range(200)]
+    assert all(0 <= delay <= 2.0 for delay in delays)
+    assert len(set(delays)) > 100  # Full jitter spreads retries out
+    assert policy.is_retryable_status(503) and not policy.is_retryable_status(404)
+
+def test_retry_policy_honours_retry_after():
+    policy = RetryPolicy(backoff_base=0.5, backoff_max=30.0, jitter=False)
+    assert policy.compute_delay(1, Headers(Retry_After="7")) == 7.0
+    assert policy.compute_delay(1, Headers(Retry_After="120")) == 30.0  # Capped at backoff_max
+    assert 8 <= policy.compute_delay(1, Headers(Retry_After=formatdate(time.time() + 10, usegmt=True))) <= 10
+    assert policy.compute_delay(1, Headers(Retry_After=formatdate(time.time() - 60, usegmt=True))) == 0.0
+    assert policy.compute_delay(2, Headers(Retry_After="soon")) == 1.0  # Unparseable: normal backoff
+    assert policy.compute_delay(2, None) == 1.0
+    ignoring = RetryPolicy(backoff_base=0.5, jitter=False, respect_retry_after=False)
+    assert ignoring.compute_delay(1, Headers(Retry_After="7")) == 0.5
+
+def test_sync_client_waits_for_retry_after(server):
+    with make_sync_client(server.base_url, max_retries=2) as client:
+        start = time.monotonic()
+        with pytest.raises(APIClientError):
+            client.send_request("status/503?retry-after=0.3")
+        elapsed = time.monotonic() - start
+    assert server.hits["/status/503?retry-after=0.3"] == 2
+    assert elapsed >= 0.3
+
+def test_retry_budget_is_per_host_and_refills():
+    budget = RetryBudget(capacity=2, refill_rate=20)
+    assert budget.try_acquire("a") and budget.try_acquire("a")
+    assert not budget.try_acquire("a")
+    assert budget.try_acquire("b")
+    time.sleep(0.1)  # Two tokens' worth of refill
+    assert budget.try_acquire("a")
+
+def test_exhausted_retry_budget_stops_retrying(server):
+    budget = RetryBudget(capacity=1, refill_rate=0)
+    with make_sync_client(server.base_url, max_retries=5, retry_budget=budget, failure_threshold=100) as client:
+        with pytest.raises(APIClientError):
+            client.send_request("status/503")
+        with pytest.raises(APIClientError):
+            client.send_request("status/500")
+    assert server.hits["/status/503"] == 2  # One retry, then the budget ran out
+    assert server.hits["/status/500"] == 1
+
+def test_circuit_breaker_opens_half_opens_and_closes():
+    breaker = CircuitBreaker(failure_threshold=2, recovery_timeout=0.05)
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED and breaker.allow_request()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN and not breaker.allow_request()
+    time.sleep(0.06)
+    assert breaker.allow_request()  # The single half-open trial
+    assert breaker.state == CircuitBreaker.HALF_OPEN and not breaker.allow_request()
+    breaker.record_failure()  # A failed trial reopens at once
+    assert breaker.state == CircuitBreaker.OPEN and not breaker.allow_request()
+    time.sleep(0.06)
+    assert breaker.allow_request()
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED and breaker.failures == 0
+    assert breaker.allow_request() and breaker.allow_request()
+
+def test_sync_client_circuit_cycle(server):
+    with make_sync_client(server.base_url, max_retries=2, failure_threshold=2, recovery_timeout=0.1) as client:
+        with pytest.raises(APIClientError):
+            client.send_request("status/503")
+        with pytest.raises(CircuitOpenError):
+            client.send_request("posts/1")
+        assert "/posts/1" not in server.hits
+        time.sleep(0.15)
+        assert client.send_request("posts/1") == {"path": "/posts/1"}
+        assert client.get_breaker(f"127.0.0.1:{server.server_address[1]}").state == CircuitBreaker.CLOSED
+
+def test_cache_serves_fresh_entries_and_revalidates_stale_ones(server):
+    cache = ResponseCache(ttl=0.2)
+    with make_sync_client(server.base_url, cache=cache) as client:
+        assert client.send_request("versioned") == {"version": 1}
+        assert client.send_request("versioned") == {"version": 1}
+        assert server.hits["/versioned"] == 1
+        time.sleep(0.25)
+        assert client.send_request("versioned") == {"version": 1}  # 304: the stale entry is reused
+        assert server.hits["/versioned"] == 2
+        assert client.send_request("versioned") == {"version": 1}  # ...and fresh again
+        assert server.hits["/versioned"] == 2
+        server.version = 2
+        time.sleep(0.25)
+        assert client.send_request("versioned") == {"version": 2}
+        stats = client.get_stats()["cache"]
+    assert server.hits["/versioned"] == 3
+    assert stats["misses"] == 1 and stats["hits"] == 2 and stats["stale"] == 2 and stats["not_modified"] == 1
+
+def test_cache_coalesces_concurrent_misses(server):
+    server.slow_delay = 0.2
+    cache = ResponseCache()
+    with make_sync_client(server.base_url, cache=cache) as client:
+        with ThreadPoolExecutor(max_workers=5) as executor:
+            results = list(executor.map(lambda _: client.send_request("slow"), range(5)))
+    assert results == [{"path": "/slow"}] * 5
+    assert server.hits["/slow"] == 1
+    assert cache.get_stats()["coalesced"] == 4
+
+def test_cache_coalesced_requests_share_the_failure(server):
+    cache = ResponseCache()
+    with make_sync_client(server.base_url, cache=cache, max_retries=1) as client:
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            futures = [executor.submit(client.send_request, "status/404") for _ in range(3)]
+            for future in futures:
+                with pytest.raises(APIClientError):
+                    future.result()
+        assert client.inflight == {}
+    assert cache.get_stats()["entries"] == 0
+
+def test_cache_evicts_least_recently_used_and_persists_to_disk(tmp_path):
+    cache = ResponseCache(max_bytes=100, disk_dir=str(tmp_path))
+    cache.set("a", {"n": 1}, 40)
+    cache.set("b", {"n": 2}, 40)
+    cache.get("a")
+    cache.set("c", {"n": 3}, 40)  # Over the cap: "b" is the least recently used
+    assert list(cache.entries) == ["a", "c"]
+    assert cache.get_stats()["evictions"] == 1 and cache.current_bytes == 80
+    reloaded = ResponseCache(max_bytes=100, disk_dir=str(tmp_path))
+    entry = reloaded.get("b")
+    assert entry.data == {"n": 2} and entry.is_fresh()
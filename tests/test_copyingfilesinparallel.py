@@ -0,0 +1,334 @@
+import os
+import json
+import errno
+import logging
+import threading
+
+import pytest
+
+import benchmarkfilecopier
+import copyingfilesinparallel
+from copyingfilesinparallel import FileCopier, FileCopyError, SyncManifest
+
+def make_source(directory, count=10):
+    directory.mkdir()
+    for i in range(count):
+        (directory / f"file{i}.txt").write_text(f"contents {i}")
+
+def test_hook_error_fails_only_that_file(tmp_path):
+    source, destination = tmp_path / "src", tmp_path / "dst"
+    make_source(source)
+    destination.mkdir()
+
+    def on_file_copied(file_path, size, seconds):
+        if file_path.name == "file3.txt":
+            raise RuntimeError("hook failed")
+
+    copier = FileCopier(source, destination, max_threads=2, batch_size=64, on_file_copied=on_file_copied)
+    report = copier.copy_stream(copier.walk_source_files())
+    assert not report.succeeded
+    assert [path for path, _ in report.failures] == [str(source / "file3.txt")]
+    assert report.files_copied == 9
+    assert sorted(path.name for path in destination.iterdir()) == sorted(f"file{i}.txt" for i in range(10))
+
+def test_sync_digest_error_fails_only_that_file(tmp_path, monkeypatch):
+    source, destination = tmp_path / "src", tmp_path / "dst"
+    make_source(source)
+    destination.mkdir()
+    file_digest = copyingfilesinparallel.file_digest
+
+    def flaky_digest(file_path):
+        if file_path.name == "file5.txt":
+            raise OSError("read error")
+        return file_digest(file_path)
+    monkeypatch.setattr(copyingfilesinparallel, "file_digest", flaky_digest)
+
+    report = FileCopier(source, destination).sync(use_hash=True)
+    assert [path for path, _ in report.failures] == [str(source / "file5.txt")]
+    assert report.files_copied == 9
+
+    # The failed file was not recorded in the manifest, so the next sync copies it again
+    monkeypatch.setattr(copyingfilesinparallel, "file_digest", file_digest)
+    report = FileCopier(source, destination).sync(use_hash=True)
+    assert report.succeeded and report.files_copied == 1
+
+def test_plan_work_gives_medium_files_their_own_item(tmp_path):
+    source, destination = tmp_path / "src", tmp_path / "dst"
+    source.mkdir()
+    destination.mkdir()
+    sizes = {"a": 10, "b": 10, "medium1": 200, "c": 10, "medium2": 300, "d": 10, "e": 10}
+    for name, size in sizes.items():
+        (source / name).write_bytes(b"x" * size)
+    copier = FileCopier(source, destination, batch_size=3, small_file_threshold=100,
+                        large_file_threshold=1000)
+    entries = [(source / name, (source / name).stat()) for name in sizes]
+    items = [[path.name for path in args[0]] for func, args in copier.plan_work(entries)]
+    assert items == [["medium1"], ["a", "b", "c"], ["medium2"], ["d", "e"]]
+
+def make_mixed_source(directory):
+    """Small, medium and chunked files whose bytes differ at every offset."""
+    directory.mkdir()
+    sizes = {"empty": 0, "tiny": 7, "small": 900, "medium": 5000, "large": 40000, "odd_large": 40001}
+    for name, size in sizes.items():
+        (directory / name).write_bytes(os.urandom(size))
+    return sizes
+
+@pytest.mark.parametrize("strategy", FileCopier.COPY_STRATEGIES)
+def test_every_copy_strategy_copies_exact_bytes(tmp_path, strategy):
+    source, destination = tmp_path / "src", tmp_path / "dst"
+    sizes = make_mixed_source(source)
+    (source / "large").chmod(0o640)
+    copier = FileCopier(source, destination, max_threads=3, batch_size=2, small_file_threshold=1000,
+                        large_file_threshold=20000, chunk_size=6000, buffer_size=1000, copy_strategy=strategy)
+    copier.validate_directories()
+    report = copier.copy_stream(copier.walk_source_files())
+    assert report.succeeded
+    assert report.files_copied == len(sizes) and report.bytes_copied == sum(sizes.values())
+    for name in sizes:
+        assert (destination / name).read_bytes() == (source / name).read_bytes()
+    assert (destination / "large").stat().st_mode & 0o777 == 0o640
+
+def test_unknown_copy_strategy_is_rejected(tmp_path):
+    with pytest.raises(FileCopyError):
+        FileCopier(tmp_path, tmp_path / "dst", copy_strategy="mmap")
+
+def unsupported(*args):
+    raise OSError(errno.EXDEV, "Invalid cross-device link")
+
+def test_fast_paths_fall_back_when_unsupported(tmp_path, monkeypatch):
+    source, destination = tmp_path / "src", tmp_path / "dst"
+    sizes = make_mixed_source(source)
+    calls = []
+    sendfile = os.sendfile
+
+    def counting_sendfile(*args):
+        calls.append("sendfile")
+        return sendfile(*args)
+    monkeypatch.setattr(os, "copy_file_range", unsupported, raising=False)
+    monkeypatch.setattr(os, "sendfile", counting_sendfile)
+    copier = FileCopier(source, destination, large_file_threshold=20000, chunk_size=6000)
+    copier.validate_directories()
+    assert copier.copy_stream(copier.walk_source_files()).succeeded
+    assert calls  # copy_file_range refused, so sendfile did the work
+
+    monkeypatch.setattr(os, "sendfile", unsupported)
+    destination2 = tmp_path / "dst2"
+    copier = FileCopier(source, destination2, large_file_threshold=20000, chunk_size=6000)
+    copier.validate_directories()
+    assert copier.copy_stream(copier.walk_source_files()).succeeded  # Buffered pread/pwrite
+    for name in sizes:
+        assert (destination2 / name).read_bytes() == (source / name).read_bytes()
+
+def test_fast_path_io_errors_are_reported_not_masked(tmp_path, monkeypatch):
+    source, destination = tmp_path / "src", tmp_path / "dst"
+    make_source(source, count=3)
+
+    def failing(*args):
+        raise OSError(errno.EIO, "Input/output error")
+    monkeypatch.setattr(os, "copy_file_range", failing, raising=False)
+    copier = FileCopier(source, destination, copy_strategy="copy_file_range")
+    copier.validate_directories()
+    report = copier.copy_stream(copier.walk_source_files())
+    assert report.files_copied == 0 and len(report.failures) == 3
+    assert all("Input/output error" in error for _, error in report.failures)
+
+def read_manifest(destination):
+    with open(destination / FileCopier.MANIFEST_NAME) as f:
+        return [json.loads(line) for line in f]
+
+def test_sync_copies_only_new_or_changed_files(tmp_path):
+    source, destination = tmp_path / "src", tmp_path / "dst"
+    make_source(source, count=4)
+    (source / "nested" / "deeper").mkdir(parents=True)
+    (source / "nested" / "deeper" / "leaf.txt").write_text("leaf")
+    report = FileCopier(source, destination).sync()
+    assert report.succeeded and report.files_copied == 5
+    assert (destination / "nested" / "deeper" / "leaf.txt").read_text() == "leaf"
+
+    assert FileCopier(source, destination).sync().files_copied == 0
+    (source / "file1.txt").write_text("changed and longer")
+    report = FileCopier(source, destination).sync()
+    assert report.files_copied == 1
+    assert (destination / "file1.txt").read_text() == "changed and longer"
+
+    (destination / "file2.txt").unlink()  # A destination file that went missing is copied again
+    assert FileCopier(source, destination).sync().files_copied == 1
+    assert len(read_manifest(destination)) == 5  # Compacted to one line per file
+
+def test_sync_with_hash_skips_touched_but_identical_files(tmp_path):
+    source, destination = tmp_path / "src", tmp_path / "dst"
+    make_source(source, count=3)
+    FileCopier(source, destination).sync(use_hash=True)
+    stat = (source / "file0.txt").stat()
+    os.utime(source / "file0.txt", ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert FileCopier(source, destination).sync(use_hash=True).files_copied == 0
+    entry = {record["path"]: record for record in read_manifest(destination)}["file0.txt"]
+    assert entry["mtime_ns"] == stat.st_mtime_ns + 10**9  # The new mtime is recorded
+
+    (source / "file0.txt").write_text("contents X")  # Same size, different bytes
+    assert FileCopier(source, destination).sync(use_hash=True).files_copied == 1
+    assert FileCopier(source, destination).sync().files_copied == 0
+    os.utime(source / "file1.txt", ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert FileCopier(source, destination).sync().files_copied == 1  # Without hashing a touch means a copy
+
+def test_sync_deletes_orphans_and_emptied_directories(tmp_path):
+    source, destination = tmp_path / "src", tmp_path / "dst"
+    make_source(source, count=3)
+    (source / "old").mkdir()
+    (source / "old" / "gone.txt").write_text("bye")
+    FileCopier(source, destination).sync()
+    (source / "old" / "gone.txt").unlink()
+    (source / "old").rmdir()
+    (source / "file2.txt").unlink()
+
+    FileCopier(source, destination).sync()  # Without delete_orphans nothing is removed
+    assert (destination / "old" / "gone.txt").exists()
+    FileCopier(source, destination).sync(delete_orphans=True)
+    assert sorted(path.name for path in destination.iterdir()) == \
+        sorted(["file0.txt", "file1.txt", FileCopier.MANIFEST_NAME])
+    assert sorted(record["path"] for record in read_manifest(destination)) == ["file0.txt", "file1.txt"]
+
+def test_manifest_journal_replays_and_skips_a_torn_line(tmp_path):
+    path = tmp_path / "manifest.jsonl"
+    manifest = SyncManifest(path)
+    manifest.open()
+    manifest.record("a", 1, 10, "h1")
+    manifest.record("b", 2, 20)
+    manifest.record("a", 3, 30, "h3")
+    manifest.remove("b")
+    manifest.remove("never-recorded")
+    manifest.close()
+    with open(path, 'a') as f:
+        f.write('{"path": "c", "size"')  # Interrupted mid-write
+    assert len(path.read_text().splitlines()) == 5
+
+    reloaded = SyncManifest(path)
+    reloaded.load()
+    assert reloaded.entries == {"a": {"size": 3, "mtime_ns": 30, "hash": "h3"}}
+    reloaded.compact()
+    assert path.read_text().splitlines() == ['{"path": "a", "size": 3, "mtime_ns": 30, "hash": "h3"}']
+
+def test_interrupted_sync_resumes_from_the_journal(tmp_path):
+    source, destination = tmp_path / "src", tmp_path / "dst"
+    make_source(source, count=6)
+    FileCopier(source, destination).sync()
+    # Rewind to a run that stopped after four copies, mid-way through journalling the fifth
+    manifest_path = destination / FileCopier.MANIFEST_NAME
+    lines = manifest_path.read_text().splitlines()
+    for record in map(json.loads, lines[4:]):
+        (destination / record["path"]).unlink()
+    manifest_path.write_text("\n".join(lines[:4]) + "\n" + lines[4][:20])
+
+    copied = []
+    copier = FileCopier(source, destination, on_file_copied=lambda path, size, seconds: copied.append(path.name))
+    report = copier.sync()
+    assert report.files_copied == 2
+    assert sorted(copied) == sorted(json.loads(line)["path"] for line in lines[4:])
+    assert len(read_manifest(destination)) == 6
+
+def test_copy_stream_starts_copying_before_the_scan_ends(tmp_path):
+    source, destination = tmp_path / "src", tmp_path / "dst"
+    make_source(source, count=3)
+    destination.mkdir()
+    first_copied = threading.Event()
+    copier = FileCopier(source, destination, batch_size=1,
+                        on_file_copied=lambda path, size, seconds: first_copied.set())
+    seen_before_scan_ended = []
+
+    def entries():
+        walked = sorted(copier.walk_source_files())
+        yield walked[0]
+        seen_before_scan_ended.append(first_copied.wait(5))
+        yield from walked[1:]
+    report = copier.copy_stream(entries())
+    assert seen_before_scan_ended == [True]
+    assert report.files_copied == 3
+
+def test_copy_stream_queue_bounds_how_far_the_scan_runs_ahead(tmp_path):
+    source, destination = tmp_path / "src", tmp_path / "dst"
+    make_source(source, count=50)
+    destination.mkdir()
+    gate = threading.Event()
+    copier = FileCopier(source, destination, max_threads=1, batch_size=1,
+                        on_file_copied=lambda path, size, seconds: gate.wait(5))
+    scanned = []
+    ahead = []
+
+    def entries():
+        for item in copier.walk_source_files():
+            scanned.append(item)
+            yield item
+
+    def release():
+        threading.Event().wait(0.3)
+        ahead.append(len(scanned))
+        gate.set()
+    releaser = threading.Thread(target=release)
+    releaser.start()
+    report = copier.copy_stream(entries(), queue_size=2)
+    releaser.join()
+    # One item in the worker, two queued and one waiting in put()
+    assert ahead == [4]
+    assert report.files_copied == 50
+
+def test_copy_stream_records_a_failed_scan_and_keeps_what_it_found(tmp_path):
+    source, destination = tmp_path / "src", tmp_path / "dst"
+    make_source(source, count=3)
+    destination.mkdir()
+    copier = FileCopier(source, destination)
+
+    def entries():
+        yield from copier.walk_source_files()
+        raise OSError("device went away")
+    report = copier.copy_stream(entries())
+    assert report.files_copied == 3
+    assert report.failures == [(str(source), "device went away")]
+
+def test_run_streams_a_tree_and_reports_progress(tmp_path):
+    source, destination = tmp_path / "src", tmp_path / "dst"
+    make_source(source, count=5)
+    (source / "sub").mkdir()
+    (source / "sub" / "inner.txt").write_text("inner")
+    copier = FileCopier(source, destination, max_threads=2, batch_size=2)
+    assert copier.run().files_copied == 5  # Not recursive by default
+    assert not (destination / "sub").exists()
+    report = copier.run(recursive=True)
+    assert report.files_copied == 6 and (destination / "sub" / "inner.txt").read_text() == "inner"
+    snapshot = copier.progress.snapshot()
+    assert snapshot["files_found"] == snapshot["files_done"] == 6
+    assert snapshot["bytes_done"] == report.bytes_copied
+    assert snapshot["scan_complete"] and snapshot["eta"] == 0
+    assert str(copier.progress).startswith("6/6 files")
+
+def test_on_file_copied_reports_every_file_once_with_its_latency(tmp_path):
+    source, destination = tmp_path / "src", tmp_path / "dst"
+    sizes = make_mixed_source(source)
+    calls = {}
+    lock = threading.Lock()
+
+    def on_file_copied(file_path, size, seconds):
+        with lock:
+            calls.setdefault(file_path.name, []).append((size, seconds))
+    copier = FileCopier(source, destination, max_threads=3, small_file_threshold=1000,
+                        large_file_threshold=20000, chunk_size=6000, on_file_copied=on_file_copied)
+    copier.validate_directories()
+    copier.copy_stream(copier.walk_source_files())
+    assert {name: [size for size, _ in sizes_seen] for name, sizes_seen in calls.items()} == \
+        {name: [size] for name, size in sizes.items()}  # Chunked files are reported once, when complete
+    assert all(seconds >= 0 for reports in calls.values() for _, seconds in reports)
+
+def test_benchmark_run_once_measures_a_generated_tree(tmp_path):
+    spec = [("", 10, 1024), ("a/b", 4, 3 * benchmarkfilecopier.MB // 2)]
+    total = benchmarkfilecopier.generate_tree(str(tmp_path / "src"), spec, scale=0.5)
+    assert total == 5 * 1024 + 2 * 3 * benchmarkfilecopier.MB // 2
+    level = logging.getLogger().level
+    try:
+        result = benchmarkfilecopier.run_once(str(tmp_path / "src"), str(tmp_path / "dst"), 2, "auto")
+    finally:
+        logging.getLogger().setLevel(level)
+    assert result["files"] == 7 and result["bytes"] == total and result["failures"] == 0
+    assert 0 <= result["latency_p50"] <= result["latency_p99"]
+    assert result["mb_per_second"] > 0 and result["peak_rss_mb"] > 0
+    assert (tmp_path / "dst" / "a" / "b" / "file1.bin").stat().st_size == 3 * benchmarkfilecopier.MB // 2
+    assert benchmarkfilecopier.percentile([1, 2, 3, 4], 50) == 3
+    assert benchmarkfilecopier.percentile([], 99) == 0.0
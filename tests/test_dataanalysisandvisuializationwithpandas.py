@@ -0,0 +1,263 @@
+import os
+
+import numpy as np
+import pandas as pd
+import matplotlib.pyplot as plt
+
+import dataanalysisandvisuializationwithpandas
+from dataanalysisandvisuializationwithpandas import ColumnarCache, DataAnalyzer, QuantileSketch, StreamingStats
+
+def write_csv(path):
+    pd.DataFrame({'X': range(10), 'Y': [i * 0.5 for i in range(10)], 'Z': ['a', 'b'] * 5}).to_csv(path, index=False)
+
+def test_cache_keeps_every_column_for_later_projections(tmp_path):
+    data_file = tmp_path / "data.csv"
+    write_csv(data_file)
+    cache_dir = str(tmp_path / "cache")
+
+    for optimize_dtypes in (False, True):
+        first = DataAnalyzer(str(data_file), usecols=['X'], optimize_dtypes=optimize_dtypes, cache_dir=cache_dir)
+        first.load_data()
+        assert list(first.data.columns) == ['X']
+
+        # Served from the entry the first run stored
+        second = DataAnalyzer(str(data_file), usecols=['Y'], optimize_dtypes=optimize_dtypes, cache_dir=cache_dir)
+        second.load_data()
+        assert list(second.data.columns) == ['Y']
+        assert second.data['Y'].tolist() == [i * 0.5 for i in range(10)]
+
+        whole = DataAnalyzer(str(data_file), optimize_dtypes=optimize_dtypes, cache_dir=cache_dir)
+        whole.load_data()
+        assert list(whole.data.columns) == ['X', 'Y', 'Z']
+
+def write_large_csv(path, rows=2500):
+    pd.DataFrame({
+        'X': [i % 97 for i in range(rows)],
+        'Y': [i * 0.25 for i in range(rows)],
+        # Later chunks bring new categories and values wider than the first chunk's dtypes
+        'Z': [f"k{i // 500}" for i in range(rows)],
+        'W': [i if i < 1000 else i * 1000 for i in range(rows)],
+    }).to_csv(path, index=False)
+
+def test_chunked_miss_fills_cache_for_the_next_run(tmp_path, monkeypatch):
+    data_file = tmp_path / "data.csv"
+    write_large_csv(data_file)
+    cache_dir = tmp_path / "cache"
+    first = DataAnalyzer(str(data_file), chunksize=1000, cache_dir=str(cache_dir))
+    summary, missing = first.analyze_data()
+    assert len(list(cache_dir.iterdir())) == 1
+
+    def no_csv(*args, **kwargs):
+        raise AssertionError("the CSV should not be read on a cache hit")
+    monkeypatch.setattr(dataanalysisandvisuializationwithpandas.pd, 'read_csv', no_csv)
+    second = DataAnalyzer(str(data_file), chunksize=1000, cache_dir=str(cache_dir))
+    cached_summary, cached_missing = second.analyze_data()
+    pd.testing.assert_frame_equal(cached_summary, summary)
+    pd.testing.assert_series_equal(cached_missing, missing)
+
+    whole = DataAnalyzer(str(data_file), optimize_dtypes=True, cache_dir=str(cache_dir))
+    whole.load_data()
+    assert len(whole.data) == 2500
+    assert sorted(whole.data['Z'].cat.categories) == [f"k{i}" for i in range(5)]
+    assert whole.data['W'].iloc[-1] == 2499 * 1000
+
+def test_abandoned_stream_leaves_no_entry(tmp_path):
+    data_file = tmp_path / "data.csv"
+    write_large_csv(data_file)
+    cache_dir = tmp_path / "cache"
+    analyzer = DataAnalyzer(str(data_file), chunksize=1000, cache_dir=str(cache_dir))
+    chunks = analyzer.iter_chunks()
+    next(chunks)
+    chunks.close()
+    assert list(cache_dir.iterdir()) == []
+
+def test_store_keeps_entries_for_other_options(tmp_path):
+    data_file = tmp_path / "data.csv"
+    write_csv(data_file)
+    cache_dir = tmp_path / "cache"
+    DataAnalyzer(str(data_file), cache_dir=str(cache_dir)).load_data()
+    DataAnalyzer(str(data_file), optimize_dtypes=True, cache_dir=str(cache_dir)).load_data()
+    assert len(list(cache_dir.iterdir())) == 2
+
+    # A new version of the source replaces only the entry for the same options
+    write_large_csv(data_file)
+    DataAnalyzer(str(data_file), cache_dir=str(cache_dir)).load_data()
+    assert len(list(cache_dir.iterdir())) == 2
+
+def test_optimized_load_matches_plain_read_with_compact_dtypes(tmp_path):
+    data_file = tmp_path / "data.csv"
+    write_large_csv(data_file)
+    pd.read_csv(data_file).assign(ID=[f"id{i}" for i in range(2500)]).to_csv(data_file, index=False)
+    plain = pd.read_csv(data_file)
+    analyzer = DataAnalyzer(str(data_file), optimize_dtypes=True, sample_rows=600)
+    analyzer.load_data()
+    data = analyzer.data
+    assert analyzer.category_columns == ['Z'] and analyzer.numeric_columns == ['X', 'Y', 'W']
+    assert data['X'].dtype == np.int8
+    assert data['Y'].dtype == np.float64  # Floats are only downcast on request
+    assert data['ID'].dtype == plain['ID'].dtype  # Unique per row, so not worth a category
+    # Z's later categories and W's later, wider values come from chunks the sample never saw
+    assert isinstance(data['Z'].dtype, pd.CategoricalDtype)
+    assert sorted(data['Z'].cat.categories) == [f"k{i}" for i in range(5)]
+    assert data['W'].dtype == np.int32
+    pd.testing.assert_frame_equal(data.astype({'X': 'int64', 'W': 'int64', 'Z': plain['Z'].dtype}), plain)
+    assert data.drop(columns='ID').memory_usage(deep=True).sum() < \
+        plain.drop(columns='ID').memory_usage(deep=True).sum() / 2
+
+def test_iter_chunks_streams_projected_compact_chunks(tmp_path):
+    data_file = tmp_path / "data.csv"
+    write_large_csv(data_file)
+    analyzer = DataAnalyzer(str(data_file), usecols=['X', 'Z'], chunksize=1000, downcast_floats=True)
+    chunks = list(analyzer.iter_chunks())
+    assert [len(chunk) for chunk in chunks] == [1000, 1000, 500]
+    assert all(list(chunk.columns) == ['X', 'Z'] for chunk in chunks)
+    assert all(chunk['X'].dtype == np.int8 for chunk in chunks)
+    assert isinstance(chunks[-1]['Z'].dtype, pd.CategoricalDtype)
+    assert DataAnalyzer(str(data_file), downcast_floats=True, optimize_dtypes=True) \
+        .compact_chunk(pd.DataFrame({'Y': [0.5, 1.5]}))['Y'].dtype == np.float32
+
+def frame_with_gaps(rows, seed):
+    rng = np.random.default_rng(seed)
+    frame = pd.DataFrame({'A': rng.normal(10, 3, rows), 'B': rng.integers(0, 1000, rows).astype(float),
+                          'S': rng.choice(['u', 'v'], rows)})
+    frame.loc[rng.random(rows) < 0.1, 'A'] = np.nan
+    frame.loc[rng.random(rows) < 0.05, 'S'] = None
+    return frame
+
+def test_streaming_stats_match_describe_across_chunks():
+    frame = frame_with_gaps(3000, seed=1)
+    stats = StreamingStats()
+    for start in range(0, len(frame), 700):
+        stats.update(frame.iloc[start:start + 700])
+    # Below 10 * compression centroids nothing is merged, so even the quartiles are exact
+    pd.testing.assert_frame_equal(stats.summary(), frame.describe(), rtol=1e-9)
+    pd.testing.assert_series_equal(stats.missing(), frame.isnull().sum())
+
+def test_merged_partials_equal_a_single_pass():
+    frames = [frame_with_gaps(1500, seed) for seed in range(3)]
+    partials = []
+    for frame in frames:
+        partial = StreamingStats()
+        partial.update(frame)
+        partials.append(partial)
+    merged = partials[0].merge(partials[1]).merge(partials[2])
+    whole = pd.concat(frames, ignore_index=True)
+    pd.testing.assert_frame_equal(merged.summary(), whole.describe(), rtol=1e-9)
+    pd.testing.assert_series_equal(merged.missing(), whole.isnull().sum())
+
+def test_quantile_sketch_stays_within_its_rank_error_after_merges():
+    rng = np.random.default_rng(7)
+    compression = 100
+    parts = [rng.lognormal(0, 1, 50000), rng.normal(-5, 1, 50000), rng.uniform(0, 50, 50000)]
+    sketches = []
+    for part in parts:
+        sketch = QuantileSketch(compression)
+        for start in range(0, len(part), 5000):
+            sketch.update(part[start:start + 5000])
+        sketches.append(sketch)
+    merged = sketches[0]
+    merged.merge(sketches[1])
+    merged.merge(sketches[2])
+    merged.merge(QuantileSketch(compression))  # Merging an empty sketch is a no-op
+    values = np.sort(np.concatenate(parts))
+    assert len(merged.means) <= 10 * compression
+    assert merged.weights.sum() == len(values)
+    for q in (0.001, 0.01, 0.25, 0.5, 0.75, 0.99, 0.999):
+        rank = np.searchsorted(values, merged.quantile(q)) / len(values)
+        assert abs(rank - q) < np.pi / compression
+    assert np.isnan(QuantileSketch().quantile(0.5))
+
+def test_analyze_files_merges_per_file_statistics(tmp_path):
+    frames = [frame_with_gaps(1500, seed) for seed in (3, 4)]
+    paths = []
+    for i, frame in enumerate(frames):
+        paths.append(str(tmp_path / f"part{i}.csv"))
+        frame.to_csv(paths[-1], index=False)
+    summary, missing = DataAnalyzer.analyze_files(paths, max_workers=2, chunksize=400)
+    whole = pd.concat([pd.read_csv(path) for path in paths], ignore_index=True)
+    pd.testing.assert_frame_equal(summary, whole.describe(), rtol=1e-9)
+    pd.testing.assert_series_equal(missing, whole.isnull().sum())
+
+def test_cache_misses_when_the_source_changes_even_with_the_same_size_and_mtime(tmp_path):
+    data_file = tmp_path / "data.csv"
+    data_file.write_text("X,Y\n1,2\n3,4\n")
+    cache = ColumnarCache(str(tmp_path / "cache"))
+    frame = pd.read_csv(data_file)
+    cache.store(str(data_file), {}, frame)
+    assert cache.lookup(str(data_file), {}) is not None
+    assert cache.lookup(str(data_file), {'optimize_dtypes': True}) is None
+
+    stat = data_file.stat()
+    data_file.write_text("X,Y\n1,2\n3,5\n")
+    os.utime(data_file, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    assert cache.lookup(str(data_file), {}) is None  # Caught by the content hash
+    path = cache.store(str(data_file), {}, pd.read_csv(data_file))
+    assert os.listdir(cache.cache_dir) == [os.path.basename(path)]  # The stale entry was replaced
+    assert cache.load(path, ['Y'])['Y'].tolist() == [2, 5]
+
+def test_cache_evicts_least_recently_used_entries(tmp_path):
+    cache = ColumnarCache(str(tmp_path / "cache"))
+    frame = pd.DataFrame({'X': np.arange(20000)})
+    paths = []
+    for i in range(3):
+        data_file = tmp_path / f"data{i}.csv"
+        data_file.write_text(f"X\n{i}\n")
+        paths.append(cache.store(str(data_file), {}, frame))
+        os.utime(paths[-1], (1000 + i, 1000 + i))
+    cache.lookup(str(tmp_path / "data0.csv"), {})  # Touch the oldest entry
+    cache.max_bytes = 2 * os.path.getsize(paths[0]) + 1
+    cache.evict()
+    assert sorted(os.listdir(cache.cache_dir)) == sorted(os.path.basename(path) for path in (paths[0], paths[2]))
+
+def write_xy_csv(path, rows=5000):
+    rng = np.random.default_rng(5)
+    pd.DataFrame({'X': rng.normal(0, 1, rows), 'Y': rng.normal(5, 2, rows),
+                  'Count Of Things': rng.integers(0, 10, rows)}).to_csv(path, index=False)
+
+def test_histogram_counts_match_numpy_when_streamed(tmp_path):
+    data_file = tmp_path / "data.csv"
+    write_xy_csv(data_file)
+    analyzer = DataAnalyzer(str(data_file), chunksize=700)
+    histograms = analyzer.histogram_counts(bins=15)
+    data = pd.read_csv(data_file)
+    assert set(histograms) == {'X', 'Y', 'Count Of Things'}
+    for column, (counts, edges) in histograms.items():
+        expected_counts, expected_edges = np.histogram(data[column], bins=15)
+        np.testing.assert_array_equal(counts, expected_counts)
+        np.testing.assert_allclose(edges, expected_edges)
+
+def test_scatter_payload_is_bounded_by_max_points(tmp_path):
+    data_file = tmp_path / "data.csv"
+    write_xy_csv(data_file)
+    data = pd.read_csv(data_file)
+    analyzer = DataAnalyzer(str(data_file), chunksize=700)
+    kind, xs, ys = analyzer.scatter_payload(max_points=5000)
+    assert kind == 'points' and sorted(xs) == sorted(data['X'])
+
+    kind, density, x_edges, y_edges = analyzer.scatter_payload(max_points=1000, grid=50)
+    assert kind == 'density' and density.shape == (50, 50) and density.sum() == 5000
+
+    kind, xs, ys = analyzer.scatter_payload(max_points=1000, mode='sample', seed=3)
+    assert kind == 'points' and len(xs) == len(ys) == 1000
+    rows = set(zip(data['X'], data['Y']))
+    assert all(pair in rows for pair in zip(xs, ys))
+    again = analyzer.scatter_payload(max_points=1000, mode='sample', seed=3)
+    np.testing.assert_array_equal(again[1], xs)  # Reproducible for a given seed
+
+def test_render_figures_writes_images_from_the_pool_without_pyplot(tmp_path):
+    data_file = tmp_path / "data.csv"
+    write_xy_csv(data_file)
+    output_dir = tmp_path / "figures"
+    analyzer = DataAnalyzer(str(data_file), chunksize=1000, output_dir=str(output_dir))
+    open_figures = plt.get_fignums()
+    paths, elapsed = analyzer.visualize_data(max_points=100, max_workers=2)
+    assert sorted(os.path.basename(path) for path in paths) == \
+        ['hist_Count_Of_Things.png', 'hist_X.png', 'hist_Y.png', 'scatter_X_Y.png']
+    for path in paths:
+        with open(path, 'rb') as f:
+            assert f.read(8) == b'\x89PNG\r\n\x1a\n'
+    assert elapsed > 0
+    assert plt.get_fignums() == open_figures  # Nothing was drawn through pyplot
+
+    paths, _ = analyzer.render_figures(str(tmp_path / "svg"), image_format='svg', max_workers=1)
+    assert all(path.endswith('.svg') and os.path.getsize(path) > 0 for path in paths)
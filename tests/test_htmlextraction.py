@@ -0,0 +1,58 @@
+import random
+
+import pytest
+
+from benchmarkhtmlextraction import generate_page
+from htmlextraction import (BACKENDS, FEED_SIZE, HEADING_TAGS, HTMLExtractor, etree, extract_full_soup,
+                            extract_headings, extract_title)
+
+def page_with_text_at(offset, text):
+    """A page whose heading text starts `offset` characters before a feed boundary."""
+    prefix = "<html><head><title>t</title></head><body><p>"
+    padding = FEED_SIZE - len(prefix) - len("</p><h1>") - offset
+    return f"{prefix}{'x' * padding}</p><h1>{text}</h1></body></html>"
+
+@pytest.mark.parametrize("offset", range(1, 12))
+def test_streaming_text_across_feed_boundary(offset):
+    html = page_with_text_at(offset, "Hello world <b>again</b> <!-- note --> and more")
+    assert extract_headings(html, ('h1',), backend="streaming") == extract_full_soup(html, ('h1',))
+    assert extract_headings(html, ('h1',), backend="streaming") == ["Hello worldagainand more"]
+
+def test_streaming_title_across_feed_boundary():
+    html = "<html><head><title>" + "word " * (FEED_SIZE // 5 + 10) + "</title></head></html>"
+    assert extract_title(html, backend="streaming") == extract_full_soup(html, ('title',))[0]
+
+PAGES = {
+    "nested": "<h1>a<h2>b</h2>c</h1><h3>d</h3>",
+    "doubly_nested": "<h2><h3>x</h3> y <h1>z</h1></h2>",
+    "code_and_comments": "<h1>x<!-- note --><script>var s = 1;</script><style>p {}</style>y</h1><h2>z</h2>",
+    "inline_markup": "<title> Page </title><h1>a <b>bold</b> &amp; <a href='/x'>link</a></h1>",
+    "misnested": "<h1>a<h2>b</h1>c",
+    "unclosed": "<title>T</title><h2>open heading",
+    "none": "<p>no headings here</p>",
+    "large": page_with_text_at(5, "<span>nested</span> text") + "<h2>after<h3>inner</h3></h2>",
+}
+
+@pytest.mark.parametrize("backend", [name for name in BACKENDS if name != "lxml" or etree is not None])
+@pytest.mark.parametrize("name", sorted(PAGES))
+def test_backends_agree(backend, name):
+    html = PAGES[name]
+    assert extract_headings(html, backend=backend) == extract_full_soup(html, HEADING_TAGS)
+    expected_title = extract_full_soup(html, ('title',), first_only=True)
+    assert extract_title(html, backend=backend) == (expected_title[0] if expected_title else None)
+
+@pytest.mark.parametrize("backend", [name for name in BACKENDS if name != "lxml" or etree is not None])
+def test_backends_agree_on_generated_page(backend):
+    html = generate_page(random.Random(3), 300)
+    assert extract_headings(html, backend=backend) == extract_full_soup(html, HEADING_TAGS)
+    assert extract_title(html, backend=backend) == extract_full_soup(html, ('title',), first_only=True)[0]
+
+def test_extractor_parses_single_pages_inline_and_batches_in_the_pool():
+    pages = [PAGES["nested"], PAGES["unclosed"]]
+    with HTMLExtractor("streaming", processes=2) as extractor:
+        extractor.executor.shutdown()  # Single-page calls must not need the pool
+        assert extractor.headings(pages[0]) == ["abc", "b", "d"]
+        assert extractor.title(pages[1]) == "T"
+    with HTMLExtractor("streaming", processes=2) as extractor:
+        assert extractor.map("headings", pages) == [["abc", "b", "d"], ["open heading"]]
+        assert extractor.submit("title", pages[1]).result() == "T"
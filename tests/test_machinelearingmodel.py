@@ -0,0 +1,230 @@
+import os
+import time
+import multiprocessing
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import machinelearingmodel
+from machinelearingmodel import (CSVDataset, Dataset, GeneratorDataset, MachineLearningError, MachineLearningModel,
+                                 ModelServer, ModelServerError, NumpyDataset)
+
+def make_model():
+    model = MachineLearningModel(n_jobs=1, cache_dir=None)
+    model.model.set_params(n_estimators=5)
+    model.model.fit(model.X, model.y)
+    return model
+
+def test_add_trees_leaves_warm_start_off():
+    model = make_model()
+    model.add_trees(model.X, model.y, n_new_trees=3)
+    assert len(model.model.estimators_) == 8
+    assert model.model.get_params()['warm_start'] is False
+
+    # A later full fit retrains every tree instead of silently keeping the old ones
+    old_trees = list(model.model.estimators_)
+    model.model.fit(model.X, model.y)
+    assert not set(map(id, model.model.estimators_)) & set(map(id, old_trees))
+
+def test_add_trees_rejects_missing_and_unseen_classes():
+    model = make_model()
+    with pytest.raises(MachineLearningError):
+        model.add_trees(model.X[model.y != 2], model.y[model.y != 2])
+    y_new = model.y.copy()
+    y_new[:5] = 3
+    with pytest.raises(MachineLearningError):
+        model.add_trees(model.X, y_new)
+    assert list(model.model.classes_) == [0, 1, 2]
+    assert len(model.model.estimators_) == 5
+    assert model.model.predict_proba(model.X[:2]).shape == (2, 3)
+
+def test_dataset_without_iter_batches_cannot_be_created():
+    class Incomplete(Dataset):
+        pass
+    with pytest.raises(TypeError):
+        Incomplete()
+
+@pytest.fixture
+def model_path(tmp_path):
+    model = make_model()
+    return model.save_model(str(tmp_path / "model.joblib")), model
+
+def test_server_batches_concurrent_requests(model_path):
+    path, model = model_path
+    with ModelServer(path, max_batch_size=64, max_wait=0.05) as server:
+        futures = [server.submit(row) for row in model.X[:40]]
+        labels = [future.result(5)[0] for future in futures]
+        stats = server.get_stats()
+    assert labels == list(model.model.predict(model.X[:40]))
+    assert stats["requests"] == 40
+    assert max(stats["batch_sizes"]) > 1
+
+def test_server_flushes_on_timeout_and_on_full_batch(model_path):
+    path, model = model_path
+    with ModelServer(path, max_batch_size=256, max_wait=0.05) as server:
+        start = time.perf_counter()
+        server.predict(model.X[0], timeout=5)  # A lone row waits at most max_wait
+        assert time.perf_counter() - start < 1
+    with ModelServer(path, max_batch_size=4, max_wait=30) as server:
+        futures = [server.submit(row) for row in model.X[:4]]
+        for future in futures:
+            future.result(5)  # A full batch is scored without waiting out max_wait
+        assert server.get_stats()["batch_sizes"] == {4: 1}
+
+def test_bad_row_fails_only_its_own_request(model_path):
+    path, model = model_path
+    with ModelServer(path, max_batch_size=64, max_wait=0.05) as server:
+        rows = list(model.X[:5])
+        rows[2] = np.full(model.X.shape[1], np.inf)  # Right shape, but predict_proba rejects it
+        futures = [server.submit(row) for row in rows]
+        with pytest.raises(ModelServerError):
+            futures[2].result(5)
+        for i in (0, 1, 3, 4):
+            assert futures[i].result(5)[0] == model.model.predict(model.X[i:i + 1])[0]
+        assert server.predict(model.X[0], timeout=5) == model.model.predict(model.X[:1])[0]
+
+def test_close_drains_queue_and_refuses_new_work(model_path):
+    path, model = model_path
+    server = ModelServer(path, max_batch_size=8, max_wait=0.05)
+    futures = [server.submit(row) for row in model.X[:20]]
+    server.close()
+    assert all(future.done() and future.exception() is None for future in futures)
+    assert not server.batcher.is_alive()
+    with pytest.raises(ModelServerError):
+        server.submit(model.X[0])
+
+DEPTHS = {'max_depth': list(range(1, 10))}
+
+def scripted_fold(params, n_estimators, fold):
+    """Stand-in for _evaluate_fold: deeper is better with few trees; with more trees the best hangs."""
+    if n_estimators == 2:
+        return params['max_depth'] / 10
+    if params['max_depth'] == 9:
+        time.sleep(30)
+    return 0.1
+
+def test_successive_halving_keeps_the_top_third_each_rung():
+    model = MachineLearningModel(n_jobs=1, cv=3, cache_dir=None)
+    result = model.search_hyperparameters(n_candidates=9, eta=3, min_estimators=2, max_estimators=18,
+                                          max_workers=2, refit=False, search_space=DEPTHS)
+    rungs = Counter(entry['rung'] for entry in result['trace'])
+    assert rungs == {0: 9, 1: 3, 2: 1}
+    assert [entry['n_estimators'] for entry in result['trace'] if entry['rung'] == 2] == [18]
+    assert result['best_n_estimators'] == 18
+    final = next(entry for entry in result['trace'] if entry['rung'] == 2)
+    assert result['best_params'] == final['params'] and result['best_score'] == final['score']
+
+def test_budget_cutoff_keeps_last_finished_rung_and_stops_running_fits(monkeypatch):
+    monkeypatch.setattr(machinelearingmodel, '_evaluate_fold', scripted_fold)
+    model = MachineLearningModel(n_jobs=1, cv=2, cache_dir=None)
+    start = time.perf_counter()
+    result = model.search_hyperparameters(n_candidates=9, eta=3, min_estimators=2, max_estimators=18,
+                                          time_budget=3.0, max_workers=3, refit=False, search_space=DEPTHS)
+    assert time.perf_counter() - start < 10
+    assert not multiprocessing.active_children()  # The hung fits were terminated, not left running
+    # Rung 1 finished depths 7 and 8 with 0.1 before the budget ran out; rung 0's winner must stand
+    assert any(entry['rung'] == 1 for entry in result['trace'])
+    assert result['best_params'] == {'max_depth': 9}
+    assert result['best_n_estimators'] == 2
+    assert result['best_score'] == pytest.approx(0.9)
+
+def cached_model(cache_dir, **params):
+    model = MachineLearningModel(n_jobs=params.pop('n_jobs', 1), cv=3, cache_dir=str(cache_dir))
+    model.model.set_params(n_estimators=10, **params)
+    model.plot_feature_importance = lambda: None
+    return model
+
+def test_identical_rerun_loads_model_and_scores_from_cache(tmp_path):
+    first = cached_model(tmp_path)
+    scores = first.train_and_evaluate()
+    assert len(os.listdir(tmp_path)) == 1
+    assert first.timings['fit'] > 0 and first.timings['cv'] > 0
+
+    second = cached_model(tmp_path, n_jobs=2)  # n_jobs does not change the fitted model
+    second.model.fit = second.cross_validate = None  # Neither may run on a cache hit
+    np.testing.assert_array_equal(second.train_and_evaluate(), scores)
+    assert second.timings['fit'] == second.timings['cv'] == 0.0
+    assert set(second.timings) == {'fit', 'cv', 'predict', 'report'}
+    np.testing.assert_array_equal(second.model.predict(second.X), first.model.predict(first.X))
+
+def test_changed_hyperparameters_or_data_miss_the_cache(tmp_path):
+    cached_model(tmp_path).train_and_evaluate()
+    cached_model(tmp_path, max_depth=2).train_and_evaluate()
+    assert len(os.listdir(tmp_path)) == 2
+    iris = machinelearingmodel.IrisDataset()
+    X, y = iris.X.copy(), iris.y
+    X[0, 0] += 0.1
+    other = cached_model(tmp_path)
+    other.dataset = GeneratorDataset(lambda: [(X, y)], iris.feature_names)
+    other.train_and_evaluate()
+    assert len(os.listdir(tmp_path)) == 3
+
+def test_unreadable_cache_entry_is_refit_and_replaced(tmp_path):
+    model = cached_model(tmp_path)
+    scores = model.train_and_evaluate()
+    (entry,) = os.listdir(tmp_path)
+    (tmp_path / entry).write_bytes(b"not a joblib file")
+    again = cached_model(tmp_path)
+    np.testing.assert_array_equal(again.train_and_evaluate(), scores)  # Same random_state, same scores
+    assert again.timings['fit'] > 0
+    assert again.load_cached(entry[:-len(".joblib")]) is not None
+
+def blobs(rows, seed):
+    rng = np.random.default_rng(seed)
+    y = rng.integers(0, 3, rows)
+    X = rng.normal(0, 0.5, (rows, 2)) + np.array([[0, 0], [4, 0], [0, 4]])[y]
+    return X, y
+
+def test_datasets_stream_the_same_rows(tmp_path):
+    X, y = blobs(250, seed=0)
+    pd.DataFrame({'a': X[:, 0], 'b': X[:, 1], 'label': y}).to_csv(tmp_path / "data.csv", index=False)
+    np.save(tmp_path / "X.npy", X)
+    np.save(tmp_path / "y.npy", y)
+    csv = CSVDataset(str(tmp_path / "data.csv"), 'label', classes=[0, 1, 2])
+    npy = NumpyDataset(str(tmp_path / "X.npy"), str(tmp_path / "y.npy"))
+    assert csv.feature_names == ['a', 'b'] and npy.feature_names == ['feature_0', 'feature_1']
+    assert [len(X_batch) for X_batch, _ in csv.iter_batches(100)] == [100, 100, 50]
+    assert isinstance(npy.load()[0], np.memmap)
+    for dataset in (csv, npy):
+        X_loaded, y_loaded = Dataset.load(dataset)
+        np.testing.assert_allclose(X_loaded, X, rtol=1e-6)
+        np.testing.assert_array_equal(y_loaded, y)
+    np.save(tmp_path / "short.npy", y[:-1])
+    with pytest.raises(MachineLearningError):
+        NumpyDataset(str(tmp_path / "X.npy"), str(tmp_path / "short.npy"))
+
+def test_train_incremental_streams_batches_into_partial_fit():
+    X, y = blobs(3000, seed=1)
+    batches = []
+
+    def batch_factory():
+        for start in range(0, len(X), 500):
+            batches.append(start)
+            yield X[start:start + 500], y[start:start + 500]
+    dataset = GeneratorDataset(batch_factory)
+    model = MachineLearningModel(cache_dir=None, dataset=dataset)
+    with pytest.raises(MachineLearningError):
+        model.train_incremental()  # No classes known for the first partial_fit
+    learner = model.train_incremental(classes=[0, 1, 2], epochs=2)
+    assert len(batches) == 12  # Every batch, once per epoch
+    X_test, y_test = blobs(500, seed=2)
+    assert learner.score(X_test, y_test) > 0.95
+
+    # Later calls keep training the same learner, and no longer need the classes
+    more = model.train_incremental(GeneratorDataset(lambda: [blobs(500, seed=3)]))
+    assert more is learner and model.timings['partial_fit'] >= 0
+
+def test_train_on_delta_grows_a_rolling_forest(tmp_path):
+    model = make_model()
+    path = model.save_model(str(tmp_path / "model.joblib"))
+    daily = MachineLearningModel(n_jobs=1, cache_dir=None)
+    daily.load_model(path)
+    first_trees = list(daily.model.estimators_)
+    X, y = daily.X, daily.y
+    delta = GeneratorDataset(lambda: [(X[::2], y[::2]), (X[1::2], y[1::2])])
+    daily.train_on_delta(delta, n_new_trees=4, max_trees=10)
+    assert len(daily.model.estimators_) == daily.model.n_estimators == 10
+    assert not set(map(id, first_trees[:3])) & set(map(id, daily.model.estimators_))  # Oldest dropped
+    assert daily.model.score(X, y) > 0.9
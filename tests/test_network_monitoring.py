@@ -0,0 +1,222 @@
+import os
+import math
+import time
+import socket
+import asyncio
+import urllib.error
+import urllib.request
+import importlib.util
+
+import pytest
+
+# The module's file name has a space in it, so it cannot be imported by name
+spec = importlib.util.spec_from_file_location(
+    "network_monitoring", os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "network monitoring.py"))
+network_monitoring = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(network_monitoring)
+
+BAD_HOST = "a" * 70 + ".example"  # A label over 63 characters makes the IDNA codec raise UnicodeError
+
+def test_malformed_hostname_is_reported_down():
+    monitor = network_monitoring.NetworkMonitor([], timeout=1)
+    results = asyncio.run(monitor.check_servers_async([(BAD_HOST, 80), (BAD_HOST, 443), ("127.0.0.1", 9)]))
+    by_target = {(result.host, result.port): result for result in results}
+    assert len(by_target) == 3
+    assert not by_target[(BAD_HOST, 80)].reachable
+    assert by_target[(BAD_HOST, 80)].error.startswith("DNS:")
+    assert not by_target[(BAD_HOST, 443)].reachable
+
+def test_lookup_error_resolves_shared_future():
+    cache = network_monitoring.DNSCache()
+
+    async def run():
+        return await asyncio.gather(cache.resolve(BAD_HOST), cache.resolve(BAD_HOST), return_exceptions=True)
+    results = asyncio.run(asyncio.wait_for(run(), 5))
+    assert all(isinstance(result, UnicodeError) for result in results)
+    assert not cache.inflight
+    with pytest.raises(UnicodeError):
+        asyncio.run(cache.resolve(BAD_HOST))  # Negatively cached
+    assert cache.misses == 1
+
+def test_cancelled_lookup_does_not_strand_waiters():
+    cache = network_monitoring.DNSCache()
+
+    async def run():
+        leader = asyncio.ensure_future(cache.resolve("localhost"))
+        await asyncio.sleep(0)  # Let the leader register its in-flight lookup
+        waiter = asyncio.ensure_future(cache.resolve("localhost"))
+        await asyncio.sleep(0)
+        leader.cancel()
+        return await asyncio.wait_for(waiter, 5)
+    family, address = asyncio.run(run())
+    assert address in ("127.0.0.1", "::1")
+
+def test_hung_lookup_times_out_and_is_cached_briefly(monkeypatch):
+    cache = network_monitoring.DNSCache(ttl=300, negative_ttl=0.2, timeout=0.1)
+    calls = []
+
+    async def hang(self, host, *args, **kwargs):
+        calls.append(host)
+        await asyncio.sleep(3600)
+
+    async def run():
+        monkeypatch.setattr(type(asyncio.get_running_loop()), "getaddrinfo", hang)
+        start = time.monotonic()
+        with pytest.raises(socket.gaierror):
+            await cache.resolve("hung.example")
+        assert time.monotonic() - start < 1
+        with pytest.raises(socket.gaierror):
+            await cache.resolve("hung.example")  # Served from the negative entry
+        assert len(calls) == 1
+        await asyncio.sleep(0.25)
+        with pytest.raises(socket.gaierror):
+            await cache.resolve("hung.example")  # The negative entry expired, so it is retried
+        assert len(calls) == 2
+    asyncio.run(run())
+
+def test_negative_ttl_never_exceeds_ttl():
+    assert network_monitoring.DNSCache(ttl=5, negative_ttl=30).negative_ttl == 5
+
+def test_monitor_reports_hung_resolver_as_down(monkeypatch):
+    async def hang(self, host, *args, **kwargs):
+        await asyncio.sleep(3600)
+
+    async def run():
+        monkeypatch.setattr(type(asyncio.get_running_loop()), "getaddrinfo", hang)
+        monitor = network_monitoring.NetworkMonitor([], timeout=0.1)
+        return await monitor.check_servers_async([("hung.example", 80)])
+    result, = asyncio.run(asyncio.wait_for(run(), 5))
+    assert not result.reachable
+    assert "timed out" in result.error
+
+def test_latency_ring_wraps_and_summarizes_the_window():
+    ring = network_monitoring.LatencyRing(size=4)
+    assert ring.availability() is None and ring.percentiles() == {50: None, 95: None, 99: None}
+    for latency in (0.5, None, 0.1, 0.2, 0.3, None):
+        ring.record(latency)
+    samples = list(ring.samples())
+    assert samples[:2] == [0.1, 0.2] and samples[2] == 0.3 and math.isnan(samples[3])  # Oldest first
+    assert ring.count == 4
+    assert ring.availability() == 0.75
+    assert ring.percentiles((0, 50, 99)) == {0: 0.1, 50: 0.2, 99: 0.3}
+    assert ring.change_rate() == 1 / 3
+
+def probe(state, monitor, outcomes):
+    for ok in outcomes:
+        monitor.record_probe(state, network_monitoring.CheckResult(
+            state.host, state.port, ok, 0.01 if ok else None, None if ok else "refused"))
+
+def test_rise_and_fall_hysteresis():
+    monitor = network_monitoring.NetworkMonitor(["a:1"], rise=2, fall=3, window=64)
+    state = monitor.states[0]
+    probe(state, monitor, [True])
+    assert state.up is True  # The first probe settles the state
+    probe(state, monitor, [False, False, True, False, False])
+    assert state.up is True  # A success resets the failure streak
+    probe(state, monitor, [False])
+    assert state.up is False
+    probe(state, monitor, [True])
+    assert state.up is False
+    probe(state, monitor, [True])
+    assert state.up is True
+    assert state.probes == 9 and state.failures == 5
+
+def test_flapping_starts_and_stops_with_hysteresis():
+    monitor = network_monitoring.NetworkMonitor(["a:1"], window=20, flap_start=0.5, flap_stop=0.25)
+    state = monitor.states[0]
+    probe(state, monitor, [True, False] * 4)
+    assert not state.flapping  # Fewer than window / 2 probes
+    probe(state, monitor, [True, False])
+    assert state.flapping
+    probe(state, monitor, [True] * 14)
+    assert 0.25 <= state.ring.change_rate() < 0.5
+    assert state.flapping  # Below flap_start but not yet below flap_stop
+    probe(state, monitor, [True] * 4)
+    assert state.ring.change_rate() < 0.25 and not state.flapping
+    assert state.up is True
+
+def test_monitor_probes_each_target_on_its_own_interval():
+    listener = socket.socket()
+    listener.bind(("127.0.0.1", 0))
+    listener.listen(64)
+    closed = socket.socket()
+    closed.bind(("127.0.0.1", 0))  # Bound but not listening, so connects are refused
+    up_target = f"127.0.0.1:{listener.getsockname()[1]}"
+    down_target = f"127.0.0.1:{closed.getsockname()[1]}"
+    monitor = network_monitoring.NetworkMonitor([up_target, down_target], timeout=1, interval=0.05,
+                                                intervals={up_target: 0.1}, rise=1, fall=1)
+    try:
+        asyncio.run(monitor.monitor(duration=0.6, report_interval=0.2))
+    finally:
+        listener.close()
+        closed.close()
+    summary = monitor.get_summary()
+    assert summary[up_target]["up"] is True and summary[up_target]["availability"] == 1.0
+    assert summary[down_target]["up"] is False and summary[down_target]["availability"] == 0.0
+    up_state, down_state = monitor.states
+    assert 4 <= up_state.probes <= 7  # About 0.6s / 0.1s, less the jitter
+    assert 8 <= down_state.probes <= 13
+    assert monitor.probes_scheduled == up_state.probes + down_state.probes
+    assert monitor.probes_in_flight == 0
+
+def metric_lines(monitor):
+    return monitor.render_metrics().decode().splitlines()
+
+def test_metrics_exposition_has_cumulative_histograms_and_escaped_labels():
+    monitor = network_monitoring.NetworkMonitor([("db\\1", 5432), ('we"b', 80)])
+    monitor.metrics_max_age = 0
+    db, web = monitor.states
+    assert not any(line.startswith("network_monitor_target_up{") for line in metric_lines(monitor))  # No probe yet
+    probe(db, monitor, [True])
+    db.latency_sum = 0.0
+    for latency in (0.0004, 0.003, 0.003, 7.0):
+        monitor.record_probe(db, network_monitoring.CheckResult(db.host, db.port, True, latency, None))
+    probe(web, monitor, [False])
+
+    lines = metric_lines(monitor)
+    db_labels = 'target="db\\\\1:5432"'
+    assert f'network_monitor_target_up{{{db_labels}}} 1' in lines
+    assert 'network_monitor_target_up{target="we\\"b:80"} 0' in lines
+    assert f'network_monitor_probes_total{{{db_labels}}} 5' in lines
+    assert 'network_monitor_probe_failures_total{target="we\\"b:80"} 1' in lines
+    buckets = [line for line in lines if line.startswith(f'network_monitor_connect_latency_seconds_bucket{{{db_labels}')]
+    counts = [int(line.rsplit(" ", 1)[1]) for line in buckets]
+    assert len(buckets) == len(network_monitoring.LATENCY_BUCKETS) + 1
+    assert counts == sorted(counts)  # Cumulative
+    assert f'network_monitor_connect_latency_seconds_bucket{{{db_labels},le="0.0005"}} 1' in lines
+    assert f'network_monitor_connect_latency_seconds_bucket{{{db_labels},le="0.005"}} 3' in lines
+    assert f'network_monitor_connect_latency_seconds_bucket{{{db_labels},le="5"}} 4' in lines
+    assert buckets[-1] == f'network_monitor_connect_latency_seconds_bucket{{{db_labels},le="+Inf"}} 5'
+    assert f'network_monitor_connect_latency_seconds_count{{{db_labels}}} 5' in lines
+    total = [line for line in lines if line.startswith(f'network_monitor_connect_latency_seconds_sum{{{db_labels}')]
+    assert math.isclose(float(total[0].rsplit(" ", 1)[1]), 7.0064)
+    # Every sample belongs to a family announced by a TYPE line
+    families = {line.split()[2] for line in lines if line.startswith("# TYPE")}
+    for line in lines:
+        if not line.startswith("#"):
+            name = line.split("{")[0].split(" ")[0]
+            assert name in families or name.rsplit("_", 1)[0] in families
+
+def test_metrics_are_rendered_at_most_once_per_max_age():
+    monitor = network_monitoring.NetworkMonitor(["a:1"])
+    monitor.metrics_max_age = 60
+    first = monitor.render_metrics()
+    probe(monitor.states[0], monitor, [True])
+    assert monitor.render_metrics() is first
+    monitor.metrics_max_age = 0
+    assert b'network_monitor_probes_total{target="a:1"} 1' in monitor.render_metrics()
+
+def test_metrics_server_serves_the_exposition():
+    monitor = network_monitoring.NetworkMonitor(["a:1"])
+    server = monitor.start_metrics_server(port=0, host="127.0.0.1")
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    try:
+        with urllib.request.urlopen(base_url + "/metrics", timeout=5) as response:
+            assert response.headers["Content-Type"].startswith("text/plain; version=0.0.4")
+            assert response.read() == monitor.render_metrics()
+        with pytest.raises(urllib.error.HTTPError) as excinfo:
+            urllib.request.urlopen(base_url + "/other", timeout=5)
+        assert excinfo.value.code == 404
+    finally:
+        server.shutdown()
+        server.server_close()
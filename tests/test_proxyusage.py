@@ -0,0 +1,150 @@
+import random
+import socket
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import pytest
+
+from proxyusage import ProxyPool, WebScraperWithProxy
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+class StandInProxy(BaseHTTPRequestHandler):
+    """Answers proxied GETs itself: with the server's `status`, echoing the requested URL."""
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        self.server.requests.append(self.path)
+        body = f"<html><head><title>{self.server.name} {self.path}</title></head></html>".encode()
+        self.send_response(self.server.status)
+        self.send_header("Content-Type", "text/html")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+@pytest.fixture
+def start_proxy():
+    servers = []
+
+    def start(name, status=200):
+        server = ThreadingHTTPServer(("127.0.0.1", 0), StandInProxy)
+        server.name, server.status, server.requests = name, status, []
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return server, f"http://127.0.0.1:{server.server_address[1]}"
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+def unused_port_url():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return f"http://127.0.0.1:{sock.getsockname()[1]}"
+
+def test_ewma_weighting_favours_fast_reliable_proxies():
+    pool = ProxyPool(["fast", "slow", "flaky"], alpha=0.5, failure_threshold=10, clock=FakeClock())
+    fast, slow, flaky = (pool.states[name] for name in ("fast", "slow", "flaky"))
+    pool.report_success(fast, 0.1)
+    pool.report_success(slow, 5.0)
+    pool.report_failure(flaky)
+    assert fast.latency_ewma == pytest.approx(0.55)
+    assert slow.latency_ewma == pytest.approx(3.0)
+    assert flaky.success_ewma == pytest.approx(0.5)
+    assert fast.score() > flaky.score() > slow.score()
+
+    random.seed(0)
+    picks = [pool.acquire().proxy for _ in range(2000)]
+    assert picks.count("fast") > 2 * picks.count("flaky") > 0
+    assert picks.count("flaky") > picks.count("slow") > 0
+
+def test_quarantine_with_exponential_cooldown():
+    clock = FakeClock()
+    pool = ProxyPool(["a", "b"], failure_threshold=3, base_cooldown=5.0, max_cooldown=12.0, clock=clock)
+    a = pool.states["a"]
+    for _ in range(2):
+        pool.report_failure(a)
+    assert pool.get_stats()["a"]["quarantined_for"] == 0
+    pool.report_failure(a)
+    assert pool.get_stats()["a"]["quarantined_for"] == 5.0
+    assert {pool.acquire().proxy for _ in range(50)} == {"b"}
+
+    # A late failure from a request sent before the quarantine does not extend it
+    pool.report_failure(a)
+    assert pool.get_stats()["a"]["quarantined_for"] == 5.0
+
+    # Out of quarantine, the first failure sends it straight back, for twice as long
+    clock.now += 5.0
+    pool.report_failure(a)
+    assert pool.get_stats()["a"]["quarantined_for"] == 10.0
+    clock.now += 10.0
+    pool.report_failure(a)
+    assert pool.get_stats()["a"]["quarantined_for"] == 12.0  # Capped at max_cooldown
+
+    # A success clears the quarantine history
+    clock.now += 12.0
+    pool.report_success(a, 0.1)
+    pool.report_failure(a)
+    assert pool.get_stats()["a"]["quarantined_for"] == 0
+    assert a.quarantines == 0
+
+def test_all_quarantined_probes_the_first_to_recover():
+    clock = FakeClock()
+    pool = ProxyPool(["a", "b"], failure_threshold=1, base_cooldown=5.0, clock=clock)
+    pool.report_failure(pool.states["a"])
+    clock.now += 1
+    pool.report_failure(pool.states["b"])
+    assert pool.acquire().proxy == "a"
+
+def test_fetch_page_fails_over_to_next_proxy(start_proxy):
+    bad, bad_url = start_proxy("bad", status=502)
+    good, good_url = start_proxy("good")
+    dead_url = unused_port_url()
+    clock = FakeClock()
+    pool = ProxyPool([bad_url, dead_url, good_url], failure_threshold=1, clock=clock)
+    scraper = WebScraperWithProxy("http://origin.test/page", None, timeout=2, max_attempts=3, pool=pool)
+    try:
+        random.seed(1)
+        html = scraper.fetch_page()
+        assert scraper.parse_html(html) == "good http://origin.test/page"
+        stats = pool.get_stats()
+        assert stats[good_url]["successes"] == 1
+        # Whichever failing proxies were tried are now quarantined and skipped
+        for url in (bad_url, dead_url):
+            assert (stats[url]["failures"] == 1) == (stats[url]["quarantined_for"] > 0)
+        for _ in range(5):
+            assert scraper.fetch_page() is not None
+        assert pool.get_stats()[good_url]["successes"] == 6
+        assert len(good.requests) == 6
+    finally:
+        scraper.close()
+
+def test_origin_error_is_not_blamed_on_the_proxy(start_proxy):
+    _, url = start_proxy("origin404", status=404)
+    pool = ProxyPool([url], failure_threshold=1, clock=FakeClock())
+    scraper = WebScraperWithProxy("http://origin.test/missing", None, pool=pool)
+    try:
+        assert scraper.fetch_page() is None
+        stats = pool.get_stats()[url]
+        assert stats["successes"] == 1 and stats["failures"] == 0 and stats["quarantined_for"] == 0
+    finally:
+        scraper.close()
+
+def test_every_proxy_failing_gives_up_after_max_attempts(start_proxy):
+    bad, url = start_proxy("bad", status=503)
+    pool = ProxyPool([url], failure_threshold=1, base_cooldown=5.0, clock=FakeClock())
+    scraper = WebScraperWithProxy("http://origin.test/page", None, max_attempts=3, pool=pool)
+    try:
+        assert scraper.fetch_page() is None
+        assert len(bad.requests) == 3  # Probed while quarantined, since no other proxy is left
+        assert pool.get_stats()[url]["quarantined_for"] == 5.0  # Failed probes don't extend the cooldown
+    finally:
+        scraper.close()
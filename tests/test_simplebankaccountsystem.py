@@ -0,0 +1,85 @@
+import pytest
+
+from simplebankaccountsystem import DurableAccountStore, InsufficientFundsError, LedgerError
+
+def open_store(directory):
+    store = DurableAccountStore(str(directory), fsync="always", snapshot_every=None)
+    return store
+
+def test_failed_journal_append_leaves_balances_untouched(tmp_path):
+    store = open_store(tmp_path)
+    first = store.open_accounts(3, "holder", 1000)
+    store.transfer(first, first + 1, 153)
+    before = store.balances.tolist()
+    store.close()  # Every later append raises LedgerError
+
+    with pytest.raises(LedgerError):
+        store.deposit(first, 5)
+    with pytest.raises(LedgerError):
+        store.withdraw(first, 5)
+    with pytest.raises(LedgerError):
+        store.transfer(first, first + 2, 5)
+    with pytest.raises(LedgerError):
+        store.apply_batch([("deposit", first, 5), ("transfer", first + 1, first + 2, 7)])
+    with pytest.raises(LedgerError):
+        store.open_account("late", 10)
+    assert store.balances.tolist() == before
+    assert len(store) == 3
+
+    recovered = open_store(tmp_path)
+    assert recovered.balances.tolist() == before
+    recovered.close()
+
+def test_wal_write_error_stops_later_operations(tmp_path):
+    store = open_store(tmp_path)
+    account = store.open_account("holder", 1000)
+    store.wal.error = OSError("disk full")  # As set by a failed write or fsync
+    with pytest.raises(LedgerError):
+        store.apply_batch([("withdraw", account, 10), ("deposit", account, 3)])
+    assert store.get_balance(account) == 1000
+    store.wal.error = None
+    store.close()
+
+def test_batch_is_all_or_nothing_and_recovers(tmp_path):
+    store = open_store(tmp_path)
+    a = store.open_account("a", 100)
+    b = store.open_account("b", 0)
+    with pytest.raises(InsufficientFundsError):
+        store.apply_batch([("transfer", a, b, 60), ("transfer", a, b, 60)])
+    store.apply_batch([("transfer", a, b, 60), ("deposit", a, 20), ("transfer", a, b, 60)])
+    assert (store.get_balance(a), store.get_balance(b)) == (0, 120)
+    store.close()
+
+    recovered = open_store(tmp_path)
+    assert (recovered.get_balance(a), recovered.get_balance(b)) == (0, 120)
+    recovered.close()
+
+def test_overflow_is_rejected_before_journaling(tmp_path):
+    store = open_store(tmp_path)
+    account = store.open_account("rich", 2 ** 63 - 10)
+    with pytest.raises(OverflowError):
+        store.deposit(account, 100)
+    store.close()
+    recovered = open_store(tmp_path)
+    assert recovered.get_balance(account) == 2 ** 63 - 10
+    recovered.close()
+
+@pytest.mark.parametrize("balance", [12.5, "100", None, True])
+def test_rejected_open_leaves_store_unchanged(tmp_path, balance):
+    store = open_store(tmp_path)
+    first = store.open_account("first", 100)
+    with pytest.raises((ValueError, TypeError)):
+        store.open_account("bad", balance)
+    with pytest.raises((ValueError, TypeError)):
+        store.open_accounts(2, "bad", balance)
+    assert len(store.holders) == len(store.balances) == 1
+    assert store.get_holder(first) == "first"
+
+    second = store.open_account("second", 5)
+    assert store.get_holder(second) == "second"
+    assert store.get_balance(second) == 5
+    store.close()
+    recovered = open_store(tmp_path)
+    assert [recovered.get_holder(i) for i in range(len(recovered))] == ["first", "second"]
+    assert recovered.balances.tolist() == [100, 5]
+    recovered.close()
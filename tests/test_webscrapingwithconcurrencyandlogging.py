@@ -0,0 +1,205 @@
+import os
+import json
+import zlib
+import time
+import hashlib
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import pytest
+
+from webscrapingwithconcurrencyandlogging import BloomFilter, HostLimiter, PageStore, WebScraper, normalize_url
+
+SITE = {
+    "/": "<title>Home</title><h1>Home</h1><a href='/a'>a</a> <a href='b'>b</a> <a href='/a#top'>again</a>"
+         "<a href='http://elsewhere.test/'>off site</a> <a href='mailto:x@y.z'>mail</a> <a href='/missing'>404</a>",
+    "/a": "<h1>A</h1><h2>Section</h2><a href='/b'>b</a><a href='/c'>c</a>",
+    "/b": "<h1>B</h1><a href='/'>home</a>",
+    "/c": "<h1>C</h1><a href='/d'>deeper</a>",
+    "/d": "<h1>D</h1>",
+}
+
+class SiteHandler(BaseHTTPRequestHandler):
+    """Serves SITE (or the server's own `pages`) with ETags, answering 304 to a matching If-None-Match."""
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.hits[self.path] = server.hits.get(self.path, 0) + 1
+        page = server.pages.get(self.path)
+        if page is None:
+            self.send_response(404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        body = page.encode()
+        etag = '"%s"' % hashlib.sha256(body).hexdigest()[:16]
+        if server.always_304 or self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("ETag", etag)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+@pytest.fixture
+def site():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), SiteHandler)
+    server.pages = dict(SITE)
+    server.hits = {}
+    server.always_304 = False
+    server.lock = threading.Lock()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    server.base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    yield server
+    server.shutdown()
+    server.server_close()
+
+def read_records(path):
+    with open(path, encoding='utf-8') as f:
+        return [json.loads(line) for line in f]
+
+def test_normalize_url():
+    assert normalize_url("HTTP://Example.COM/Path?q=1#frag") == "http://example.com/Path?q=1"
+    assert normalize_url("https://example.com/a") == "https://example.com/a"
+
+def test_bloom_filter_has_no_false_negatives_and_few_false_positives():
+    bloom = BloomFilter(capacity=2000, error_rate=0.01)
+    urls = [f"https://example.com/page/{i}" for i in range(2000)]
+    added = sum(bloom.add(url) for url in urls)  # A false positive reports a new URL as seen
+    assert added > 2000 * 0.97
+    assert not bloom.add(urls[0])
+    assert bloom.count == added
+    assert all(url in bloom for url in urls)
+    false_positives = sum(f"https://example.com/other/{i}" in bloom for i in range(20000))
+    assert false_positives < 20000 * 0.03
+    assert len(bloom.bits) < 2000 * 10 / 8 + 1  # About 9.6 bits per item at a 1% error rate
+
+def test_host_limiter_caps_concurrency_per_host():
+    limiter = HostLimiter(max_per_host=2)
+    active = {"a": 0, "b": 0}
+    peak = {"a": 0, "b": 0}
+    lock = threading.Lock()
+
+    def request(host):
+        limiter.acquire(host)
+        with lock:
+            active[host] += 1
+            peak[host] = max(peak[host], active[host])
+        time.sleep(0.05)
+        with lock:
+            active[host] -= 1
+        limiter.release(host)
+    threads = [threading.Thread(target=request, args=(host,)) for host in "ab" * 5]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert peak == {"a": 2, "b": 2}
+
+def test_host_limiter_spaces_request_starts():
+    limiter = HostLimiter(max_per_host=10, rate=20)
+    start = time.monotonic()
+    for _ in range(5):
+        limiter.acquire("a")
+        limiter.release("a")
+    assert time.monotonic() - start >= 4 / 20 - 0.01
+    start = time.monotonic()
+    limiter.acquire("b")  # Other hosts are not held back
+    assert time.monotonic() - start < 0.04
+
+def test_crawl_follows_links_to_max_depth_once_each(site, tmp_path):
+    output = tmp_path / "crawl.jsonl"
+    scraper = WebScraper(site.base_url, max_threads=3)
+    try:
+        written = scraper.crawl([site.base_url + "/"], output=str(output), max_depth=2)
+    finally:
+        scraper.close()
+    records = {record["url"][len(site.base_url):]: record for record in read_records(output)}
+    assert written == len(records) == 5
+    assert {path: record["depth"] for path, record in records.items()} == \
+        {"/": 0, "/a": 1, "/b": 1, "/missing": 1, "/c": 2}
+    assert records["/a"]["headings"] == ["A", "Section"]
+    assert records["/"]["links"] == 6
+    assert records["/missing"]["error"] == "fetch failed"
+    assert all(count == 1 for count in site.hits.values())  # Deduplicated, fragment and all
+    assert "/d" not in site.hits  # Depth 3 is past max_depth
+
+def test_crawl_limits_and_overwrites_output(site, tmp_path):
+    output = tmp_path / "crawl.jsonl"
+    scraper = WebScraper(site.base_url, max_threads=2)
+    try:
+        assert scraper.crawl([site.base_url + "/"], output=str(output)) == 1  # max_depth=0: seeds only
+        assert scraper.crawl([site.base_url + "/"], output=str(output), max_depth=5, max_pages=3) == 3
+        assert len(read_records(output)) == 3  # The earlier run's record is gone
+        assert scraper.crawl([site.base_url + "/b"], output=str(output), append=True) == 1
+        assert len(read_records(output)) == 4
+    finally:
+        scraper.close()
+
+def test_page_store_dedupes_compressed_bodies_and_reloads_the_index(tmp_path):
+    store = PageStore(str(tmp_path))
+    body = b"<h1>same</h1>" * 100
+    digest = store.put_body(body)
+    assert store.put_body(body) == digest == hashlib.sha256(body).hexdigest()
+    path = tmp_path / "objects" / digest[:2] / digest
+    assert len(os.listdir(path.parent)) == 1
+    assert zlib.decompress(path.read_bytes()) == body and path.stat().st_size < len(body)
+    assert store.read_body(digest) == body
+
+    store.record("http://x/1", '"v1"', None, digest, ["old"], 0)
+    store.record("http://x/1", '"v2"', "Mon, 01 Jan 2024 00:00:00 GMT", digest, ["same"], 2, "utf-8")
+    store.record("http://x/2", None, None, digest, [], 0)
+    assert store.conditional_headers("http://x/1") == \
+        {"If-None-Match": '"v2"', "If-Modified-Since": "Mon, 01 Jan 2024 00:00:00 GMT"}
+    assert store.conditional_headers("http://x/2") == {}
+    assert store.conditional_headers("http://x/3") == {}
+    store.journal.close()  # Simulate a crash: no compaction, then a torn final line
+    with open(tmp_path / "index.jsonl", "a", encoding="utf-8") as f:
+        f.write('{"url": "http://x/3", "etag"')
+
+    reopened = PageStore(str(tmp_path))
+    assert reopened.get("http://x/1")["headings"] == ["same"]
+    assert reopened.get("http://x/3") is None
+    reopened.close()
+    assert len(read_records(tmp_path / "index.jsonl")) == 2  # Compacted to one line per URL
+
+def test_recrawl_counts_cache_outcomes(site, tmp_path):
+    scraper = WebScraper(site.base_url, cache_dir=str(tmp_path))
+    urls = [site.base_url + path for path in ("/", "/a", "/b")]
+    try:
+        assert [scraper.fetch_and_parse(url)["cache"] for url in urls] == ["changed"] * 3
+        site.pages["/a"] = SITE["/a"] + "<h2>New</h2>"
+        results = [scraper.fetch_and_parse(url) for url in urls]
+        assert [result["cache"] for result in results] == ["not_modified", "changed", "not_modified"]
+        assert results[1]["headings"] == ["A", "Section", "New"]
+        assert results[0]["headings"] == ["Home"]  # Served from the index without a body
+        assert scraper.fetch_page(urls[2]) == SITE["/b"]  # 304 answered from the stored body
+        assert scraper.cache_stats["not_modified"] == 3 and scraper.cache_stats["changed"] == 4
+    finally:
+        scraper.close()
+
+def test_304_without_a_cached_copy_is_refetched(site, tmp_path):
+    scraper = WebScraper(site.base_url, cache_dir=str(tmp_path))
+    url = site.base_url + "/b"
+    try:
+        scraper.store.record(url, '"stale"', None, "0" * 64, [], 0)
+        scraper.store.entries.pop(url)  # Validators sent, but the entry is gone by the time we check
+        site.always_304 = True
+        assert scraper.fetch_and_parse(url) is None  # A 304 to an unconditional GET is an error
+        assert site.hits["/b"] == 2
+        site.always_304 = False
+        result = scraper.fetch_and_parse(url)
+        assert result == {"headings": ["B"], "links": ["/"], "cache": "changed"}
+        assert scraper.store.read_body(scraper.store.get(url)["hash"]) == SITE["/b"].encode()
+    finally:
+        scraper.close()
@@ -1,9 +1,18 @@
 #chatgpt
 import requests
-from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
 import logging
 from concurrent.futures import ThreadPoolExecutor
 import os
+import json
+import math
+import time
+import zlib
+import queue
+import hashlib
+import threading
+from urllib.parse import urljoin, urldefrag, urlsplit
+from htmlextraction import HTMLExtractor
 
 # Configure logging
 logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -12,29 +21,282 @@ class WebScraperError(Exception):
     """Custom exception for web scraper errors."""
     pass
 
+def normalize_url(url):
+    """Drop the fragment and lowercase the scheme and host so equivalent URLs dedupe together."""
+    url, _ = urldefrag(url)
+    parts = urlsplit(url)
+    return parts._replace(scheme=parts.scheme.lower(), netloc=parts.netloc.lower()).geturl()
+
+class BloomFilter:
+    """Fixed-size seen-set for URLs: a bit array plus k hash positions per item.
+
+    Memory is about -ln(error_rate) / ln(2)^2 bits per expected item (~29 bits at 1e-6),
+    whatever the URL length. False positives (a new URL reported as seen) occur at roughly
+    `error_rate` while fewer than `capacity` items are stored; there are no false negatives.
+    """
+
+    def __init__(self, capacity=1000000, error_rate=1e-6):
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+        self.lock = threading.Lock()
+
+    def _positions(self, item):
+        digest = hashlib.blake2b(item.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def add(self, item):
+        """Add an item, returning False if it was (probably) already present."""
+        positions = self._positions(item)
+        with self.lock:
+            if all(self.bits[p >> 3] & (1 << (p & 7)) for p in positions):
+                return False
+            for p in positions:
+                self.bits[p >> 3] |= 1 << (p & 7)
+            self.count += 1
+            return True
+
+    def __contains__(self, item):
+        return all(self.bits[p >> 3] & (1 << (p & 7)) for p in self._positions(item))
+
+class HostLimiter:
+    """Per-host politeness: at most `max_per_host` requests in flight and `rate` request starts per second."""
+
+    def __init__(self, max_per_host=2, rate=None):
+        self.max_per_host = max_per_host
+        self.rate = rate
+        self.hosts = {}  # host -> [semaphore, next allowed start time]
+        self.lock = threading.Lock()
+
+    def acquire(self, host):
+        with self.lock:
+            entry = self.hosts.setdefault(host, [threading.Semaphore(self.max_per_host), 0.0])
+        entry[0].acquire()
+        if self.rate:
+            with self.lock:
+                now = time.monotonic()
+                start = max(now, entry[1])
+                entry[1] = start + 1.0 / self.rate
+            time.sleep(start - now)
+
+    def release(self, host):
+        self.hosts[host][0].release()
+
+class JSONLSink:
+    """Writes one JSON record per line and flushes each, so a crash keeps everything written so far.
+
+    The file is truncated on open; with append=True records are added after any earlier output.
+    """
+
+    def __init__(self, path, append=False):
+        self.path = path
+        self.file = open(path, 'a' if append else 'w', encoding='utf-8')
+        self.lock = threading.Lock()
+        self.records = 0
+
+    def write(self, record):
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        with self.lock:
+            self.file.write(line)
+            self.file.flush()
+            self.records += 1
+
+    def close(self):
+        self.file.close()
+
+class PageStore:
+    """On-disk page cache: a URL index journal plus compressed, content-addressed bodies.
+
+    The index maps each URL to its validators (ETag/Last-Modified), the SHA-256 of its
+    body and the extraction results, and is appended to as pages are stored (like the
+    copier's SyncManifest). Bodies live under objects/<hash[:2]>/<hash>, zlib-compressed
+    and written once per distinct hash, so identical pages share a single file.
+    """
+
+    def __init__(self, directory, compression_level=6):
+        self.directory = directory
+        self.objects_dir = os.path.join(directory, 'objects')
+        self.index_path = os.path.join(directory, 'index.jsonl')
+        self.compression_level = compression_level
+        self.entries = {}  # url -> {"etag", "last_modified", "hash", "headings", "links", "encoding"}
+        self.lock = threading.Lock()
+        os.makedirs(self.objects_dir, exist_ok=True)
+        self._load()
+        self.journal = open(self.index_path, 'a', encoding='utf-8')
+
+    def _load(self):
+        """Load the index, ignoring a torn final line."""
+        if not os.path.exists(self.index_path):
+            return
+        with open(self.index_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    logging.warning(f"Skipping corrupt page index line in {self.index_path}")
+                    continue
+                self.entries[record.pop("url")] = record
+        logging.info(f"Loaded {len(self.entries)} cached pages from {self.directory}")
+
+    def get(self, url):
+        return self.entries.get(url)
+
+    def conditional_headers(self, url):
+        """Validators to send so the server can answer 304 Not Modified."""
+        entry = self.entries.get(url)
+        headers = {}
+        if entry is not None:
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def _object_path(self, digest):
+        return os.path.join(self.objects_dir, digest[:2], digest)
+
+    def put_body(self, body):
+        """Store a body under its SHA-256 unless an identical body is already stored; return the hash."""
+        digest = hashlib.sha256(body).hexdigest()
+        path = self._object_path(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(zlib.compress(body, self.compression_level))
+            os.replace(tmp_path, path)
+        return digest
+
+    def read_body(self, digest):
+        """Return the stored body with the given hash."""
+        with open(self._object_path(digest), 'rb') as f:
+            return zlib.decompress(f.read())
+
+    def record(self, url, etag, last_modified, digest, headings, links, encoding=None):
+        entry = {"etag": etag, "last_modified": last_modified, "hash": digest,
+                 "headings": headings, "links": links, "encoding": encoding}
+        line = json.dumps({"url": url, **entry}, ensure_ascii=False) + "\n"
+        with self.lock:
+            self.entries[url] = entry
+            self.journal.write(line)
+            self.journal.flush()
+
+    def compact(self):
+        """Atomically rewrite the index with one line per URL."""
+        with self.lock:
+            self.journal.close()
+            tmp_path = self.index_path + ".tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                for url, entry in self.entries.items():
+                    f.write(json.dumps({"url": url, **entry}, ensure_ascii=False) + "\n")
+            os.replace(tmp_path, self.index_path)
+            self.journal = open(self.index_path, 'a', encoding='utf-8')
+
+    def close(self):
+        self.compact()
+        self.journal.close()
+
 class WebScraper:
-    def __init__(self, base_url, max_threads=5):
+    def __init__(self, base_url, max_threads=5, parser_backend="auto", parse_processes=0, timeout=10, cache_dir=None):
         self.base_url = base_url
         self.max_threads = max_threads
+        self.timeout = timeout
         self.fetched_data = []
+        # parse_processes=0 parses in the fetching threads; otherwise the threads hand pages to a process pool
+        self.extractor = HTMLExtractor(parser_backend, processes=parse_processes)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=max_threads, pool_maxsize=max_threads)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.store = PageStore(cache_dir) if cache_dir else None
+        self.cache_stats = {"not_modified": 0, "unchanged": 0, "changed": 0, "bytes_downloaded": 0}
+        self.stats_lock = threading.Lock()
         
     def fetch_page(self, url):
-        """Fetch the content of a web page."""
+        """Fetch the content of a web page, served from the page store when the server answers 304."""
         try:
             logging.info(f"Fetching page: {url}")
-            response = requests.get(url)
-            response.raise_for_status()
+            if self.store is None:
+                response = self.session.get(url, timeout=self.timeout)
+                response.raise_for_status()
+                return response.text
+            cached = self.store.get(url)
+            response = self._conditional_get(url, cached)
+            if response is None:
+                self._count("not_modified")
+                return self.store.read_body(cached["hash"]).decode(cached.get("encoding") or 'utf-8', 'replace')
             return response.text
         except requests.RequestException as e:
             logging.error(f"Failed to fetch page {url}: {e}")
             return None
+
+    def _conditional_get(self, url, cached):
+        """GET a URL with the stored validators; return the response, or None if the cached copy is current."""
+        response = self.session.get(url, headers=self.store.conditional_headers(url), timeout=self.timeout)
+        if response.status_code == 304:
+            if cached is not None:
+                return None
+            # Nothing to reuse (e.g. the entry was recorded after we read it); ask for the body itself
+            logging.warning(f"{url} answered 304 but no cached copy is stored; refetching it unconditionally.")
+            response = self.session.get(url, timeout=self.timeout)
+            if response.status_code == 304:
+                raise requests.HTTPError(f"{url} answered 304 to an unconditional request.", response=response)
+        response.raise_for_status()
+        return response
+
+    def _count(self, outcome, size=0):
+        with self.stats_lock:
+            self.cache_stats[outcome] += 1
+            self.cache_stats["bytes_downloaded"] += size
+
+    def fetch_and_parse(self, url):
+        """Fetch and extract a page, reusing the page cache when one is configured.
+
+        Returns {"headings", "links", "cache"} or None if the fetch failed. "cache" is
+        "not_modified" when the server answered 304, "unchanged" when the body hash matched
+        the stored one (both skip parsing), and "changed" otherwise.
+        """
+        if self.store is None:
+            html = self.fetch_page(url)
+            if html is None:
+                return None
+            headings, links = self.extractor.submit("page", html).result()
+            return {"headings": headings, "links": links, "cache": None}
+
+        cached = self.store.get(url)
+        try:
+            logging.info(f"Fetching page: {url}")
+            response = self._conditional_get(url, cached)
+            if response is None:
+                self._count("not_modified")
+                return {"headings": cached["headings"], "links": cached["links"], "cache": "not_modified"}
+        except requests.RequestException as e:
+            logging.error(f"Failed to fetch page {url}: {e}")
+            return None
+
+        body = response.content
+        digest = hashlib.sha256(body).hexdigest()
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+        if cached is not None and cached["hash"] == digest:
+            outcome = "unchanged"
+            headings, links = cached["headings"], cached["links"]
+        else:
+            outcome = "changed"
+            headings, links = self.extractor.submit("page", response.text).result()
+            self.store.put_body(body)
+        if cached is None or outcome == "changed" or (cached["etag"], cached["last_modified"]) != (etag, last_modified):
+            self.store.record(url, etag, last_modified, digest, headings, links, response.encoding)
+        self._count(outcome, len(body))
+        return {"headings": headings, "links": links, "cache": outcome}
     
     def parse_html(self, html):
         """Parse the HTML and extract heading tags (h1, h2, h3, etc.)."""
         try:
-            soup = BeautifulSoup(html, 'html.parser')
-            headings = soup.find_all(['h1', 'h2', 'h3'])
-            return [heading.get_text(strip=True) for heading in headings]
+            return self.extractor.headings(html)
         except Exception as e:
             logging.error(f"Error while parsing HTML: {e}")
             return []
@@ -51,20 +313,106 @@ class WebScraper:
     
     def scrape_page(self, page_url):
         """Scrape a single page for headings."""
-        html = self.fetch_page(page_url)
-        if html:
-            headings = self.parse_html(html)
-            self.fetched_data.extend(headings)
+        result = self.fetch_and_parse(page_url)
+        return result["headings"] if result else []
     
     def scrape(self, page_urls):
         """Scrape multiple pages concurrently."""
         with ThreadPoolExecutor(max_workers=self.max_threads) as executor:
-            executor.map(self.scrape_page, page_urls)
+            for headings in executor.map(self.scrape_page, page_urls):
+                self.fetched_data.extend(headings)
+        return self.fetched_data
+
+    def crawl(self, seed_urls, output='crawl.jsonl', max_depth=0, max_pages=None, same_host=True,
+              max_per_host=2, host_rate=None, seen=None, append=False):
+        """Crawl from seed URLs, streaming one JSON record per page to `output`.
+
+        Links found on a page are enqueued (once, via the `seen` filter) while their depth is
+        at most `max_depth`; with max_depth=0 only the seeds are fetched. `same_host` keeps the
+        crawl on the seeds' hosts. Each host gets at most `max_per_host` concurrent requests and,
+        if `host_rate` is set, that many request starts per second. `output` is overwritten
+        unless `append` is set. Returns the number of pages written.
+        """
+        seen = seen or BloomFilter()
+        frontier = queue.Queue()
+        limiter = HostLimiter(max_per_host, host_rate)
+        sink = JSONLSink(output, append)
+        seed_hosts = {urlsplit(url).netloc.lower() for url in seed_urls}
+        enqueued = [0]
+        enqueue_lock = threading.Lock()
+        stopping = threading.Event()  # Set on interrupt so workers drain the frontier without fetching
+
+        def enqueue(url, depth):
+            url = normalize_url(url)
+            parts = urlsplit(url)
+            if parts.scheme not in ('http', 'https') or (same_host and parts.netloc not in seed_hosts):
+                return
+            with enqueue_lock:
+                if max_pages is not None and enqueued[0] >= max_pages:
+                    return
+                if not seen.add(url):
+                    return
+                enqueued[0] += 1
+            frontier.put((url, depth))
+
+        def worker():
+            while True:
+                item = frontier.get()
+                if item is None:
+                    frontier.task_done()
+                    return
+                url, depth = item
+                if stopping.is_set():
+                    frontier.task_done()
+                    continue
+                try:
+                    host = urlsplit(url).netloc
+                    limiter.acquire(host)
+                    try:
+                        result = self.fetch_and_parse(url)
+                    finally:
+                        limiter.release(host)
+                    if result is None:
+                        sink.write({"url": url, "depth": depth, "error": "fetch failed"})
+                        continue
+                    sink.write({"url": url, "depth": depth, "headings": result["headings"],
+                                "links": len(result["links"]), "cache": result["cache"]})
+                    if depth < max_depth:
+                        for link in result["links"]:
+                            enqueue(urljoin(url, link), depth + 1)
+                except Exception as e:
+                    logging.error(f"Error while crawling {url}: {e}")
+                    sink.write({"url": url, "depth": depth, "error": str(e)})
+                finally:
+                    frontier.task_done()
+
+        for url in seed_urls:
+            enqueue(url, 0)
+        threads = [threading.Thread(target=worker, daemon=True) for _ in range(self.max_threads)]
+        for thread in threads:
+            thread.start()
+        try:
+            frontier.join()  # Every enqueued page, including ones discovered on the way, is done
+        finally:
+            stopping.set()
+            for _ in threads:
+                frontier.put(None)
+            for thread in threads:
+                thread.join()
+            sink.close()
+        logging.info(f"Crawl finished: {sink.records} pages written to {output}.")
+        return sink.records
     
     def get_fetched_data(self):
         """Return the scraped data."""
         return self.fetched_data
 
+    def close(self):
+        self.extractor.close()
+        self.session.close()
+        if self.store is not None:
+            self.store.close()
+
 
 # Example usage of WebScraper class
 def main():
@@ -90,6 +438,8 @@ def main():
         logging.error(f"Web scraper error: {e}")
     except Exception as e:
         logging.error(f"Unexpected error: {e}")
+    finally:
+        scraper.close()
 
 if __name__ == "__main__":
     main()